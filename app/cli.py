@@ -0,0 +1,93 @@
+"""Operational commands, run against the database at DATABASE_URL.
+
+    python -m app.cli migrate [--to VERSION]
+    python -m app.cli status
+    python -m app.cli reconcile-counts
+    python -m app.cli compact-job-changes
+"""
+import argparse
+import sys
+
+
+def migrate(args) -> int:
+    from .database import engine
+    from .migrations.runner import upgrade
+
+    applied = upgrade(engine, target=args.to)
+    for migration in applied:
+        print(f'applied {migration.version:04d}_{migration.name}')
+    if not applied:
+        print('database is up to date')
+    return 0
+
+
+def status(args) -> int:
+    from .database import engine
+    from .migrations.runner import current_version, pending
+
+    print(f'current version: {current_version(engine):04d}')
+    waiting = pending(engine)
+    for migration in waiting:
+        print(f'pending {migration.version:04d}_{migration.name}')
+    return 1 if waiting else 0
+
+
+def reconcile_counts(args) -> int:
+    from .database import SessionLocal
+    from .models import application, application_count, job, job_change, user  # noqa: F401  (registers the mappers)
+    from .services.application_count_service import reconcile_application_counts
+
+    with SessionLocal() as db:
+        report = reconcile_application_counts(db, batch_size=args.batch_size)
+    print(f"checked {report['jobs']} jobs, repaired {report['repaired']} counters, "
+          f"removed {report['orphans_removed']} orphaned counters")
+    return 0
+
+
+def compact_job_changes(args) -> int:
+    from .database import SessionLocal
+    from .models import application, application_count, job, job_change, user  # noqa: F401  (registers the mappers)
+    from .services.job_change_service import compact_job_changes as compact
+
+    options = {'batch_size': args.batch_size}
+    if args.retention_days is not None:
+        options['retention_days'] = args.retention_days
+    if args.tombstone_days is not None:
+        options['tombstone_days'] = args.tombstone_days
+    with SessionLocal() as db:
+        report = compact(db, **options)
+    print(f"removed {report['superseded_removed']} superseded changes and {report['tombstones_removed']} tombstones, "
+          f"horizon {report['horizon']}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.cli', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = commands.add_parser('migrate', help='apply pending schema migrations')
+    migrate_parser.add_argument('--to', type=int, help='stop after this version')
+    migrate_parser.set_defaults(handler=migrate)
+
+    status_parser = commands.add_parser('status', help='show the schema version; exits 1 if migrations are pending')
+    status_parser.set_defaults(handler=status)
+
+    reconcile_parser = commands.add_parser('reconcile-counts',
+                                           help='recount applications per job and status and repair drifted counters')
+    reconcile_parser.add_argument('--batch-size', type=int, default=1000, help='jobs per transaction')
+    reconcile_parser.set_defaults(handler=reconcile_counts)
+
+    compact_parser = commands.add_parser('compact-job-changes',
+                                         help='drop superseded job changes and expired tombstones from the change feed')
+    compact_parser.add_argument('--retention-days', type=float, help='keep every change newer than this')
+    compact_parser.add_argument('--tombstone-days', type=float, help='keep deletion tombstones newer than this')
+    compact_parser.add_argument('--batch-size', type=int, default=1000, help='changes per transaction')
+    compact_parser.set_defaults(handler=compact_job_changes)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
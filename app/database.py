@@ -0,0 +1,146 @@
+# app/database.py
+from fastapi import Request
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from typing import Optional
+from .utils.pool_metrics import PoolMetrics, register_engine, timed_pool_class
+from .utils.replicas import DATABASE_REPLICA_URLS, Replica, ReplicaSet, reads_own_writes
+from .utils.request_context import instrument_sql
+from .utils.utilities import get_key, get_flag
+
+DATABASE_URL = get_key('DATABASE_URL')
+
+# Serve requests through an AsyncEngine instead of the sync engine and the threadpool
+DB_ASYNC = get_flag('DB_ASYNC')
+
+# Async driver used for each sync URL scheme when ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+# Pool settings apply per engine, so each uvicorn worker holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+DB_POOL_SIZE = int(get_key('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(get_key('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(get_key('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(get_key('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = get_flag('DB_POOL_PRE_PING', True)
+
+# Transaction-pooling PgBouncer: no client-side pool and no server-side prepared statement cache
+DB_PGBOUNCER = get_flag('DB_PGBOUNCER')
+
+
+def async_database_url(url: str) -> str:
+    scheme, rest = url.split('://', 1)
+    backend = scheme.split('+', 1)[0]
+    return f'{ASYNC_DRIVERS.get(backend, scheme)}://{rest}'
+
+
+def engine_options(url: str, metrics: PoolMetrics, pool_class=QueuePool) -> dict:
+    url = make_url(url)
+    if DB_PGBOUNCER:
+        options = {'poolclass': NullPool}
+        if url.get_driver_name() == 'asyncpg':
+            options['connect_args'] = {'statement_cache_size': 0, 'prepared_statement_cache_size': 0}
+        return options
+    if url.get_backend_name() == 'sqlite':
+        # SQLite picks its own pool per database type; only pre-ping is meaningful there
+        return {'pool_pre_ping': DB_POOL_PRE_PING}
+    return {
+        'poolclass': timed_pool_class(pool_class, metrics),
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+
+
+pool_metrics = PoolMetrics()
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, pool_metrics))
+register_engine('primary', engine, pool_metrics)
+instrument_sql(engine)
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+Base = declarative_base()
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    ASYNC_DATABASE_URL = get_key('ASYNC_DATABASE_URL') or async_database_url(DATABASE_URL)
+    async_pool_metrics = PoolMetrics()
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, async_pool_metrics, AsyncAdaptedQueuePool)
+    )
+    register_engine('primary_async', async_engine.sync_engine, async_pool_metrics)
+    instrument_sql(async_engine.sync_engine)
+    # Objects outlive the commit for serialization, and expired attributes can't lazy load outside a greenlet
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+replicas = []
+for index, replica_url in enumerate(DATABASE_REPLICA_URLS, 1):
+    replica_metrics = PoolMetrics()
+    replica_engine = create_engine(replica_url, **engine_options(replica_url, replica_metrics))
+    register_engine(f'replica{index}', replica_engine, replica_metrics)
+    instrument_sql(replica_engine)
+    replica_async_sessions = None
+    if DB_ASYNC:
+        replica_async_url = async_database_url(replica_url)
+        replica_async_metrics = PoolMetrics()
+        replica_async_engine = create_async_engine(
+            replica_async_url, **engine_options(replica_async_url, replica_async_metrics, AsyncAdaptedQueuePool)
+        )
+        register_engine(f'replica{index}_async', replica_async_engine.sync_engine, replica_async_metrics)
+        instrument_sql(replica_async_engine.sync_engine)
+        replica_async_sessions = async_sessionmaker(replica_async_engine, autoflush=False, expire_on_commit=False)
+    replicas.append(Replica(f'replica{index}', replica_engine,
+                            sessionmaker(autocommit=False, autoflush=False, bind=replica_engine),
+                            replica_async_sessions))
+
+replica_set = ReplicaSet(replicas)
+
+
+def read_replica(request: Optional[Request] = None) -> Optional[Replica]:
+    """The replica to read from, or None for the primary (no healthy replica, or the client just wrote)."""
+    if not replica_set.replicas or (request is not None and reads_own_writes(request.cookies)):
+        return None
+    return replica_set.choose()
+
+
+def get_sync_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_sync_read_db(request: Request):
+    replica = read_replica(request)
+    db = (replica.session_factory if replica is not None else SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    replica = read_replica(request)
+    async with (replica.async_session_factory if replica is not None else AsyncSessionLocal)() as db:
+        yield db
+
+
+# Dependency to get DB session; routes receive an AsyncSession when DB_ASYNC is enabled
+get_db = get_async_db if DB_ASYNC else get_sync_db
+# Same, for read-only routes: a session on a healthy replica when any are configured
+get_read_db = get_async_read_db if DB_ASYNC else get_sync_read_db
@@ -1,30 +1,51 @@
 # app/dependencies.py
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from fastapi import Depends, HTTPException, status
-from utils.utilities import get_key
+import hmac
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+from .database import Base, engine, SessionLocal, get_db, get_read_db, read_replica  # noqa: F401  (re-exported)
 from .services.auth_service import get_current_user
 from .models.user import User
-DATABASE_URL = get_key('DATABASE_URL')
+from .utils.utilities import get_key
 
-engine = create_engine(DATABASE_URL)
+# Operational endpoints under /admin are disabled unless a token is configured
+ADMIN_TOKEN = get_key('ADMIN_TOKEN')
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base = declarative_base()
-
-
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Like auth_service.oauth2_scheme, but yields None instead of answering 401 when no token is sent
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme),
+                            db: Session = Depends(get_db)) -> Optional[User]:
+    """The signed-in active user, or None when the request carries no bearer token."""
+    if token is None:
+        return None
+    return get_current_active_user(await get_current_user(token, db))
+
+
+def is_admin(x_admin_token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and x_admin_token is not None and hmac.compare_digest(x_admin_token, ADMIN_TOKEN)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+def require_user_or_admin(current_user: Optional[User], x_admin_token: Optional[str]) -> Optional[int]:
+    """The signed-in user's id, or None for the admin token; 401 when the request has neither."""
+    if is_admin(x_admin_token):
+        return None
+    if current_user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return current_user.id
@@ -1,27 +1,66 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.routes import user, job, application, auth
-from app.dependencies import Base, engine
-from app.utils.utilities import get_key
-# Create the database tables
-Base.metadata.create_all(bind=engine)
+from app.routes import user, job, application, auth, admin, deletion, metrics
+from app.database import async_engine, engine, replica_set
+from app.services.password_service import shutdown_executor
+from app.utils.metrics import MetricsMiddleware, start_metrics, stop_metrics
+from app.utils.pubsub import event_broker
+from app.utils.replicas import ReadYourWritesMiddleware
+from app.utils.request_context import RequestContextMiddleware
+from app.utils.utilities import get_flag, get_key
 
-app = FastAPI(title="Job Search API", version="1.0.0")
+API_HOST = get_key('API_HOST', '127.0.0.1')
+API_PORT = int(get_key('API_PORT', '8000'))
 
-# Register Routers
-app.include_router(auth.router, prefix="/auth", tags=["auth"])
-app.include_router(user.router, prefix="/users", tags=["users"])
-app.include_router(job.router, prefix="/jobs", tags=["jobs"])
-app.include_router(application.router, prefix="/applications", tags=["applications"])
+# Apply pending migrations when a worker starts; by default the schema is managed with `python -m app.cli migrate`
+DB_MIGRATE_ON_STARTUP = get_flag('DB_MIGRATE_ON_STARTUP')
 
-API_HOST = get_key('API_HOST')
-API_PORT = get_key('API_PORT')
-# Add any middleware here
 
-# Include any start-up event handlers
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_MIGRATE_ON_STARTUP:
+        from app.migrations.runner import upgrade
 
-# Include any shutdown event handlers
+        # Concurrent workers serialize on the migration lock, so only the first applies anything
+        upgrade(engine)
+    start_metrics()
+    replica_set.start()
+    event_broker.start()
+    try:
+        yield
+    finally:
+        await event_broker.stop()
+        replica_set.stop()
+        stop_metrics()
+        shutdown_executor()
+        if async_engine is not None:
+            await async_engine.dispose()
+        engine.dispose()
+
+
+def create_app() -> FastAPI:
+    """Build the application. Nothing here touches the database; connections open on first use."""
+    app = FastAPI(title="Job Search API", version="1.0.0", lifespan=lifespan)
+
+    # Register Routers
+    app.include_router(auth.router, prefix="/auth", tags=["auth"])
+    app.include_router(user.router, prefix="/users", tags=["users"])
+    app.include_router(job.router, prefix="/jobs", tags=["jobs"])
+    app.include_router(application.router, prefix="/applications", tags=["applications"])
+    app.include_router(deletion.router, prefix="/deletions", tags=["deletions"])
+    app.include_router(admin.router, prefix="/admin", tags=["admin"])
+    app.include_router(metrics.router)
+
+    if replica_set.replicas:
+        app.add_middleware(ReadYourWritesMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(RequestContextMiddleware)
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host=API_HOST, port=API_HOST)
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
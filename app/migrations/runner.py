@@ -0,0 +1,130 @@
+import importlib
+import pkgutil
+from dataclasses import dataclass
+from datetime import datetime
+from types import ModuleType
+from typing import List, Optional, Set
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from . import versions
+from ..utils.utilities import logger_setup
+
+logger = logger_setup(__name__)
+
+# Arbitrary key for the Postgres advisory lock that serializes concurrent migration runs
+MIGRATION_LOCK_ID = 7301
+
+migration_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', migration_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    module: ModuleType
+
+    @property
+    def transactional(self) -> bool:
+        # Set TRANSACTIONAL = False in a migration that must run outside a transaction,
+        # e.g. CREATE INDEX CONCURRENTLY on Postgres
+        return getattr(self.module, 'TRANSACTIONAL', True)
+
+    def upgrade(self, connection: Connection):
+        self.module.upgrade(connection)
+
+
+def discover() -> List[Migration]:
+    """Migrations in app/migrations/versions, named v<version>_<name>.py, in version order."""
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        prefix, _, name = module_info.name.partition('_')
+        if not (prefix.startswith('v') and prefix[1:].isdigit()):
+            continue
+        module = importlib.import_module(f'{versions.__name__}.{module_info.name}')
+        migrations.append(Migration(int(prefix[1:]), name, module))
+    migrations.sort(key=lambda migration: migration.version)
+    if len({migration.version for migration in migrations}) != len(migrations):
+        raise RuntimeError('Two migrations share a version number')
+    return migrations
+
+
+def _lock(connection: Connection):
+    # Held until the transaction ends; other workers running migrations wait here
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('SELECT pg_advisory_xact_lock(:id)'), {'id': MIGRATION_LOCK_ID})
+
+
+def _apply_without_transaction(engine: Engine, migration: Migration) -> bool:
+    with engine.connect() as connection:
+        connection = connection.execution_options(isolation_level='AUTOCOMMIT')
+        postgres = connection.dialect.name == 'postgresql'
+        if postgres:
+            connection.execute(text('SELECT pg_advisory_lock(:id)'), {'id': MIGRATION_LOCK_ID})
+        try:
+            if migration.version in applied_versions(connection):
+                return False
+            logger.info('Applying migration %04d_%s outside a transaction', migration.version, migration.name)
+            migration.upgrade(connection)
+            connection.execute(insert(schema_migrations).values(version=migration.version, name=migration.name))
+            return True
+        finally:
+            if postgres:
+                connection.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': MIGRATION_LOCK_ID})
+
+
+def applied_versions(connection: Connection) -> Set[int]:
+    schema_migrations.create(connection, checkfirst=True)
+    return set(connection.scalars(select(schema_migrations.c.version)))
+
+
+def current_version(engine: Engine) -> int:
+    with engine.begin() as connection:
+        return max(applied_versions(connection), default=0)
+
+
+def pending(engine: Engine) -> List[Migration]:
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [migration for migration in discover() if migration.version not in applied]
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations up to `target` (all by default), each in its own transaction.
+
+    A non-transactional migration that fails part way is not rolled back; it must be written so
+    that running it again completes the work.
+    """
+    applied = []
+    for migration in discover():
+        if target is not None and migration.version > target:
+            break
+        if not migration.transactional:
+            if _apply_without_transaction(engine, migration):
+                applied.append(migration)
+            continue
+        with engine.begin() as connection:
+            _lock(connection)
+            if migration.version in applied_versions(connection):
+                continue
+            logger.info('Applying migration %04d_%s', migration.version, migration.name)
+            migration.upgrade(connection)
+            connection.execute(insert(schema_migrations).values(version=migration.version, name=migration.name))
+        applied.append(migration)
+    return applied
+
+
+def drop_all(engine: Engine):
+    """Drop every application table and the migration history, for benchmark and test resets."""
+    from ..database import Base
+    from ..models import application, application_count, deletion_task, job, job_change, user  # noqa: F401  (registers the tables)
+
+    Base.metadata.drop_all(bind=engine)
+    migration_metadata.drop_all(bind=engine)
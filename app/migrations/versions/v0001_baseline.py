@@ -0,0 +1,53 @@
+"""Users, jobs and applications as they stood before migrations were introduced.
+
+Tables are declared here rather than taken from the models, so later model changes can't alter
+what this migration creates. Databases created earlier by create_all already have them and are
+left untouched; indexes added since then belong in later migrations, which reach those databases too.
+"""
+from sqlalchemy import (
+    Boolean, Column, DateTime, Enum, ForeignKey, Integer, MetaData, String, Table, Text
+)
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+users = Table(
+    'users', metadata,
+    Column('id', Integer, primary_key=True, index=True),
+    Column('username', String(50), unique=True, index=True, nullable=False),
+    Column('email', String(100), unique=True, index=True, nullable=False),
+    Column('hashed_password', String(100), nullable=False),
+    Column('is_active', Boolean),
+    Column('is_hr', Boolean),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+)
+
+jobs = Table(
+    'jobs', metadata,
+    Column('id', Integer, primary_key=True, index=True),
+    Column('title', String(100), index=True, nullable=False),
+    Column('description', Text, nullable=False),
+    Column('employment_type', Enum('FULL_TIME', 'PART_TIME', 'CONTRACT', 'TEMPORARY', 'INTERN',
+                                   name='employmenttype')),
+    Column('location', String(100), nullable=False),
+    Column('is_active', Boolean),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Column('employer_id', Integer, ForeignKey('users.id'), nullable=False),
+)
+
+applications = Table(
+    'applications', metadata,
+    Column('id', Integer, primary_key=True, index=True),
+    Column('cover_letter', Text),
+    Column('status', Enum('SUBMITTED', 'REVIEWING', 'ACCEPTED', 'REJECTED', name='applicationstatus')),
+    Column('applied_at', DateTime),
+    Column('updated_at', DateTime),
+    Column('job_id', Integer, ForeignKey('jobs.id'), nullable=False),
+    Column('applicant_id', Integer, ForeignKey('users.id'), nullable=False),
+)
+
+
+def upgrade(connection: Connection):
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,31 @@
+"""Per-job application counters by status, backfilled from the existing applications."""
+from sqlalchemy import Column, Enum, ForeignKey, Integer, MetaData, Table, func, insert, select
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+jobs = Table('jobs', metadata, Column('id', Integer, primary_key=True))
+
+applications = Table(
+    'applications', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('status', Enum('SUBMITTED', 'REVIEWING', 'ACCEPTED', 'REJECTED', name='applicationstatus')),
+    Column('job_id', Integer),
+)
+
+job_application_counts = Table(
+    'job_application_counts', metadata,
+    Column('job_id', Integer, ForeignKey('jobs.id'), primary_key=True),
+    Column('status', Enum('SUBMITTED', 'REVIEWING', 'ACCEPTED', 'REJECTED', name='applicationstatus'),
+           primary_key=True),
+    Column('count', Integer, nullable=False),
+)
+
+
+def upgrade(connection: Connection):
+    # checkfirst also skips re-creating the applicationstatus type on Postgres
+    job_application_counts.create(connection, checkfirst=True)
+    counts = (select(applications.c.job_id, applications.c.status, func.count())
+              .where(applications.c.status.is_not(None))
+              .group_by(applications.c.job_id, applications.c.status))
+    connection.execute(insert(job_application_counts).from_select(['job_id', 'status', 'count'], counts))
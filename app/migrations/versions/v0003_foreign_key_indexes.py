@@ -0,0 +1,51 @@
+"""Indexes on the foreign keys, and at most one application per applicant and job.
+
+The unique (job_id, applicant_id) index also serves lookups by job_id. On Postgres the indexes are
+built CONCURRENTLY, so the tables stay writable while they build; that can't run inside a
+transaction, hence TRANSACTIONAL = False.
+"""
+from sqlalchemy import Column, Index, Integer, MetaData, Table, func, select, text
+from sqlalchemy.engine import Connection
+
+TRANSACTIONAL = False
+
+metadata = MetaData()
+
+jobs = Table('jobs', metadata, Column('id', Integer, primary_key=True), Column('employer_id', Integer))
+
+applications = Table(
+    'applications', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('job_id', Integer),
+    Column('applicant_id', Integer),
+)
+
+INDEXES = [
+    Index('ix_jobs_employer_id', jobs.c.employer_id, postgresql_concurrently=True),
+    Index('ix_applications_applicant_id', applications.c.applicant_id, postgresql_concurrently=True),
+    Index('uq_applications_job_applicant', applications.c.job_id, applications.c.applicant_id, unique=True,
+          postgresql_concurrently=True),
+]
+
+
+def _drop_invalid(connection: Connection, name: str):
+    # An interrupted concurrent build leaves an invalid index behind, which checkfirst would skip
+    invalid = connection.scalar(text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': name})
+    if invalid:
+        connection.execute(text(f'DROP INDEX CONCURRENTLY {name}'))
+
+
+def upgrade(connection: Connection):
+    pairs = (select(applications.c.job_id, applications.c.applicant_id)
+             .group_by(applications.c.job_id, applications.c.applicant_id)
+             .having(func.count() > 1).subquery())
+    duplicates = connection.scalar(select(func.count()).select_from(pairs))
+    if duplicates:
+        raise RuntimeError(f'{duplicates} (job_id, applicant_id) pairs have more than one application; '
+                           'remove the duplicates and run the migration again')
+    for index in INDEXES:
+        if connection.dialect.name == 'postgresql':
+            _drop_invalid(connection, index.name)
+        index.create(connection, checkfirst=True)
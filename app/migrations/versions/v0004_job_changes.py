@@ -0,0 +1,36 @@
+"""Job change feed: the change log and its compaction history.
+
+Every existing job gets a CREATED entry, so reading the feed from the start lists all current jobs.
+"""
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, MetaData, Table, func, insert, literal, select
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+jobs = Table('jobs', metadata, Column('id', Integer, primary_key=True), Column('created_at', DateTime))
+
+job_changes = Table(
+    'job_changes', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('job_id', Integer, nullable=False),
+    Column('operation', Enum('CREATED', 'UPDATED', 'DELETED', name='jobchangeoperation'), nullable=False),
+    Column('changed_at', DateTime, nullable=False),
+    Index('ix_job_changes_job_id_id', 'job_id', 'id'),
+)
+
+job_change_compactions = Table(
+    'job_change_compactions', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('compacted_at', DateTime, nullable=False),
+    Column('superseded_removed', Integer, nullable=False),
+    Column('tombstones_removed', Integer, nullable=False),
+    Column('horizon', Integer, nullable=False),
+)
+
+
+def upgrade(connection: Connection):
+    metadata.create_all(connection, tables=[job_changes, job_change_compactions], checkfirst=True)
+    backfill = (select(jobs.c.id, literal('CREATED', job_changes.c.operation.type),
+                       func.coalesce(jobs.c.created_at, func.current_timestamp()))
+                .order_by(jobs.c.id))
+    connection.execute(insert(job_changes).from_select(['job_id', 'operation', 'changed_at'], backfill))
@@ -0,0 +1,24 @@
+"""A version column on users, jobs and applications for optimistic concurrency control.
+
+Existing rows start at version 1. The server default fills them in place: instant on Postgres 11+
+and SQLite, with no table rewrite.
+"""
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+metadata = MetaData()
+
+TABLES = [
+    Table(name, metadata, Column('version', Integer, nullable=False, server_default=text('1')))
+    for name in ('users', 'jobs', 'applications')
+]
+
+
+def upgrade(connection: Connection):
+    inspector = inspect(connection)
+    for table in TABLES:
+        if 'version' in {column['name'] for column in inspector.get_columns(table.name)}:
+            continue
+        column = CreateColumn(table.c.version).compile(dialect=connection.dialect)
+        connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column}'))
@@ -0,0 +1,40 @@
+"""ON DELETE CASCADE on the foreign keys to users and jobs.
+
+Deleting a user or job then takes its applications, postings and counters with it in the database,
+so the ORM never loads them. Each key is replaced NOT VALID in one quick ALTER and then validated
+separately, which doesn't block writes; that needs autocommit, hence TRANSACTIONAL = False.
+
+SQLite can't alter a foreign key without rebuilding the table and doesn't enforce them unless
+asked to, so it is skipped there; the services delete the children explicitly in either case.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+TRANSACTIONAL = False
+
+# (table, column, referenced table)
+FOREIGN_KEYS = [
+    ('applications', 'job_id', 'jobs'),
+    ('applications', 'applicant_id', 'users'),
+    ('jobs', 'employer_id', 'users'),
+    ('job_application_counts', 'job_id', 'jobs'),
+]
+
+
+def upgrade(connection: Connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    inspector = inspect(connection)
+    for table, column, referred_table in FOREIGN_KEYS:
+        for foreign_key in inspector.get_foreign_keys(table):
+            if foreign_key['constrained_columns'] != [column]:
+                continue
+            name = foreign_key['name']
+            if (foreign_key.get('options') or {}).get('ondelete', '').upper() != 'CASCADE':
+                connection.execute(text(
+                    f'ALTER TABLE {table} DROP CONSTRAINT {name}, '
+                    f'ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referred_table} (id) '
+                    f'ON DELETE CASCADE NOT VALID'
+                ))
+            # Also finishes a key a previous run replaced but didn't get to validate
+            connection.execute(text(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}'))
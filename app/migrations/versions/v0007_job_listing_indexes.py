@@ -0,0 +1,60 @@
+"""Indexes for the job listing filters and, on Postgres, the full-text search document.
+
+The baseline migration leaves existing tables alone, so databases created before these indexes
+were declared on the model don't have them yet. Each is created with IF NOT EXISTS, and on Postgres
+CONCURRENTLY, so the jobs table stays writable while they build; that can't run inside a
+transaction, hence TRANSACTIONAL = False.
+"""
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, Text, func, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex
+
+TRANSACTIONAL = False
+
+metadata = MetaData()
+
+jobs = Table(
+    'jobs', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(100)),
+    Column('description', Text),
+    Column('employment_type', String(20)),
+    Column('location', String(100)),
+    Column('is_active', Boolean),
+    Column('created_at', DateTime),
+)
+
+INDEXES = [
+    Index('ix_jobs_active_type_created', jobs.c.is_active, jobs.c.employment_type, jobs.c.created_at,
+          postgresql_concurrently=True),
+    Index('ix_jobs_active_location_created', jobs.c.is_active, jobs.c.location, jobs.c.created_at,
+          postgresql_concurrently=True),
+    Index('ix_jobs_active_created', jobs.c.is_active, jobs.c.created_at, postgresql_concurrently=True),
+]
+
+# Must match app.models.job.job_search_vector exactly for search queries to use it
+_space = text("' '")
+SEARCH_INDEX = Index(
+    'ix_jobs_search_vector',
+    func.to_tsvector(text("'english'"), jobs.c.title.op('||')(_space).op('||')(jobs.c.description)
+                     .op('||')(_space).op('||')(jobs.c.location)),
+    postgresql_using='gin',
+    postgresql_concurrently=True,
+)
+
+
+def _drop_invalid(connection: Connection, name: str):
+    # An interrupted concurrent build leaves an invalid index behind, which IF NOT EXISTS would keep
+    invalid = connection.scalar(text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': name})
+    if invalid:
+        connection.execute(text(f'DROP INDEX CONCURRENTLY {name}'))
+
+
+def upgrade(connection: Connection):
+    postgres = connection.dialect.name == 'postgresql'
+    for index in INDEXES + ([SEARCH_INDEX] if postgres else []):
+        if postgres:
+            _drop_invalid(connection, index.name)
+        connection.execute(CreateIndex(index, if_not_exists=True))
@@ -0,0 +1,26 @@
+"""Background deletion tasks, so their status is shared by all workers and survives restarts."""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+deletion_tasks = Table(
+    'deletion_tasks', metadata,
+    Column('id', String(32), primary_key=True),
+    Column('target', String(10), nullable=False),
+    Column('target_id', Integer, nullable=False),
+    Column('requested_by', Integer),
+    Column('status', String(10), nullable=False),
+    Column('applications', Integer, nullable=False),
+    Column('jobs', Integer, nullable=False),
+    Column('error', Text),
+    Column('created_at', DateTime, nullable=False),
+    Column('started_at', DateTime),
+    Column('finished_at', DateTime),
+    Column('updated_at', DateTime, nullable=False),
+    Index('ix_deletion_tasks_target', 'target', 'target_id'),
+)
+
+
+def upgrade(connection: Connection):
+    metadata.create_all(connection, checkfirst=True)
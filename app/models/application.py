@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, Text
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, Text, Index, text
 from sqlalchemy.orm import relationship
-from app.dependencies import Base
+from app.database import Base
 from datetime import datetime
 import enum
 
@@ -12,8 +12,21 @@ class ApplicationStatus(enum.Enum):
     REJECTED = "rejected"
 
 
+# Status -> statuses it may move to; a rejected application can be reopened for review
+APPLICATION_STATUS_TRANSITIONS = {
+    ApplicationStatus.SUBMITTED: {ApplicationStatus.REVIEWING, ApplicationStatus.REJECTED},
+    ApplicationStatus.REVIEWING: {ApplicationStatus.ACCEPTED, ApplicationStatus.REJECTED},
+    ApplicationStatus.ACCEPTED: set(),
+    ApplicationStatus.REJECTED: {ApplicationStatus.REVIEWING},
+}
+
+
 class Application(Base):
     __tablename__ = "applications"
+    __table_args__ = (
+        # One application per applicant and job; also the index for lookups by job_id
+        Index('uq_applications_job_applicant', 'job_id', 'applicant_id', unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     cover_letter = Column(Text)
@@ -22,8 +35,10 @@ class Application(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Foreign keys to reference the job and the applicant
-    job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
-    applicant_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False)
+    applicant_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Row version for If-Match, bumped by every update including bulk status changes
+    version = Column(Integer, nullable=False, default=1, server_default=text('1'))
 
     # Relationships
     job = relationship("Job", back_populates="applications")
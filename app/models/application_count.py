@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, ForeignKey, Enum
+from app.database import Base
+from app.models.application import ApplicationStatus
+
+
+class ApplicationCount(Base):
+    """Applications per job and status, adjusted in the same transaction as every application write.
+
+    Rows appear on the first application in a status; a missing row means zero.
+    """
+    __tablename__ = "job_application_counts"
+
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(Enum(ApplicationStatus), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ApplicationCount(job_id={self.job_id}, status='{self.status.name}', count={self.count})>"
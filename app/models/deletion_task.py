@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from app.database import Base
+from datetime import datetime
+
+
+class DeletionTask(Base):
+    """A background cascading delete, kept in the database so every worker can report on it.
+
+    The counts are written in the transaction of each chunk they describe. `requested_by` is the
+    user who started it, or null when it was started with the admin token.
+    """
+    __tablename__ = "deletion_tasks"
+    __table_args__ = (
+        # Unfinished task for a target, so deleting it again joins the running one
+        Index('ix_deletion_tasks_target', 'target', 'target_id'),
+    )
+
+    id = Column(String(32), primary_key=True)
+    target = Column(String(10), nullable=False)
+    target_id = Column(Integer, nullable=False)
+    requested_by = Column(Integer)
+    status = Column(String(10), nullable=False, default='pending')
+    applications = Column(Integer, nullable=False, default=0)
+    jobs = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    # Last time the task recorded progress; a pending or running task that stops updating it was abandoned
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DeletionTask(id='{self.id}', target='{self.target}', target_id={self.target_id}, status='{self.status}')>"
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum, Boolean, Index, func, text
 from sqlalchemy.orm import relationship
-from app.dependencies import Base
+from app.database import Base
 from datetime import datetime
 import enum
 
@@ -13,6 +13,12 @@ class EmploymentType(enum.Enum):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Listing filters lead with is_active and sort on created_at
+        Index('ix_jobs_active_type_created', 'is_active', 'employment_type', 'created_at'),
+        Index('ix_jobs_active_location_created', 'is_active', 'location', 'created_at'),
+        Index('ix_jobs_active_created', 'is_active', 'created_at'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), index=True, nullable=False)
@@ -24,11 +30,25 @@ class Job(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Foreign key to reference the HR user who posted the job
-    employer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    employer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Bumped by every update; clients send it back in If-Match so concurrent edits don't overwrite each other
+    version = Column(Integer, nullable=False, default=1, server_default=text('1'))
 
     # Relationships
     employer = relationship("User", back_populates="jobs_posted")
-    applications = relationship("Application", back_populates="job")
+    # Left to ON DELETE CASCADE and the deletion service; the ORM never loads them to delete a job
+    applications = relationship("Application", back_populates="job", cascade="all, delete", passive_deletes=True)
 
     def __repr__(self):
         return f"<Job(title='{self.title}', employment_type='{self.employment_type.name}', location='{self.location}', is_active={self.is_active})>"
+
+
+# Full-text document for Postgres search; queries must use this exact expression to hit the GIN index.
+# Literals are inlined as text so the query never sends them as bind parameters the planner can't match.
+_space = text("' '")
+job_search_vector = func.to_tsvector(
+    text("'english'"),
+    Job.title.op('||')(_space).op('||')(Job.description).op('||')(_space).op('||')(Job.location),
+)
+
+Index('ix_jobs_search_vector', job_search_vector, postgresql_using='gin').ddl_if(dialect='postgresql')
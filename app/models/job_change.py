@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, DateTime, Enum, Index
+from app.database import Base
+from datetime import datetime
+import enum
+
+
+class JobChangeOperation(enum.Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+
+class JobChange(Base):
+    """Append-only log of job writes, each row added in the transaction that wrote the job.
+
+    `id` is the position in the feed. There is no foreign key to jobs: a DELETED row is the
+    tombstone that outlives its job.
+    """
+    __tablename__ = "job_changes"
+    __table_args__ = (
+        # Latest change per job, for compaction
+        Index('ix_job_changes_job_id_id', 'job_id', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, nullable=False)
+    operation = Column(Enum(JobChangeOperation), nullable=False)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<JobChange(id={self.id}, job_id={self.job_id}, operation='{self.operation.name}')>"
+
+
+class JobChangeCompaction(Base):
+    """One row per compaction run; `horizon` is the last feed position whose tombstones were purged."""
+    __tablename__ = "job_change_compactions"
+
+    id = Column(Integer, primary_key=True)
+    compacted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    superseded_removed = Column(Integer, nullable=False, default=0)
+    tombstones_removed = Column(Integer, nullable=False, default=0)
+    horizon = Column(Integer, nullable=False, default=0)
@@ -1,7 +1,7 @@
 # app/models/user.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, text
 from sqlalchemy.orm import relationship
-from .database import Base
+from app.database import Base
 from datetime import datetime
 
 class User(Base):
@@ -15,10 +15,14 @@ class User(Base):
     is_hr = Column(Boolean, default=False)  # Differentiates between regular user and HR
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Row version for If-Match, bumped by every update
+    version = Column(Integer, nullable=False, default=1, server_default=text('1'))
 
     # Relationships
-    jobs_posted = relationship("Job", back_populates="employer")
-    applications = relationship("Application", back_populates="applicant")
+    # Removed with the user by ON DELETE CASCADE and the deletion service, never loaded for it
+    jobs_posted = relationship("Job", back_populates="employer", cascade="all, delete", passive_deletes=True)
+    applications = relationship("Application", back_populates="applicant", cascade="all, delete",
+                                passive_deletes=True)
 
     def __repr__(self):
         return f"<User(username='{self.username}', email='{self.email}', is_active={self.is_active}, is_hr={self.is_hr})>"
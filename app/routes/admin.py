@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from ..database import replica_set
+from ..dependencies import get_db, require_admin
+from ..services.deletion_service import get_deletions
+from ..services.dispatch import call_service
+from ..services.user_cache import user_cache
+from ..utils.pool_metrics import pool_stats
+from ..utils.pubsub import event_broker
+from ..utils.rate_limit import rate_limiter
+from ..utils.response_cache import job_response_cache
+from ..utils.utilities import get_log_pipeline, logger_setup
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+# Initialize logger
+logger = logger_setup(__name__)
+
+
+@router.get("/pool")
+def read_pool_stats():
+    try:
+        return pool_stats()
+    except Exception as e:
+        logger.error("Unexpected error in read_pool_stats: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/cache")
+def read_cache_stats():
+    try:
+        return {"user_cache": user_cache.stats(), "job_response_cache": job_response_cache.stats()}
+    except Exception as e:
+        logger.error("Unexpected error in read_cache_stats: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/replicas")
+def read_replica_stats():
+    try:
+        return replica_set.stats()
+    except Exception as e:
+        logger.error("Unexpected error in read_replica_stats: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/rate-limits")
+def read_rate_limit_stats():
+    try:
+        return rate_limiter.stats()
+    except Exception as e:
+        logger.error("Unexpected error in read_rate_limit_stats: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/logging")
+def read_logging_stats():
+    try:
+        pipeline = get_log_pipeline()
+        return {"enabled": pipeline is not None, **(pipeline.stats() if pipeline is not None else {})}
+    except Exception as e:
+        logger.error("Unexpected error in read_logging_stats: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/events")
+def read_event_stats():
+    try:
+        return event_broker.stats()
+    except Exception as e:
+        logger.error("Unexpected error in read_event_stats: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/deletions")
+async def read_deletions(db: Session = Depends(get_db)):
+    try:
+        return await call_service(get_deletions, db)
+    except Exception as e:
+        logger.error("Unexpected error in read_deletions: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.models.user import User
-from typing import List
-from app.schemas.application import Application, ApplicationCreate, ApplicationUpdate
+from typing import List, Optional
+from app.schemas.application import (
+    Application, ApplicationBulkResult, ApplicationBulkUpdate, ApplicationCreate, ApplicationUpdate
+)
 from app.services.application_service import (
-    get_application_by_id, get_all_applications, create_application, update_application, delete_application
+    get_application_by_id, get_all_applications, create_application, update_application, delete_application,
+    bulk_update_application_status, get_application_statuses, application_topic, APPLICATION_PAGE_KEYS
 )
-from ..dependencies import get_db, get_current_active_user
+from ..services import async_application_service  # noqa: F401  (registers the async variants)
+from ..services.dispatch import call_service
+from ..dependencies import get_db, get_read_db, get_current_active_user
+from ..utils.pagination import next_cursor_headers
+from ..utils.pubsub import CLOSED, HEARTBEAT, Subscription, event_broker
+from ..utils.serialization import json_response
 from ..utils.utilities import logger_setup
+from ..utils.versioning import parse_if_match, version_etag
 
 router = APIRouter()
 
@@ -16,69 +27,160 @@ logger = logger_setup(__name__)
 
 
 @router.get("/", response_model=List[Application])
-def read_applications(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def read_applications(skip: int = 0, limit: int = 10, cursor: Optional[str] = None,
+                            db: Session = Depends(get_read_db)):
+    try:
+        applications = await call_service(get_all_applications, db, skip=skip, limit=limit, cursor=cursor,
+                                          schema=Application)
+        headers = next_cursor_headers(applications, APPLICATION_PAGE_KEYS, limit) if cursor is not None else None
+        return json_response(Application, applications, many=True, headers=headers)
+    except HTTPException as e:
+        logger.error("Error reading applications: %s", e.detail)
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in read_applications: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _event_stream(subscription: Subscription, statuses: Optional[List[dict]]):
+    try:
+        # Reconnect after 5 seconds; the new stream starts with a fresh snapshot
+        yield "retry: 5000\n\n"
+        if statuses is not None:
+            yield _sse("snapshot", json.dumps(statuses))
+        while True:
+            item = await subscription.get()
+            if item is HEARTBEAT:
+                yield ": heartbeat\n\n"
+            elif item is CLOSED:
+                if subscription.overflowed:
+                    yield _sse("reset", json.dumps({"reason": "too many undelivered events"}))
+                return
+            else:
+                yield _sse("status", item)
+    finally:
+        event_broker.unsubscribe(subscription)
+
+
+class _EventStreamResponse(StreamingResponse):
+    """Releases the subscription however the response ends.
+
+    A client that disconnects before the first chunk cancels the stream before the generator starts,
+    so the generator's own finally never runs.
+    """
+
+    def __init__(self, subscription: Subscription, statuses: Optional[List[dict]]):
+        super().__init__(_event_stream(subscription, statuses), media_type="text/event-stream",
+                         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        self.subscription = subscription
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            event_broker.unsubscribe(self.subscription)
+
+
+# Server-sent events: a `snapshot` of the caller's application statuses, then a `status` event per change
+@router.get("/events")
+async def stream_application_events(snapshot: bool = True, db: Session = Depends(get_db),
+                                    current_user: User = Depends(get_current_active_user)):
+    try:
+        # Subscribe before reading the snapshot, so no change falls between the two
+        subscription = event_broker.subscribe(application_topic(current_user.id))
+        try:
+            statuses = await call_service(get_application_statuses, db, current_user.id) if snapshot else None
+        except BaseException:
+            event_broker.unsubscribe(subscription)
+            raise
+        return _EventStreamResponse(subscription, statuses)
+    except HTTPException as e:
+        logger.error("Error streaming application events: %s", e.detail)
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in stream_application_events: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# Move many applications to one status in a single transaction, with an outcome per application.
+# Employers only, and only for applications to their own jobs.
+@router.patch("/bulk", response_model=ApplicationBulkResult)
+async def bulk_update_applications(bulk_update: ApplicationBulkUpdate, db: Session = Depends(get_db),
+                                   current_user: User = Depends(get_current_active_user)):
     try:
-        applications = get_all_applications(db, skip=skip, limit=limit)
-        return applications
+        if not current_user.is_hr:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                                detail="Only employers can change applications in bulk")
+        return await call_service(bulk_update_application_status, db, bulk_update, current_user.id)
     except HTTPException as e:
-        logger.error(f"Error reading applications: {e.detail}")
+        logger.error("Error updating applications in bulk: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in read_applications: {e}")
+        logger.error("Unexpected error in bulk_update_applications: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/{application_id}", response_model=Application)
-def read_application(application_id: int, db: Session = Depends(get_db)):
+async def read_application(application_id: int, db: Session = Depends(get_read_db)):
     try:
-        application = get_application_by_id(db, application_id)
+        application = await call_service(get_application_by_id, db, application_id, schema=Application)
         if application is None:
-            logger.info(f"Application with id {application_id} not found")
+            logger.info("Application with id %s not found", application_id)
             raise HTTPException(status_code=404, detail="Application not found")
         return application
     except HTTPException as e:
-        logger.error(f"Error reading application by ID: {e.detail}")
+        logger.error("Error reading application by ID: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in read_application: {e}")
+        logger.error("Unexpected error in read_application: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.post("/", response_model=Application)
-def create_new_application(application: ApplicationCreate, db: Session = Depends(get_db),
-                           current_user: User = Depends(get_current_active_user)):
+async def create_new_application(application: ApplicationCreate, db: Session = Depends(get_db),
+                                 current_user: User = Depends(get_current_active_user)):
     try:
-        new_application = create_application(db, application, current_user.id)
+        new_application = await call_service(create_application, db, application, current_user.id,
+                                             schema=Application)
         return new_application
     except HTTPException as e:
-        logger.error(f"Error creating application: {e.detail}")
+        logger.error("Error creating application: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in create_new_application: {e}")
+        logger.error("Unexpected error in create_new_application: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# If-Match (or `version` in the body) makes the update conditional; a stale version gets 409.
+# Read and UPDATE ... RETURNING: two statements, plus two counter upserts when the status changes.
 @router.put("/{application_id}", response_model=Application)
-def update_application_details(application_id: int, application: ApplicationUpdate, db: Session = Depends(get_db)):
+async def update_application_details(application_id: int, application: ApplicationUpdate, response: Response,
+                                     if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
     try:
-        updated_application = update_application(db, application_id, application)
+        updated_application = await call_service(update_application, db, application_id, application,
+                                                 schema=Application, version=parse_if_match(if_match))
+        response.headers["ETag"] = version_etag(updated_application.version)
         return updated_application
     except HTTPException as e:
-        logger.error(f"Error updating application: {e.detail}")
+        logger.error("Error updating application: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in update_application_details: {e}")
+        logger.error("Unexpected error in update_application_details: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.delete("/{application_id}")
-def remove_application(application_id: int, db: Session = Depends(get_db)):
+async def remove_application(application_id: int, db: Session = Depends(get_db)):
     try:
-        delete_application(db, application_id)
+        await call_service(delete_application, db, application_id)
         return {"message": "Application deleted successfully"}
     except HTTPException as e:
-        logger.error(f"Error deleting application: {e.detail}")
+        logger.error("Error deleting application: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in remove_application: {e}")
+        logger.error("Unexpected error in remove_application: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
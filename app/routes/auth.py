@@ -1,26 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from ..schemas.user import User, UserCreate
 from ..schemas.token import Token  # Import the Token model
 from ..services.auth_service import authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from ..services.password_service import hash_password_async
 from ..services.user_service import create_user
+from ..services import async_user_service  # noqa: F401  (registers the async variants)
+from ..services.dispatch import call_service
 from ..dependencies import get_db
-from ..utils.utilities import logger_setup
+from ..utils.rate_limit import Rate, client_ip, rate_limit, rate_limiter
+from ..utils.utilities import logger_setup, get_key
 
 router = APIRouter()
 
 # Initialize logger
 logger = logger_setup(__name__)
 
+# Token buckets as 'burst/seconds'; both routes run bcrypt, so they are limited before any hashing
+LOGIN_RATE_PER_IP = Rate.parse(get_key('RATE_LIMIT_LOGIN_PER_IP', '20/60'))
+LOGIN_RATE_PER_USERNAME = Rate.parse(get_key('RATE_LIMIT_LOGIN_PER_USERNAME', '5/60'))
+SIGNUP_RATE_PER_IP = Rate.parse(get_key('RATE_LIMIT_SIGNUP_PER_IP', '5/60'))
 
-@router.post("/token", response_model=Token)
+
+async def limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    # The form is parsed once per request and shared with the route. The username bucket is only
+    # checked here; the route charges it for failed attempts, so successful logins never spend it.
+    await rate_limiter.check('login:ip', client_ip(request), LOGIN_RATE_PER_IP)
+    await rate_limiter.check('login:username', form_data.username.lower(), LOGIN_RATE_PER_USERNAME, cost=0)
+
+
+@router.post("/token", response_model=Token, dependencies=[Depends(limit_login)])
 async def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
     try:
-        user = authenticate_user(db, form_data.username, form_data.password)
+        user = await authenticate_user(db, form_data.username, form_data.password)
         if not user:
-            logger.warning(f"Failed login attempt for username: {form_data.username}")
+            logger.warning("Failed login attempt for username: %s", form_data.username)
+            await rate_limiter.charge('login:username', form_data.username.lower(), LOGIN_RATE_PER_USERNAME)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
@@ -31,19 +48,22 @@ async def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth
             data={"sub": user.username}, expires_delta=access_token_expires
         )
         return {"access_token": access_token, "token_type": "bearer"}
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Unexpected error in login_for_access_token: {e}")
+        logger.error("Unexpected error in login_for_access_token: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.post("/signup", response_model=User)
+@router.post("/signup", response_model=User, dependencies=[Depends(rate_limit("signup", SIGNUP_RATE_PER_IP))])
 async def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
     try:
-        db_user = create_user(db, user)
+        hashed_password = await hash_password_async(user.password)
+        db_user = await call_service(create_user, db, user, hashed_password=hashed_password)
         return db_user
     except HTTPException as e:
-        logger.error(f"Error in user signup: {e.detail}")
+        logger.error("Error in user signup: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in create_new_user: {e}")
+        logger.error("Unexpected error in create_new_user: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,31 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy.orm import Session
+from ..dependencies import get_db, get_optional_user, require_user_or_admin
+from ..schemas.user import User
+from ..services.deletion_service import get_deletion
+from ..services.dispatch import call_service
+from ..utils.utilities import logger_setup
+
+router = APIRouter()
+
+# Initialize logger
+logger = logger_setup(__name__)
+
+
+# Where DELETE ...?background=true points its Location header. Tasks are stored in the database, so
+# any worker can answer. Only the user who started a task, or the admin token, can read it; anyone else
+# gets 404. Reads the primary, since a replica may not have the task yet.
+@router.get("/{task_id}")
+async def read_deletion(task_id: str, db: Session = Depends(get_db),
+                        current_user: Optional[User] = Depends(get_optional_user),
+                        x_admin_token: Optional[str] = Header(None)):
+    try:
+        requested_by = require_user_or_admin(current_user, x_admin_token)
+        task = await call_service(get_deletion, db, task_id, requested_by)
+        return task.as_dict()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in read_deletion: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
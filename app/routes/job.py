@@ -1,9 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from ..schemas.job import Job, JobCreate, JobUpdate
-from ..services.job_service import get_job_by_id, get_all_jobs, create_job, update_job, delete_job
-from ..dependencies import get_db
+from typing import List, Optional
+from ..models.job import EmploymentType
+from ..schemas.job import (
+    Job, JobCreate, JobUpdate, JobSort, JobFacets, JobImportResult, JobDashboard, JobChangeFeed
+)
+from ..schemas.user import User
+from ..services.job_service import (
+    get_job_by_id, get_all_jobs, create_job, update_job, delete_job, search_jobs, get_job_facets, JOB_SORT_KEYS,
+    get_job_version, get_job_versions
+)
+from ..services.application_count_service import get_employer_dashboard
+from ..services.deletion_service import run_deletion, start_deletion
+from ..services.job_change_service import get_job_changes
+from ..services.job_import_service import CSV_CONTENT_TYPES, export_jobs_ndjson, import_jobs, parse_csv, parse_ndjson
+from ..services import async_job_service  # noqa: F401  (registers the async variants)
+from ..services.dispatch import call_service
+from ..dependencies import (
+    SessionLocal, get_db, get_read_db, read_replica, get_current_active_user, get_optional_user, require_user_or_admin,
+)
+from ..utils.request_context import query_budget
+from ..utils.versioning import parse_if_match, version_etag
+from ..utils.pagination import next_cursor_headers
+from ..utils.response_cache import cached_response, job_response_cache
+from ..utils.serialization import render_json
 from ..utils.utilities import logger_setup
 
 router = APIRouter()
@@ -12,69 +33,181 @@ router = APIRouter()
 logger = logger_setup(__name__)
 
 
-@router.get("/", response_model=List[Job])
-def read_jobs(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+# Version check plus one joined page query
+@router.get("/", response_model=List[Job], dependencies=[Depends(query_budget(2))])
+async def read_jobs(request: Request, skip: int = 0, limit: int = 10, cursor: Optional[str] = None,
+                    employment_type: Optional[EmploymentType] = None, location: Optional[str] = None,
+                    is_active: Optional[bool] = None, sort: JobSort = JobSort.ID,
+                    db: Session = Depends(get_read_db)):
+    filters = dict(skip=skip, limit=limit, cursor=cursor, employment_type=employment_type, location=location,
+                   is_active=is_active, sort=sort)
+
+    async def versions():
+        return await call_service(get_job_versions, db, **filters)
+
+    async def render():
+        jobs = await call_service(get_all_jobs, db, schema=Job, **filters)
+        headers = next_cursor_headers(jobs, JOB_SORT_KEYS[sort][0], limit) if cursor is not None else {}
+        return render_json(Job, jobs, many=True), headers
+
+    try:
+        return await cached_response(request, job_response_cache, versions, render)
+    except HTTPException as e:
+        logger.error("Error reading jobs: %s", e.detail)
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in read_jobs: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/facets", response_model=JobFacets)
+async def read_job_facets(top_locations: int = Query(10, ge=1, le=100), db: Session = Depends(get_read_db)):
+    try:
+        return await call_service(get_job_facets, db, top_locations=top_locations)
+    except HTTPException as e:
+        logger.error("Error reading job facets: %s", e.detail)
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in read_job_facets: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/search", response_model=List[Job])
+async def search_job_postings(q: str = Query(..., min_length=1, max_length=200), skip: int = 0,
+                              limit: int = 10, db: Session = Depends(get_read_db)):
+    try:
+        return await call_service(search_jobs, db, q, skip=skip, limit=limit, schema=Job)
+    except HTTPException as e:
+        logger.error("Error searching jobs: %s", e.detail)
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in search_job_postings: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/dashboard", response_model=List[JobDashboard])
+async def read_employer_dashboard(skip: int = 0, limit: int = Query(10, ge=1, le=100),
+                                  db: Session = Depends(get_read_db),
+                                  current_user: User = Depends(get_current_active_user)):
     try:
-        jobs = get_all_jobs(db, skip=skip, limit=limit)
-        return jobs
+        if not current_user.is_hr:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only employers have a dashboard")
+        return await call_service(get_employer_dashboard, db, current_user.id, skip=skip, limit=limit)
     except HTTPException as e:
-        logger.error(f"Error reading jobs: {e.detail}")
+        logger.error("Error reading employer dashboard: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in read_jobs: {e}")
+        logger.error("Unexpected error in read_employer_dashboard: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.get("/{job_id}", response_model=Job)
-def read_job(job_id: int, db: Session = Depends(get_db)):
+# Page of changes plus the compaction horizon check
+@router.get("/changes", response_model=JobChangeFeed, dependencies=[Depends(query_budget(2))])
+async def read_job_changes(since: Optional[str] = None, limit: int = Query(100, ge=1, le=1000),
+                           db: Session = Depends(get_read_db)):
     try:
-        db_job = get_job_by_id(db, job_id)
-        if db_job is None:
-            logger.info(f"Job with id {job_id} not found")
-            raise HTTPException(status_code=404, detail="Job not found")
-        return db_job
+        return await call_service(get_job_changes, db, since=since, limit=limit)
     except HTTPException as e:
-        logger.error(f"Error reading job by ID: {e.detail}")
+        logger.error("Error reading job changes: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in read_job: {e}")
+        logger.error("Unexpected error in read_job_changes: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/export")
+async def export_jobs(request: Request, is_active: Optional[bool] = None):
+    replica = read_replica(request)
+    session_factory = replica.session_factory if replica is not None else SessionLocal
+    return StreamingResponse(export_jobs_ndjson(is_active=is_active, session_factory=session_factory),
+                             media_type="application/x-ndjson")
+
+
+@router.get("/{job_id}", response_model=Job, dependencies=[Depends(query_budget(2))])
+async def read_job(job_id: int, request: Request, db: Session = Depends(get_read_db)):
+    async def versions():
+        return await call_service(get_job_version, db, job_id)
+
+    async def render():
+        db_job = await call_service(get_job_by_id, db, job_id, schema=Job)
+        return render_json(Job, db_job), {}
+
+    try:
+        return await cached_response(request, job_response_cache, versions, render)
+    except HTTPException as e:
+        logger.error("Error reading job by ID: %s", e.detail)
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in read_job: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.post("/", response_model=Job)
-def create_new_job(job: JobCreate, db: Session = Depends(get_db)):
+async def create_new_job(job: JobCreate, db: Session = Depends(get_db),
+                         current_user: User = Depends(get_current_active_user)):
     try:
-        new_job = create_job(db, job)
+        new_job = await call_service(create_job, db, job, current_user.id, schema=Job)
         return new_job
     except HTTPException as e:
-        logger.error(f"Error creating job: {e.detail}")
+        logger.error("Error creating job: %s", e.detail)
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in create_new_job: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/bulk", response_model=JobImportResult)
+async def import_job_postings(request: Request, db: Session = Depends(get_db),
+                              current_user: User = Depends(get_current_active_user)):
+    try:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        parse = parse_csv if content_type in CSV_CONTENT_TYPES else parse_ndjson
+        return await import_jobs(db, parse(request.stream()), current_user.id)
+    except HTTPException as e:
+        logger.error("Error importing jobs: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in create_new_job: {e}")
+        logger.error("Unexpected error in import_job_postings: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# If-Match (or `version` in the body) makes the update conditional; a stale version gets 409.
+# Read, UPDATE ... RETURNING and change-log insert: three statements (four on Postgres).
 @router.put("/{job_id}", response_model=Job)
-def update_job_details(job_id: int, job: JobUpdate, db: Session = Depends(get_db)):
+async def update_job_details(job_id: int, job: JobUpdate, response: Response,
+                             if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
     try:
-        updated_job = update_job(db, job_id, job)
+        updated_job = await call_service(update_job, db, job_id, job, schema=Job, version=parse_if_match(if_match))
+        response.headers["ETag"] = version_etag(updated_job.version)
         return updated_job
     except HTTPException as e:
-        logger.error(f"Error updating job: {e.detail}")
+        logger.error("Error updating job: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in update_job_details: {e}")
+        logger.error("Unexpected error in update_job_details: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# ?background=true answers 202 with a task to follow at /deletions/{task_id}. It is open to the job's
+# employer and to the admin token (X-Admin-Token), and only they can follow the task.
 @router.delete("/{job_id}")
-def remove_job(job_id: int, db: Session = Depends(get_db)):
+async def remove_job(job_id: int, response: Response, background_tasks: BackgroundTasks, background: bool = False,
+                     db: Session = Depends(get_db), current_user: Optional[User] = Depends(get_optional_user),
+                     x_admin_token: Optional[str] = Header(None)):
     try:
-        delete_job(db, job_id)
+        if background:
+            requested_by = require_user_or_admin(current_user, x_admin_token)
+            task, created = await call_service(start_deletion, db, "job", job_id, requested_by)
+            if created:
+                background_tasks.add_task(run_deletion, task)
+            response.status_code = status.HTTP_202_ACCEPTED
+            response.headers["Location"] = f"/deletions/{task.id}"
+            return task.as_dict()
+        await call_service(delete_job, db, job_id)
         return {"message": "Job deleted successfully"}
     except HTTPException as e:
-        logger.error(f"Error deleting job: {e.detail}")
+        logger.error("Error deleting job: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in remove_job: {e}")
+        logger.error("Unexpected error in remove_job: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from ..utils.metrics import metrics_text
+from ..utils.utilities import logger_setup
+
+router = APIRouter()
+
+# Initialize logger
+logger = logger_setup(__name__)
+
+# Starlette appends the charset for text/* responses
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics():
+    try:
+        return PlainTextResponse(metrics_text(), media_type=PROMETHEUS_CONTENT_TYPE)
+    except Exception as e:
+        logger.error("Unexpected error in read_metrics: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
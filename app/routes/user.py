@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..schemas.user import User, UserCreate, UserUpdate
-from ..services.user_service import get_user_by_id, get_all_users, create_user, update_user, delete_user
-from ..dependencies import get_db, get_current_active_user
+from ..services.user_service import (
+    get_user_by_id, get_all_users, create_user, update_user, delete_user, USER_PAGE_KEYS
+)
+from ..services import async_user_service  # noqa: F401  (registers the async variants)
+from ..services.deletion_service import run_deletion, start_deletion
+from ..services.dispatch import call_service
+from ..services.password_service import hash_password_async
+from .auth import SIGNUP_RATE_PER_IP
+from ..dependencies import get_db, get_read_db, get_current_active_user, get_optional_user, require_user_or_admin
+from ..utils.pagination import next_cursor_headers
+from ..utils.rate_limit import rate_limit
+from ..utils.serialization import json_response
 from ..utils.utilities import logger_setup
+from ..utils.versioning import parse_if_match, version_etag
 
 router = APIRouter()
 
@@ -13,68 +24,88 @@ logger = logger_setup(__name__)
 
 
 @router.get("/", response_model=List[User])
-def read_users(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def read_users(skip: int = 0, limit: int = 10, cursor: Optional[str] = None,
+                     db: Session = Depends(get_read_db)):
     try:
-        users = get_all_users(db, skip=skip, limit=limit)
-        return users
+        users = await call_service(get_all_users, db, skip=skip, limit=limit, cursor=cursor)
+        headers = next_cursor_headers(users, USER_PAGE_KEYS, limit) if cursor is not None else None
+        return json_response(User, users, many=True, headers=headers)
     except HTTPException as e:
-        logger.error(f"Error reading users: {e.detail}")
+        logger.error("Error reading users: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in read_users: {e}")
+        logger.error("Unexpected error in read_users: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/{user_id}", response_model=User)
-def read_user(user_id: int, db: Session = Depends(get_db)):
+async def read_user(user_id: int, db: Session = Depends(get_read_db)):
     try:
-        db_user = get_user_by_id(db, user_id)
+        db_user = await call_service(get_user_by_id, db, user_id)
         if db_user is None:
-            logger.info(f"User with id {user_id} not found")
+            logger.info("User with id %s not found", user_id)
             raise HTTPException(status_code=404, detail="User not found")
         return db_user
     except HTTPException as e:
-        logger.error(f"Error reading user by ID: {e.detail}")
+        logger.error("Error reading user by ID: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in read_user: {e}")
+        logger.error("Unexpected error in read_user: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.post("/", response_model=User)
-def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
+# Hashes a password like POST /auth/signup, so it shares that route's per-IP bucket
+@router.post("/", response_model=User, dependencies=[Depends(rate_limit("signup", SIGNUP_RATE_PER_IP))])
+async def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
     try:
-        new_user = create_user(db, user)
+        hashed_password = await hash_password_async(user.password)
+        new_user = await call_service(create_user, db, user, hashed_password=hashed_password)
         return new_user
     except HTTPException as e:
-        logger.error(f"Error creating user: {e.detail}")
+        logger.error("Error creating user: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in create_new_user: {e}")
+        logger.error("Unexpected error in create_new_user: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# If-Match (or `version` in the body) makes the update conditional; a stale version gets 409.
+# A single UPDATE ... RETURNING.
 @router.put("/{user_id}", response_model=User)
-def update_user_details(user_id: int, user: UserUpdate, db: Session = Depends(get_db)):
+async def update_user_details(user_id: int, user: UserUpdate, response: Response,
+                              if_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
     try:
-        updated_user = update_user(db, user_id, user)
+        updated_user = await call_service(update_user, db, user_id, user, version=parse_if_match(if_match))
+        response.headers["ETag"] = version_etag(updated_user.version)
         return updated_user
     except HTTPException as e:
-        logger.error(f"Error updating user: {e.detail}")
+        logger.error("Error updating user: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in update_user_details: {e}")
+        logger.error("Unexpected error in update_user_details: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# Also deletes the user's applications and the jobs they posted; see remove_job for ?background=true,
+# which here is open to the user themselves and to the admin token
 @router.delete("/{user_id}")
-def remove_user(user_id: int, db: Session = Depends(get_db)):
+async def remove_user(user_id: int, response: Response, background_tasks: BackgroundTasks, background: bool = False,
+                      db: Session = Depends(get_db), current_user: Optional[User] = Depends(get_optional_user),
+                      x_admin_token: Optional[str] = Header(None)):
     try:
-        delete_user(db, user_id)
+        if background:
+            requested_by = require_user_or_admin(current_user, x_admin_token)
+            task, created = await call_service(start_deletion, db, "user", user_id, requested_by)
+            if created:
+                background_tasks.add_task(run_deletion, task)
+            response.status_code = status.HTTP_202_ACCEPTED
+            response.headers["Location"] = f"/deletions/{task.id}"
+            return task.as_dict()
+        await call_service(delete_user, db, user_id)
         return {"message": "User deleted successfully"}
     except HTTPException as e:
-        logger.error(f"Error deleting user: {e.detail}")
+        logger.error("Error deleting user: %s", e.detail)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in remove_user: {e}")
+        logger.error("Unexpected error in remove_user: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,9 +1,10 @@
 # app/schemas/application.py
 from pydantic import BaseModel, constr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from .user import UserPublic
 from .job import JobPublic
+from ..models.application import ApplicationStatus
 
 class ApplicationBase(BaseModel):
     cover_letter: constr(min_length=20)
@@ -13,13 +14,16 @@ class ApplicationCreate(ApplicationBase):
 
 class ApplicationUpdate(BaseModel):
     cover_letter: Optional[constr(min_length=20)] = None
-    status: Optional[str] = None
+    status: Optional[ApplicationStatus] = None
+    # Version the change was based on; an If-Match header takes precedence
+    version: Optional[int] = None
 
 class ApplicationInDBBase(ApplicationBase):
     id: int
     status: str
     applied_at: datetime
     updated_at: datetime
+    version: int
 
     class Config:
         orm_mode = True
@@ -31,3 +35,22 @@ class Application(ApplicationInDBBase):
 class ApplicationPublic(ApplicationInDBBase):
     # This schema is for public representation, possibly excluding sensitive details
     pass
+
+class ApplicationBulkUpdate(BaseModel):
+    # Select by `ids`, by `job_id`, or both; `current_status` narrows either selection
+    ids: Optional[List[int]] = None
+    job_id: Optional[int] = None
+    current_status: Optional[ApplicationStatus] = None
+    status: ApplicationStatus
+
+class ApplicationBulkOutcome(BaseModel):
+    # updated, unchanged, invalid_transition, not_selected or not_found
+    id: int
+    outcome: str
+    previous_status: Optional[str] = None
+    status: Optional[str] = None
+
+class ApplicationBulkResult(BaseModel):
+    status: str
+    updated: int
+    results: List[ApplicationBulkOutcome]
@@ -1,8 +1,10 @@
 # app/schemas/job.py
 from pydantic import BaseModel, constr
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from .user import UserPublic
+from ..models.job import EmploymentType
+import enum
 
 class JobBase(BaseModel):
     title: constr(min_length=3, max_length=100)
@@ -10,14 +12,16 @@ class JobBase(BaseModel):
     location: str
 
 class JobCreate(JobBase):
-    employment_type: str
+    employment_type: EmploymentType
 
 class JobUpdate(BaseModel):
     title: Optional[constr(min_length=3, max_length=100)] = None
     description: Optional[str] = None
     location: Optional[str] = None
-    employment_type: Optional[str] = None
+    employment_type: Optional[EmploymentType] = None
     is_active: Optional[bool] = None
+    # Version the change was based on; an If-Match header takes precedence
+    version: Optional[int] = None
 
 class JobInDBBase(JobBase):
     id: int
@@ -25,6 +29,7 @@ class JobInDBBase(JobBase):
     is_active: bool
     created_at: datetime
     updated_at: datetime
+    version: int
 
     class Config:
         orm_mode = True
@@ -35,3 +40,45 @@ class Job(JobInDBBase):
 class JobPublic(JobInDBBase):
     # This schema is used for public representation, excluding sensitive employer details
     pass
+
+class JobDashboard(JobPublic):
+    # Keyed by ApplicationStatus value; every status is present
+    application_counts: Dict[str, int]
+    total_applications: int
+
+class JobChange(BaseModel):
+    # Resume the feed from here with ?since=<token>
+    token: str
+    job_id: int
+    operation: str
+    changed_at: datetime
+    # Current state of the job; null on a deletion tombstone
+    job: Optional[JobPublic] = None
+
+class JobChangeFeed(BaseModel):
+    changes: List[JobChange]
+    next: str
+    has_more: bool
+
+class JobSort(str, enum.Enum):
+    ID = "id"
+    CREATED_AT = "created_at"
+    NEWEST = "-created_at"
+
+class LocationFacet(BaseModel):
+    location: str
+    count: int
+
+class JobFacets(BaseModel):
+    employment_types: Dict[str, int]
+    locations: List[LocationFacet]
+
+class JobImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+class JobImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[JobImportError]
+    errors_truncated: bool = False
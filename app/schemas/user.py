@@ -15,11 +15,14 @@ class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     is_active: Optional[bool] = None
     is_hr: Optional[bool] = None
+    # Version the change was based on; an If-Match header takes precedence
+    version: Optional[int] = None
 
 class UserInDBBase(UserBase):
     id: int
     is_active: bool
     is_hr: bool
+    version: int
 
     class Config:
         orm_mode = True
@@ -0,0 +1,135 @@
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import delete, exists, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from ..models.application import Application, ApplicationStatus
+from ..models.application_count import ApplicationCount
+from ..models.job import Job
+from ..schemas.job import JobPublic
+from ..utils.utilities import logger_setup, get_key
+from typing import Dict, Iterable, List
+
+logger = logger_setup(__name__)
+
+# Jobs compared per transaction by the reconciliation job
+APPLICATION_COUNT_RECONCILE_BATCH = int(get_key('APPLICATION_COUNT_RECONCILE_BATCH', '1000'))
+
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def handle_db_error(error: Exception):
+    logger.error('Database error: %s', error)
+    raise HTTPException(status_code=500, detail='Internal server error')
+
+
+def adjust_application_counts(db: Session, job_id: int, deltas: Dict[ApplicationStatus, int]):
+    """Add `deltas` to the job's counters in the caller's transaction; commit is left to the caller.
+
+    Each change is a single atomic upsert, so concurrent writers never lose an increment.
+    """
+    upsert_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    for status, delta in deltas.items():
+        if not delta:
+            continue
+        if upsert_insert is not None:
+            statement = upsert_insert(ApplicationCount).values(job_id=job_id, status=status, count=delta)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[ApplicationCount.job_id, ApplicationCount.status],
+                set_={'count': ApplicationCount.count + delta},
+            ))
+            continue
+        updated = db.execute(
+            update(ApplicationCount)
+            .where(ApplicationCount.job_id == job_id, ApplicationCount.status == status)
+            .values(count=ApplicationCount.count + delta)
+        ).rowcount
+        if not updated:
+            db.execute(insert(ApplicationCount).values(job_id=job_id, status=status, count=delta))
+
+
+def get_application_counts(db: Session, job_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+    """Counters for each job, with every status present (zero when no row exists)."""
+    counts = {job_id: {status.value: 0 for status in ApplicationStatus} for job_id in job_ids}
+    if not counts:
+        return counts
+    rows = db.execute(select(ApplicationCount.job_id, ApplicationCount.status, ApplicationCount.count)
+                      .where(ApplicationCount.job_id.in_(list(counts))))
+    for job_id, status, count in rows:
+        counts[job_id][status.value] = count
+    return counts
+
+
+def get_employer_dashboard(db: Session, employer_id: int, skip: int = 0, limit: int = 10) -> List[dict]:
+    """The employer's jobs with applicant counts per status: one query for the jobs, one for the counters."""
+    try:
+        jobs = db.scalars(select(Job).where(Job.employer_id == employer_id)
+                          .order_by(Job.id).offset(skip).limit(limit)).all()
+        counts = get_application_counts(db, [job.id for job in jobs])
+        dashboard = []
+        for job in jobs:
+            entry = JobPublic.model_validate(job, from_attributes=True).model_dump()
+            entry['application_counts'] = counts[job.id]
+            entry['total_applications'] = sum(counts[job.id].values())
+            dashboard.append(entry)
+        return dashboard
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving dashboard for employer with ID: %s: error: %s', employer_id, e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+def _reconcile_batch(db: Session, job_ids: List[int]) -> int:
+    actual = {(job_id, status): count for job_id, status, count in db.execute(
+        select(Application.job_id, Application.status, func.count())
+        .where(Application.job_id.in_(job_ids), Application.status.is_not(None))
+        .group_by(Application.job_id, Application.status)
+    )}
+    stored = {(job_id, status): count for job_id, status, count in db.execute(
+        select(ApplicationCount.job_id, ApplicationCount.status, ApplicationCount.count)
+        .where(ApplicationCount.job_id.in_(job_ids))
+    )}
+    repaired = 0
+    for job_id, status in actual.keys() | stored.keys():
+        count = actual.get((job_id, status), 0)
+        if stored.get((job_id, status)) == count:
+            continue
+        repaired += 1
+        key = (ApplicationCount.job_id == job_id, ApplicationCount.status == status)
+        if (job_id, status) not in stored:
+            db.execute(insert(ApplicationCount).values(job_id=job_id, status=status, count=count))
+        elif count == 0:
+            db.execute(delete(ApplicationCount).where(*key))
+        else:
+            db.execute(update(ApplicationCount).where(*key).values(count=count))
+        logger.debug('Repaired application count for job %s, status %s: %s -> %s',
+                     job_id, status.value, stored.get((job_id, status), 0), count)
+    return repaired
+
+
+def reconcile_application_counts(db: Session,
+                                 batch_size: int = APPLICATION_COUNT_RECONCILE_BATCH) -> Dict[str, int]:
+    """Recount applications per job and status and fix counters that drifted.
+
+    Walks the jobs in id order, one transaction per batch. A write that races with the repair of
+    its batch can leave that counter off by one until the next run.
+    """
+    report = {'jobs': 0, 'repaired': 0, 'orphans_removed': 0}
+    last_id = 0
+    while True:
+        job_ids = list(db.scalars(select(Job.id).where(Job.id > last_id).order_by(Job.id).limit(batch_size)))
+        if not job_ids:
+            break
+        report['repaired'] += _reconcile_batch(db, job_ids)
+        report['jobs'] += len(job_ids)
+        db.commit()
+        last_id = job_ids[-1]
+    report['orphans_removed'] = db.execute(
+        delete(ApplicationCount).where(~exists().where(Job.id == ApplicationCount.job_id))
+    ).rowcount
+    db.commit()
+    log = logger.warning if report['repaired'] or report['orphans_removed'] else logger.info
+    log('Reconciled application counts for %s jobs: %s counters repaired, %s orphans removed',
+        report['jobs'], report['repaired'], report['orphans_removed'])
+    return report
@@ -1,75 +1,270 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from sqlalchemy.exc import SQLAlchemyError
-from ..models.application import Application
-from ..schemas.application import ApplicationCreate, ApplicationUpdate
-from ..utils.utilities import logger_setup
-from typing import List, Type
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy import Select, select, update
+from ..models.application import Application, ApplicationStatus, APPLICATION_STATUS_TRANSITIONS
+from ..models.job import Job
+from ..schemas.application import ApplicationBulkUpdate, ApplicationCreate, ApplicationUpdate
+from .application_count_service import adjust_application_counts
+from ..utils.loading import loader_options, load_rendered
+from ..utils.pagination import keyset_page
+from ..utils.pubsub import event_broker
+from ..utils.utilities import logger_setup, get_key
+from ..utils.versioning import (
+    VERSIONED_UPDATE_ATTEMPTS, check_version, has_changes, raise_missed_update, versioned_update
+)
+from pydantic import BaseModel
+from typing import Dict, List, Optional, Type
 
 logger = logger_setup(__name__)
 
+APPLICATION_PAGE_KEYS = (Application.id,)
+
+# Ids accepted by one bulk status change
+APPLICATION_BULK_MAX_IDS = int(get_key('APPLICATION_BULK_MAX_IDS', '1000'))
+
 
 def handle_db_error(error: Exception):
-    logger.error(f'Database error: {error}')
+    logger.error('Database error: %s', error)
     raise HTTPException(status_code=500, detail='Internal server error')
 
 
-def get_application_by_id(db: Session, application_id: int) -> Type[Application]:
+def application_topic(user_id: int) -> str:
+    """Event topic carrying status changes of the user's applications."""
+    return f'applications:user:{user_id}'
+
+
+# `application` can also be a row returned by a bulk UPDATE; only its columns are read
+def _publish_status_change(application: Application, previous_status: ApplicationStatus):
+    event_broker.publish(application_topic(application.applicant_id), {
+        'application_id': application.id,
+        'job_id': application.job_id,
+        'status': application.status.value,
+        'previous_status': previous_status.value if previous_status else None,
+        'updated_at': application.updated_at.isoformat(),
+    })
+
+
+def check_status_transition(previous_status: Optional[ApplicationStatus], new_status: ApplicationStatus):
+    if previous_status is None or new_status == previous_status:
+        return
+    if new_status not in APPLICATION_STATUS_TRANSITIONS[previous_status]:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail=f'Cannot change status from {previous_status.value} to {new_status.value}')
+
+
+def select_application_by_id(application_id: int, schema: Optional[Type[BaseModel]] = None) -> Select:
+    return select(Application).options(*loader_options(Application, schema)).where(Application.id == application_id)
+
+
+def select_applications(skip: int = 0, limit: int = 10, cursor: Optional[str] = None,
+                        schema: Optional[Type[BaseModel]] = None) -> Select:
+    statement = select(Application).options(*loader_options(Application, schema))
+    if cursor is not None:
+        return keyset_page(statement, APPLICATION_PAGE_KEYS, cursor, limit)
+    return statement.offset(skip).limit(limit)
+
+
+def get_application_by_id(db: Session, application_id: int,
+                          schema: Optional[Type[BaseModel]] = None) -> Type[Application]:
     try:
-        application = db.query(Application).filter(Application.id == application_id).first()
+        application = db.scalars(select_application_by_id(application_id, schema)).first()
         if application is None:
-            logger.info(f'Application with id {application_id} not found')
+            logger.info('Application with id %s not found', application_id)
             raise HTTPException(status_code=404, detail='Application not found')
         return application
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error retrieving application with id: {application_id}: error: {e}')
+        logger.error('Unexpected error retrieving application with id: %s: error: %s', application_id, e)
         raise HTTPException(status_code=500, detail='Unexpected error')
 
 
-def get_all_applications(db: Session, skip: int = 0, limit: int = 10):
+def get_all_applications(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None,
+                         schema: Optional[Type[BaseModel]] = None):
     try:
-        return db.query(Application).offset(skip).limit(limit).all()
+        return db.scalars(select_applications(skip=skip, limit=limit, cursor=cursor, schema=schema)).all()
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error retrieving all applications: error: {e}')
+        logger.error('Unexpected error retrieving all applications: error: %s', e)
         raise HTTPException(status_code=500, detail='Unexpected error')
 
 
-def create_application(db: Session, application_data: ApplicationCreate, user_id: int) -> Application:
+def create_application(db: Session, application_data: ApplicationCreate, user_id: int,
+                       schema: Optional[Type[BaseModel]] = None) -> Application:
     try:
         new_application = Application(**application_data.dict(), applicant_id=user_id)
         db.add(new_application)
+        adjust_application_counts(db, new_application.job_id,
+                                  {new_application.status or ApplicationStatus.SUBMITTED: 1})
         db.commit()
         db.refresh(new_application)
-        logger.info(f'Created new application with ID: {new_application.id}')
-        return new_application
+        logger.info('Created new application with ID: %s', new_application.id)
+        return load_rendered(new_application, schema)
+    except IntegrityError as error:
+        db.rollback()
+        # The unique (job_id, applicant_id) index is the check, so concurrent duplicates are caught too
+        if db.scalar(select(Application.id).where(Application.job_id == application_data.job_id,
+                                                  Application.applicant_id == user_id)) is None:
+            handle_db_error(error)
+        logger.info('User %s already applied to job %s', user_id, application_data.job_id)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Already applied to this job')
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error creating application: error: {e}')
+        logger.error('Unexpected error creating application: error: %s', e)
         raise HTTPException(status_code=500, detail='Unexpected error')
 
 
-def update_application(db: Session, application_id: int, update_data: ApplicationUpdate) -> Type[Application]:
+def update_application(db: Session, application_id: int, update_data: ApplicationUpdate,
+                       schema: Optional[Type[BaseModel]] = None, version: Optional[int] = None) -> Type[Application]:
+    """Apply `update_data` in two statements: a read and a conditional UPDATE ... RETURNING.
+
+    The read loads what the response embeds and the status the counters move from. The UPDATE only
+    matches the version that was read; the expected `version` (If-Match, else the body) must be it.
+    A status change adds one counter upsert for each of the two statuses. A write that lost a race
+    without an expected version reads and updates again, up to VERSIONED_UPDATE_ATTEMPTS times.
+    """
     try:
-        application_to_update = get_application_by_id(db, application_id)
-        if not application_to_update:
-            raise HTTPException(status_code=404, detail='Application not found')
+        values = update_data.model_dump(exclude_unset=True, exclude={'version'})
+        expected = version if version is not None else update_data.version
+        for _ in range(VERSIONED_UPDATE_ATTEMPTS):
+            application_to_update = db.scalars(select_application_by_id(application_id, schema)).first()
+            if application_to_update is None:
+                raise HTTPException(status_code=404, detail='Application not found')
+            check_version(application_to_update, expected, 'Application')
+            previous_status = application_to_update.status
+            if update_data.status is not None:
+                check_status_transition(previous_status, update_data.status)
+            if not has_changes(application_to_update, values):
+                return load_rendered(application_to_update, schema)
+            if versioned_update(db, Application, application_id, values, application_to_update.version) is not None:
+                break
+            # Changed since the read: a conflict if the caller named a version, otherwise read again
+            db.rollback()
+            if expected is not None:
+                raise_missed_update(db, Application, application_id, 'Application')
+        else:
+            raise_missed_update(db, Application, application_id, 'Application')
 
-        for key, value in update_data.dict(exclude_unset=True).items():
-            setattr(application_to_update, key, value)
+        if application_to_update.status != previous_status:
+            adjust_application_counts(db, application_to_update.job_id,
+                                      {previous_status: -1, application_to_update.status: 1})
+        load_rendered(application_to_update, schema)
+        # Detached objects keep their loaded state through the commit, so rendering needs no reload
+        db.expunge_all()
         db.commit()
-        db.refresh(application_to_update)
-        logger.info(f'Updated application with ID: {application_id}')
+        if application_to_update.status != previous_status:
+            _publish_status_change(application_to_update, previous_status)
+        logger.info('Updated application with ID: %s to version %s', application_id, application_to_update.version)
         return application_to_update
 
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error updating application with ID: {application_id}: error: {e}')
+        logger.error('Unexpected error updating application with ID: %s: error: %s', application_id, e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+def _outcome(application_id: int, outcome: str, previous_status: Optional[ApplicationStatus],
+             new_status: Optional[ApplicationStatus]) -> Dict:
+    return {'id': application_id, 'outcome': outcome,
+            'previous_status': previous_status.value if previous_status else None,
+            'status': new_status.value if new_status else None}
+
+
+def bulk_update_application_status(db: Session, bulk_data: ApplicationBulkUpdate, employer_id: int) -> Dict:
+    """Move the selected applications to `bulk_data.status` in one transaction and report each one.
+
+    Only applications to jobs posted by `employer_id` are touched; other ids are reported as not
+    found. Rows are updated set-based: one UPDATE ... RETURNING for each status the target can be
+    reached from, so the previous status of every moved row is known without reading it first.
+    Selected ids that did not move are read back in one query to report why. Counters are adjusted
+    in the same transaction; status events go out after the commit.
+    """
+    new_status = bulk_data.status
+    ids = list(dict.fromkeys(bulk_data.ids)) if bulk_data.ids is not None else None
+    if ids is None and bulk_data.job_id is None:
+        raise HTTPException(status_code=422, detail='Select applications by ids or job_id')
+    if ids is not None and len(ids) > APPLICATION_BULK_MAX_IDS:
+        raise HTTPException(status_code=422, detail=f'At most {APPLICATION_BULK_MAX_IDS} ids per request')
+    if bulk_data.current_status is not None:
+        check_status_transition(bulk_data.current_status, new_status)
+        sources = [bulk_data.current_status] if bulk_data.current_status != new_status else []
+    else:
+        sources = [previous for previous, targets in APPLICATION_STATUS_TRANSITIONS.items() if new_status in targets]
+
+    try:
+        selection = []
+        if ids is not None:
+            selection.append(Application.id.in_(ids))
+        if bulk_data.job_id is not None:
+            owner_id = db.scalar(select(Job.employer_id).where(Job.id == bulk_data.job_id))
+            if owner_id is None:
+                raise HTTPException(status_code=404, detail='Job not found')
+            if owner_id != employer_id:
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Not an employer of this job')
+            selection.append(Application.job_id == bulk_data.job_id)
+        else:
+            selection.append(Application.job_id.in_(select(Job.id).where(Job.employer_id == employer_id)))
+
+        moved = []
+        for previous_status in sources:
+            rows = db.execute(
+                update(Application).where(*selection, Application.status == previous_status)
+                .values(status=new_status, version=Application.version + 1)
+                .returning(Application.id, Application.job_id, Application.applicant_id, Application.status,
+                           Application.updated_at)
+                .execution_options(synchronize_session=False)
+            ).all()
+            moved += [(row, previous_status) for row in rows]
+
+        deltas: Dict[int, Dict[ApplicationStatus, int]] = {}
+        for row, previous_status in moved:
+            job_deltas = deltas.setdefault(row.job_id, {})
+            job_deltas[previous_status] = job_deltas.get(previous_status, 0) - 1
+            job_deltas[new_status] = job_deltas.get(new_status, 0) + 1
+        # Counter rows are locked in job order, so concurrent bulk changes cannot deadlock on them
+        for job_id in sorted(deltas):
+            adjust_application_counts(db, job_id, deltas[job_id])
+
+        results = {row.id: _outcome(row.id, 'updated', previous_status, new_status) for row, previous_status in moved}
+        unmoved = [application_id for application_id in ids or () if application_id not in results]
+        if unmoved:
+            current = {application_id: (job_id, current_status) for application_id, job_id, current_status in
+                       db.execute(select(Application.id, Application.job_id, Application.status)
+                                  .join(Job, Job.id == Application.job_id)
+                                  .where(Application.id.in_(unmoved), Job.employer_id == employer_id))}
+            for application_id in unmoved:
+                if application_id not in current:
+                    results[application_id] = _outcome(application_id, 'not_found', None, None)
+                    continue
+                job_id, current_status = current[application_id]
+                if current_status == new_status:
+                    outcome = 'unchanged'
+                elif bulk_data.job_id not in (None, job_id) or bulk_data.current_status not in (None, current_status):
+                    outcome = 'not_selected'
+                else:
+                    outcome = 'invalid_transition'
+                results[application_id] = _outcome(application_id, outcome, current_status, current_status)
+        db.commit()
+
+        for row, previous_status in moved:
+            _publish_status_change(row, previous_status)
+        logger.info('Moved %s applications to %s', len(moved), new_status.value)
+        order = ids if ids is not None else sorted(results)
+        return {'status': new_status.value, 'updated': len(moved), 'results': [results[i] for i in order]}
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error moving applications to %s: error: %s', new_status.value, e)
         raise HTTPException(status_code=500, detail='Unexpected error')
 
 
@@ -79,22 +274,39 @@ def delete_application(db: Session, application_id: int):
         if not application_to_delete:
             raise HTTPException(status_code=404, detail='Application not found')
 
+        adjust_application_counts(db, application_to_delete.job_id, {application_to_delete.status: -1})
         db.delete(application_to_delete)
         db.commit()
-        logger.info(f'Deleted application with ID: {application_id}')
+        logger.info('Deleted application with ID: %s', application_id)
 
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error deleting application with ID: {application_id}: error: {e}')
+        logger.error('Unexpected error deleting application with ID: %s: error: %s', application_id, e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+def get_applications_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 10,
+                             schema: Optional[Type[BaseModel]] = None):
+    try:
+        return (db.query(Application).options(*loader_options(Application, schema))
+                .filter(Application.applicant_id == user_id).offset(skip).limit(limit).all())
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving applications by user with ID: %s: error: %s', user_id, e)
         raise HTTPException(status_code=500, detail='Unexpected error')
 
 
-def get_applications_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 10):
+def get_application_statuses(db: Session, user_id: int) -> List[Dict]:
+    """Status of every application of the user, oldest first; the snapshot an event stream starts from."""
     try:
-        return db.query(Application).filter(Application.applicant_id == user_id).offset(skip).limit(limit).all()
+        rows = db.execute(select(Application.id, Application.job_id, Application.status)
+                          .where(Application.applicant_id == user_id).order_by(Application.id))
+        return [{'application_id': application_id, 'job_id': job_id, 'status': status.value if status else None}
+                for application_id, job_id, status in rows]
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error retrieving applications by user with ID: {user_id}: error: {e}')
+        logger.error('Unexpected error retrieving application statuses of user with ID: %s: error: %s', user_id, e)
         raise HTTPException(status_code=500, detail='Unexpected error')
@@ -0,0 +1,47 @@
+from typing import Optional, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import application_service
+from .application_service import handle_db_error, select_application_by_id, select_applications
+from .dispatch import async_variant
+from ..models.application import Application
+from ..utils.utilities import logger_setup
+
+logger = logger_setup(__name__)
+
+# Reads run natively on the AsyncSession; writes reach application_service through call_service's run_sync path.
+
+
+@async_variant(application_service.get_application_by_id)
+async def get_application_by_id(db: AsyncSession, application_id: int,
+                                schema: Optional[Type[BaseModel]] = None) -> Application:
+    try:
+        application = (await db.scalars(select_application_by_id(application_id, schema))).first()
+        if application is None:
+            logger.info('Application with id %s not found', application_id)
+            raise HTTPException(status_code=404, detail='Application not found')
+        return application
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving application with id: %s: error: %s', application_id, e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+@async_variant(application_service.get_all_applications)
+async def get_all_applications(db: AsyncSession, **kwargs):
+    try:
+        return (await db.scalars(select_applications(**kwargs))).all()
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving all applications: error: %s', e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
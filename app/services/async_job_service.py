@@ -0,0 +1,76 @@
+from typing import List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import job_service
+from .dispatch import async_variant
+from .job_service import handle_db_error, select_job_by_id, select_job_versions, select_jobs
+from ..models.job import Job
+from ..utils.utilities import logger_setup
+
+logger = logger_setup(__name__)
+
+# Reads run natively on the AsyncSession; writes reach job_service through call_service's run_sync path.
+
+
+@async_variant(job_service.get_job_by_id)
+async def get_job_by_id(db: AsyncSession, job_id: int, schema: Optional[Type[BaseModel]] = None) -> Job:
+    try:
+        job = (await db.scalars(select_job_by_id(job_id, schema))).first()
+        if job is None:
+            logger.info('Job with id %s not found', job_id)
+            raise HTTPException(status_code=404, detail='Job not found')
+        return job
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving job with id: %s: error: %s', job_id, e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+@async_variant(job_service.get_all_jobs)
+async def get_all_jobs(db: AsyncSession, **kwargs):
+    try:
+        return (await db.scalars(select_jobs(**kwargs))).all()
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving all jobs: error: %s', e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+@async_variant(job_service.get_job_version)
+async def get_job_version(db: AsyncSession, job_id: int) -> List[Tuple]:
+    try:
+        version = (await db.execute(select_job_versions(select_job_by_id(job_id)))).first()
+        if version is None:
+            logger.info('Job with id %s not found', job_id)
+            raise HTTPException(status_code=404, detail='Job not found')
+        return [tuple(version)]
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving version of job with id: %s: error: %s', job_id, e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+@async_variant(job_service.get_job_versions)
+async def get_job_versions(db: AsyncSession, **kwargs) -> List[Tuple]:
+    try:
+        return [tuple(row) for row in await db.execute(select_job_versions(select_jobs(**kwargs)))]
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving job versions: error: %s', e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
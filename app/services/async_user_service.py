@@ -0,0 +1,52 @@
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import user_service
+from .dispatch import async_variant
+from .user_service import handle_db_error, select_users
+from ..models.user import User
+from ..utils.utilities import logger_setup
+
+logger = logger_setup(__name__)
+
+# Reads run natively on the AsyncSession; writes reach user_service through call_service's run_sync path.
+
+
+@async_variant(user_service.get_all_users)
+async def get_all_users(db: AsyncSession, **kwargs):
+    try:
+        return (await db.scalars(select_users(**kwargs))).all()
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving all users: %s', e)
+
+
+@async_variant(user_service.get_user_by_id)
+async def get_user_by_id(db: AsyncSession, user_id: int) -> User:
+    try:
+        user = await db.get(User, user_id)
+        if user is None:
+            logger.info('User with id %s not found', user_id)
+            raise HTTPException(status_code=404, detail='User not found')
+        return user
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving user with id: %s: error: %s', user_id, e)
+
+
+@async_variant(user_service.get_user_by_username)
+async def get_user_by_username(db: AsyncSession, username: str) -> User:
+    try:
+        return (await db.scalars(select(User).where(User.username == username))).first()
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving user with username: %s: error: %s', username, e)
@@ -1,12 +1,16 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from .user_service import get_user_by_username
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .dispatch import async_variant, call_service
+from .user_cache import user_cache
+from .password_service import verify_and_update_async
+from .user_service import get_user_by_username, update_password_hash
+from ..database import get_db
 from ..models.user import User
-from ..schemas.user import UserInDB
+from ..schemas.user import User as UserSchema
 from ..utils.utilities import logger_setup, get_key
 
 # Logger setup
@@ -17,29 +21,25 @@ SECRET_KEY = get_key("SECRET_KEY")
 ALGORITHM = get_key("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(get_key("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
-# Configuration for password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def authenticate_user(username: str, password: str) -> Optional[User]:
+async def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     try:
-        user = get_user_by_username(username)
-        if not user or not verify_password(password, user.hashed_password):
-            logger.warning(f"Authentication failed for user: {username}")
+        user = await call_service(get_user_by_username, db, username)
+        if not user:
+            logger.warning("Authentication failed for user: %s", username)
+            return None
+        # bcrypt runs on the password executor, never on the event loop
+        valid, new_hash = await verify_and_update_async(password, user.hashed_password)
+        if not valid:
+            logger.warning("Authentication failed for user: %s", username)
             return None
+        if new_hash is not None:
+            await call_service(update_password_hash, db, user.id, new_hash)
         return user
     except Exception as e:
-        logger.error(f"Error in authenticate_user: {e}")
+        logger.error("Error in authenticate_user: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -50,32 +50,65 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    from jose import JWTError, jwt
+
     try:
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
     except JWTError as e:
-        logger.error(f"JWT Encoding error: {e}")
+        logger.error("JWT Encoding error: %s", e)
         raise HTTPException(status_code=500, detail="Error creating access token")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
+def load_current_user(db: Session, username: str) -> Optional[UserSchema]:
+    """Look the user up and cache it, then hand the session's connection back to the pool.
+
+    Both happen in one worker thread. Otherwise a burst of uncached requests could hold every pooled
+    connection while their routes wait behind each other for a thread. The session reconnects if
+    the route uses it.
+    """
+    try:
+        user = get_user_by_username(db, username)
+        return user_cache.set(user) if user is not None else None
+    finally:
+        db.close()
+
+
+@async_variant(load_current_user)
+async def load_current_user_async(db: AsyncSession, username: str) -> Optional[UserSchema]:
+    try:
+        user = await call_service(get_user_by_username, db, username)
+        return user_cache.set(user) if user is not None else None
+    finally:
+        await db.close()
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserSchema:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # Imported on first use; python-jose pulls in its crypto backends at import
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        user = get_user_by_username(username)
+        cached = user_cache.get(username)
+        if cached is not None:
+            return cached
+        user = await call_service(load_current_user, db, username)
         if user is None:
             raise credentials_exception
         return user
+    except HTTPException:
+        raise
     except JWTError as e:
-        logger.warning(f"JWT decoding error: {e}")
+        logger.warning("JWT decoding error: %s", e)
         raise credentials_exception
     except Exception as e:
-        logger.error(f"Unexpected error in get_current_user: {e}")
+        logger.error("Unexpected error in get_current_user: %s", e)
         raise credentials_exception
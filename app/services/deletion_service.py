@@ -0,0 +1,268 @@
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.application import Application
+from ..models.application_count import ApplicationCount
+from ..models.deletion_task import DeletionTask
+from ..models.job import Job
+from ..models.job_change import JobChangeOperation
+from ..models.user import User
+from .application_count_service import adjust_application_counts
+from .facet_service import job_facets
+from .job_change_service import record_job_changes
+from .search_service import job_search_index
+from .user_cache import user_cache
+from ..utils.response_cache import job_response_cache
+from ..utils.utilities import logger_setup, get_key
+
+logger = logger_setup(__name__)
+
+# Rows deleted per transaction; each chunk commits, so locks are short and progress survives a crash
+DELETE_BATCH_SIZE = int(get_key('DELETE_BATCH_SIZE', '1000'))
+# Finished background deletions kept for GET /deletions/{id} and GET /admin/deletions
+DELETION_TASK_HISTORY = int(get_key('DELETION_TASK_HISTORY', '100'))
+# A pending or running task that records no progress for this long was abandoned, e.g. by a worker that died
+DELETION_TASK_STALE_SECONDS = int(get_key('DELETION_TASK_STALE_SECONDS', '300'))
+
+_UNFINISHED = ('pending', 'running')
+
+
+class DeletionProgress:
+    """Rows removed so far by one cascading delete, updated after every committed chunk.
+
+    A background task's progress is backed by a `deletion_tasks` row, which `checkpoint` updates in
+    the chunk's own transaction; a plain DELETE's progress lives only in memory.
+    """
+
+    __slots__ = ('id', 'target', 'target_id', 'requested_by', 'status', 'applications', 'jobs', 'started_at',
+                 'finished_at', 'error', 'persisted')
+
+    def __init__(self, target: str, target_id: int, requested_by: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.target = target
+        self.target_id = target_id
+        self.requested_by = requested_by
+        self.status = 'pending'
+        self.applications = 0
+        self.jobs = 0
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.persisted = False
+
+    @classmethod
+    def from_row(cls, row: DeletionTask) -> 'DeletionProgress':
+        progress = cls(row.target, row.target_id, row.requested_by)
+        progress.id = row.id
+        for name in ('status', 'applications', 'jobs', 'started_at', 'finished_at', 'error'):
+            setattr(progress, name, getattr(row, name))
+        progress.persisted = True
+        return progress
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def checkpoint(self, db: Session):
+        """Write the progress to the task's row in the current transaction, if it has one."""
+        if not self.persisted:
+            return
+        db.execute(update(DeletionTask).where(DeletionTask.id == self.id).values(
+            status=self.status, applications=self.applications, jobs=self.jobs, started_at=self.started_at,
+            finished_at=self.finished_at, error=self.error, updated_at=datetime.utcnow()))
+
+    def as_dict(self) -> Dict:
+        return {'id': self.id, 'target': self.target, 'target_id': self.target_id, 'status': self.status,
+                'deleted': {'applications': self.applications, 'jobs': self.jobs},
+                'started_at': self.started_at, 'finished_at': self.finished_at, 'error': self.error}
+
+
+class DeletionTasks:
+    """Background deletions in the `deletion_tasks` table; the oldest finished ones are dropped first."""
+
+    def __init__(self, history: int = DELETION_TASK_HISTORY, stale_seconds: int = DELETION_TASK_STALE_SECONDS):
+        self.history = history
+        self.stale_seconds = stale_seconds
+
+    def create(self, db: Session, target: str, target_id: int,
+               requested_by: Optional[int] = None) -> Tuple[DeletionProgress, bool]:
+        """A new task for the target and True, or the unfinished one already there and False.
+
+        An unfinished task that stopped recording progress is marked failed and replaced, so deleting
+        the target again resumes the work a dead worker left behind.
+        """
+        unfinished = db.scalars(select(DeletionTask).where(
+            DeletionTask.target == target, DeletionTask.target_id == target_id,
+            DeletionTask.status.in_(_UNFINISHED)).order_by(DeletionTask.created_at)).first()
+        now = datetime.utcnow()
+        if unfinished is not None:
+            if unfinished.updated_at > now - timedelta(seconds=self.stale_seconds):
+                return DeletionProgress.from_row(unfinished), False
+            unfinished.status = 'failed'
+            unfinished.error = f'Abandoned after {self.stale_seconds}s without progress'
+            unfinished.finished_at = now
+        task = DeletionProgress(target, target_id, requested_by)
+        db.add(DeletionTask(id=task.id, target=target, target_id=target_id, requested_by=requested_by,
+                            status=task.status, created_at=now, updated_at=now))
+        kept = (select(DeletionTask.id).where(DeletionTask.status.not_in(_UNFINISHED))
+                .order_by(DeletionTask.created_at.desc()).limit(self.history))
+        db.execute(delete(DeletionTask).where(DeletionTask.status.not_in(_UNFINISHED),
+                                              DeletionTask.id.not_in(kept.scalar_subquery()))
+                   .execution_options(synchronize_session=False))
+        db.commit()
+        task.persisted = True
+        return task, True
+
+    def get(self, db: Session, task_id: str) -> Optional[DeletionProgress]:
+        row = db.get(DeletionTask, task_id)
+        return DeletionProgress.from_row(row) if row is not None else None
+
+    def all(self, db: Session) -> List[Dict]:
+        rows = db.scalars(select(DeletionTask).order_by(DeletionTask.created_at))
+        return [DeletionProgress.from_row(row).as_dict() for row in rows]
+
+
+deletion_tasks = DeletionTasks()
+
+
+def _delete_applications(db: Session, condition, batch_size: int, progress: DeletionProgress):
+    """Delete the matching applications a chunk per transaction, adjusting the counters of their jobs.
+
+    The transaction that finds nothing left is not committed, so the caller's next statements run
+    in it, after the last check.
+    """
+    while True:
+        chunk = select(Application.id).where(condition).limit(batch_size)
+        rows = db.execute(delete(Application).where(Application.id.in_(chunk))
+                          .returning(Application.job_id, Application.status)
+                          .execution_options(synchronize_session=False)).all()
+        if not rows:
+            return
+        deltas: Dict[int, Counter] = {}
+        for job_id, status in rows:
+            if status is not None:
+                deltas.setdefault(job_id, Counter())[status] -= 1
+        for job_id in sorted(deltas):
+            adjust_application_counts(db, job_id, deltas[job_id])
+        progress.applications += len(rows)
+        progress.checkpoint(db)
+        db.commit()
+
+
+def _delete_jobs(db: Session, condition, batch_size: int, progress: DeletionProgress):
+    """Delete the matching jobs a chunk at a time: their applications, then counters, the jobs and the change log."""
+    while True:
+        jobs = db.execute(select(Job.id, Job.is_active, Job.employment_type, Job.location)
+                          .where(condition).order_by(Job.id).limit(batch_size)).all()
+        if not jobs:
+            return
+        job_ids = [job.id for job in jobs]
+        _delete_applications(db, Application.job_id.in_(job_ids), batch_size, progress)
+        db.execute(delete(ApplicationCount).where(ApplicationCount.job_id.in_(job_ids)))
+        db.execute(delete(Job).where(Job.id.in_(job_ids)).execution_options(synchronize_session=False))
+        record_job_changes(db, job_ids, JobChangeOperation.DELETED)
+        progress.jobs += len(jobs)
+        progress.checkpoint(db)
+        db.commit()
+        for job_id, is_active, employment_type, location in jobs:
+            job_search_index.remove(job_id)
+            job_facets.apply((bool(is_active), employment_type, location), None)
+        job_response_cache.invalidate()
+
+
+def delete_job_cascade(db: Session, job_id: int, batch_size: int = DELETE_BATCH_SIZE,
+                       progress: Optional[DeletionProgress] = None) -> DeletionProgress:
+    """Delete the job and its applications with set-based statements, never loading the rows."""
+    progress = progress or DeletionProgress('job', job_id)
+    _delete_jobs(db, Job.id == job_id, batch_size, progress)
+    logger.info('Deleted job %s with %s applications', job_id, progress.applications)
+    return progress
+
+
+def delete_user_cascade(db: Session, user_id: int, batch_size: int = DELETE_BATCH_SIZE,
+                        progress: Optional[DeletionProgress] = None) -> DeletionProgress:
+    """Delete the user, their applications and the jobs they posted, with theirs, in committed chunks.
+
+    The user is deactivated first, so they can't sign in or add rows while the chunks run.
+    """
+    progress = progress or DeletionProgress('user', user_id)
+    db.execute(update(User).where(User.id == user_id).values(is_active=False, version=User.version + 1))
+    db.commit()
+    user_cache.invalidate(user_id)
+    _delete_applications(db, Application.applicant_id == user_id, batch_size, progress)
+    _delete_jobs(db, Job.employer_id == user_id, batch_size, progress)
+    db.execute(delete(User).where(User.id == user_id).execution_options(synchronize_session=False))
+    db.commit()
+    user_cache.invalidate(user_id)
+    job_response_cache.invalidate()
+    logger.info('Deleted user %s with %s jobs and %s applications', user_id, progress.jobs, progress.applications)
+    return progress
+
+
+# target -> (column holding the id of the user who owns it, cascade)
+_TARGETS = {'job': (Job.employer_id, delete_job_cascade), 'user': (User.id, delete_user_cascade)}
+
+
+def start_deletion(db: Session, target: str, target_id: int,
+                   requested_by: Optional[int] = None) -> Tuple[DeletionProgress, bool]:
+    """Register a background deletion of an existing job or user; True when it still has to be run.
+
+    `requested_by` must own the target: the user themselves, or the employer who posted the job.
+    None stands for the admin token, which may delete anything.
+    """
+    owner_column, _ = _TARGETS[target]
+    model = owner_column.class_
+    owner_id = db.scalar(select(owner_column).where(model.id == target_id))
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail=f'{target.capitalize()} not found')
+    if requested_by is not None and owner_id != requested_by:
+        raise HTTPException(status_code=403, detail=f'Not allowed to delete this {target}')
+    return deletion_tasks.create(db, target, target_id, requested_by)
+
+
+def get_deletion(db: Session, task_id: str, requested_by: Optional[int] = None) -> DeletionProgress:
+    """The task, if `requested_by` started it or is None for the admin token; 404 otherwise."""
+    task = deletion_tasks.get(db, task_id)
+    if task is None or (requested_by is not None and task.requested_by != requested_by):
+        raise HTTPException(status_code=404, detail='Deletion task not found')
+    return task
+
+
+def get_deletions(db: Session) -> List[Dict]:
+    return deletion_tasks.all(db)
+
+
+def run_deletion(task: DeletionProgress, batch_size: int = DELETE_BATCH_SIZE,
+                 session_factory: Callable[[], Session] = SessionLocal):
+    """Run a task from `deletion_tasks` to completion in its own session; meant for BackgroundTasks.
+
+    Chunks that committed stay deleted if it fails; deleting the target again picks up the rest.
+    """
+    with session_factory() as db:
+        try:
+            task.status = 'running'
+            task.started_at = datetime.utcnow()
+            task.checkpoint(db)
+            db.commit()
+            _, cascade = _TARGETS[task.target]
+            cascade(db, task.target_id, batch_size, task)
+            task.status = 'done'
+        except Exception as e:
+            db.rollback()
+            task.status = 'failed'
+            task.error = str(e)
+            logger.error('Background deletion of %s %s failed: %s', task.target, task.target_id, e)
+        finally:
+            task.finished_at = datetime.utcnow()
+            try:
+                task.checkpoint(db)
+                db.commit()
+            except Exception as e:
+                logger.error('Could not record the end of deletion task %s: %s', task.id, e)
@@ -0,0 +1,30 @@
+from typing import Callable, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+# sync service function -> native async implementation
+_async_variants: Dict[Callable, Callable] = {}
+
+
+def async_variant(sync_function: Callable):
+    """Register the decorated coroutine as the AsyncSession implementation of `sync_function`."""
+    def register(async_function: Callable) -> Callable:
+        _async_variants[sync_function] = async_function
+        return async_function
+    return register
+
+
+async def call_service(function: Callable, db, *args, **kwargs):
+    """Run a sync service function against whichever session the request got from `get_db`.
+
+    With an AsyncSession the registered async variant is awaited; functions without one run through
+    AsyncSession.run_sync, which drives the sync code on the async driver without a worker thread.
+    With a sync Session the call goes to the threadpool, exactly like a sync `def` route would.
+    """
+    if isinstance(db, AsyncSession):
+        variant = _async_variants.get(function)
+        if variant is not None:
+            return await variant(db, *args, **kwargs)
+        return await db.run_sync(function, *args, **kwargs)
+    return await run_in_threadpool(function, db, *args, **kwargs)
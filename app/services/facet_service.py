@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.job import Job, EmploymentType
+from ..utils.utilities import logger_setup, get_key
+
+logger = logger_setup(__name__)
+
+# Writes from other workers only reach this process on the next refresh
+FACET_REFRESH_SECONDS = int(get_key('FACET_REFRESH_SECONDS', '300'))
+
+# (is_active, employment_type, location) of a job, or None when the job does not exist
+FacetState = Optional[Tuple[bool, EmploymentType, str]]
+
+
+def facet_state(job: Optional[Job]) -> FacetState:
+    if job is None:
+        return None
+    return bool(job.is_active), job.employment_type, job.location
+
+
+class JobFacets:
+    """Active-job counts per employment type and location, kept current by the job service.
+
+    Seeded with one GROUP BY and then adjusted incrementally on every create/update/delete, so
+    reading facets never touches the database until the refresh interval expires.
+    """
+
+    def __init__(self, refresh_seconds: int = FACET_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.employment_types: Counter = Counter()
+        self.locations: Counter = Counter()
+        self.loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.refresh_seconds
+
+    def refresh(self, db: Session):
+        rows = (db.query(Job.employment_type, Job.location, func.count(Job.id))
+                .filter(Job.is_active.is_(True))
+                .group_by(Job.employment_type, Job.location).all())
+        employment_types, locations = Counter(), Counter()
+        for employment_type, location, count in rows:
+            employment_types[employment_type] += count
+            locations[location] += count
+        with self._lock:
+            self.employment_types, self.locations = employment_types, locations
+            self.loaded_at = time.monotonic()
+        logger.info('Refreshed job facets from %s groups', len(rows))
+
+    def apply(self, before: FacetState, after: FacetState):
+        """Move one job's contribution from its `before` state to its `after` state."""
+        if self.loaded_at is None or before == after:
+            return
+        with self._lock:
+            if before is not None and before[0]:
+                self._add(before[1], before[2], -1)
+            if after is not None and after[0]:
+                self._add(after[1], after[2], 1)
+
+    def _add(self, employment_type: EmploymentType, location: str, delta: int):
+        self.employment_types[employment_type] += delta
+        self.locations[location] += delta
+        if self.employment_types[employment_type] <= 0:
+            del self.employment_types[employment_type]
+        if self.locations[location] <= 0:
+            del self.locations[location]
+
+    def snapshot(self, db: Session, top_locations: int = 10) -> Tuple[Dict[str, int], List[Tuple[str, int]]]:
+        if self._stale():
+            self.refresh(db)
+        with self._lock:
+            employment_types = {
+                employment_type.value: self.employment_types.get(employment_type, 0)
+                for employment_type in EmploymentType
+            }
+            locations = self.locations.most_common(top_locations)
+        return employment_types, locations
+
+
+job_facets = JobFacets()
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session, aliased
+from fastapi import HTTPException, status
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import delete, exists, func, insert, select, text, update
+from ..models.job import Job
+from ..models.job_change import JobChange, JobChangeCompaction, JobChangeOperation
+from ..schemas.job import JobPublic
+from ..utils.pagination import decode_cursor, encode_cursor
+from ..utils.utilities import logger_setup, get_key
+from typing import Dict, Iterable, Optional
+
+logger = logger_setup(__name__)
+
+# Changes older than this are compacted to the latest one per job
+JOB_CHANGE_RETENTION_DAYS = float(get_key('JOB_CHANGE_RETENTION_DAYS', '7'))
+# Tombstones older than this are purged; feed tokens from before a purged tombstone get 410
+JOB_CHANGE_TOMBSTONE_DAYS = float(get_key('JOB_CHANGE_TOMBSTONE_DAYS', '30'))
+JOB_CHANGE_COMPACTION_BATCH = int(get_key('JOB_CHANGE_COMPACTION_BATCH', '1000'))
+
+# Advisory lock serializing change-log writers on Postgres until they commit
+JOB_CHANGE_LOCK_ID = 7316021
+
+JOB_CHANGE_KEYS = (JobChange.id,)
+
+
+def handle_db_error(error: Exception):
+    logger.error('Database error: %s', error)
+    raise HTTPException(status_code=500, detail='Internal server error')
+
+
+def record_job_changes(db: Session, job_ids: Iterable[int], operation: JobChangeOperation):
+    """Append a change for each job in the caller's transaction; commit is left to the caller.
+
+    Feed positions come from a sequence in the order they are allocated, not the order their
+    transactions commit, so a reader could pass a position that becomes visible later. On Postgres
+    writers hold an advisory lock from here to commit, which makes the two orders the same; SQLite
+    already allows one writer at a time.
+    """
+    rows = [{'job_id': job_id, 'operation': operation} for job_id in job_ids]
+    if not rows:
+        return
+    if db.get_bind().dialect.name == 'postgresql':
+        db.execute(text('SELECT pg_advisory_xact_lock(:id)'), {'id': JOB_CHANGE_LOCK_ID})
+    db.execute(insert(JobChange), rows)
+
+
+def latest_job_change(db: Session) -> int:
+    """Position of the newest change in the log, 0 when it is empty."""
+    return db.scalar(select(func.max(JobChange.id))) or 0
+
+
+def _horizon(db: Session) -> int:
+    return db.scalar(select(func.max(JobChangeCompaction.horizon))) or 0
+
+
+def get_job_changes(db: Session, since: Optional[str] = None, limit: int = 100) -> Dict:
+    """Up to `limit` changes after the `since` token, oldest first, and the token to continue from.
+
+    A job changed more than once in the page is listed once, at its last change, with its current
+    state. Changes to jobs deleted since are skipped; their tombstone follows.
+    """
+    try:
+        position = decode_cursor(since, JOB_CHANGE_KEYS)[0] if since else 0
+        if position and position < _horizon(db):
+            raise HTTPException(status_code=status.HTTP_410_GONE,
+                                detail='Change token has expired; read the feed again from the start')
+        rows = db.execute(select(JobChange, Job).outerjoin(Job, Job.id == JobChange.job_id)
+                          .where(JobChange.id > position).order_by(JobChange.id).limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        latest = {}
+        for change, job in rows:
+            latest.pop(change.job_id, None)
+            latest[change.job_id] = (change, job)
+        changes = []
+        for change, job in latest.values():
+            deleted = change.operation is JobChangeOperation.DELETED
+            if job is None and not deleted:
+                continue
+            changes.append({
+                'token': encode_cursor([change.id]),
+                'job_id': change.job_id,
+                'operation': change.operation.value,
+                'changed_at': change.changed_at,
+                'job': None if deleted else JobPublic.model_validate(job, from_attributes=True),
+            })
+        next_position = rows[-1][0].id if rows else position
+        return {'changes': changes, 'next': encode_cursor([next_position]), 'has_more': has_more}
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving job changes since: %s: error: %s', since, e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+def compact_job_changes(db: Session, retention_days: float = JOB_CHANGE_RETENTION_DAYS,
+                        tombstone_days: float = JOB_CHANGE_TOMBSTONE_DAYS,
+                        batch_size: int = JOB_CHANGE_COMPACTION_BATCH) -> Dict[str, int]:
+    """Drop changes past retention that a later change to the same job supersedes, then old tombstones.
+
+    Walks the log in feed order, one transaction per batch, and stops at the first change inside
+    the retention window. Reading from the start still lists every current job afterwards. The
+    horizon moves in the same transaction as the tombstones it covers.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=retention_days)
+    tombstone_cutoff = now - timedelta(days=max(tombstone_days, retention_days))
+    newer = aliased(JobChange)
+    run = JobChangeCompaction(superseded_removed=0, tombstones_removed=0, horizon=_horizon(db))
+    db.add(run)
+    db.commit()
+
+    last_id = 0
+    while True:
+        batch = db.execute(select(JobChange.id, JobChange.changed_at).where(JobChange.id > last_id)
+                           .order_by(JobChange.id).limit(batch_size)).all()
+        expired = [change_id for change_id, changed_at in batch if changed_at < cutoff]
+        if not expired:
+            break
+        superseded = db.execute(
+            delete(JobChange)
+            .where(JobChange.id.in_(expired),
+                   exists().where(newer.job_id == JobChange.job_id, newer.id > JobChange.id))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        tombstones = list(db.scalars(select(JobChange.id).where(
+            JobChange.id.in_(expired), JobChange.operation == JobChangeOperation.DELETED,
+            JobChange.changed_at < tombstone_cutoff)))
+        if tombstones:
+            db.execute(delete(JobChange).where(JobChange.id.in_(tombstones))
+                       .execution_options(synchronize_session=False))
+        db.execute(update(JobChangeCompaction).where(JobChangeCompaction.id == run.id).values(
+            superseded_removed=JobChangeCompaction.superseded_removed + superseded,
+            tombstones_removed=JobChangeCompaction.tombstones_removed + len(tombstones),
+            horizon=max([run.horizon, *tombstones]),
+        ))
+        db.commit()
+        if len(expired) < len(batch):
+            break
+        last_id = expired[-1]
+
+    db.refresh(run)
+    report = {'superseded_removed': run.superseded_removed, 'tombstones_removed': run.tombstones_removed,
+              'horizon': run.horizon}
+    logger.info('Compacted job changes: %s superseded and %s tombstones removed, horizon %s',
+                report['superseded_removed'], report['tombstones_removed'], report['horizon'])
+    return report
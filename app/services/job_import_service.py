@@ -0,0 +1,143 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from .dispatch import call_service
+from .job_service import bulk_create_jobs, iter_jobs
+from ..database import SessionLocal
+from ..schemas.job import JobCreate, JobPublic
+from ..utils.serialization import render_rows
+from ..utils.utilities import logger_setup, get_key
+
+logger = logger_setup(__name__)
+
+# Rows validated and inserted per executemany; each chunk is its own transaction
+JOB_IMPORT_CHUNK_SIZE = int(get_key('JOB_IMPORT_CHUNK_SIZE', '1000'))
+# Per-row errors reported back; the failed count stays exact past this
+JOB_IMPORT_MAX_ERRORS = int(get_key('JOB_IMPORT_MAX_ERRORS', '1000'))
+JOB_EXPORT_BATCH_SIZE = int(get_key('JOB_EXPORT_BATCH_SIZE', '1000'))
+
+CSV_CONTENT_TYPES = ('text/csv', 'application/csv')
+
+# A parsed record: (1-based row number, raw fields) or (row number, parse error)
+Record = Tuple[int, Optional[Dict], Optional[str]]
+
+
+async def _lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = ''
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split('\n')
+        for line in complete:
+            yield line.removesuffix('\r')
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending.removesuffix('\r')
+
+
+async def parse_ndjson(stream: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    number = 0
+    async for line in _lines(stream):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            yield number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(fields, dict):
+            yield number, None, 'Expected a JSON object'
+            continue
+        yield number, fields, None
+
+
+async def parse_csv(stream: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    header, number, record = None, 0, []
+    async for line in _lines(stream):
+        record.append(line)
+        # A quoted field may span lines; a record is complete once its quotes balance
+        text = '\n'.join(record)
+        if text.count('"') % 2:
+            continue
+        record = []
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        number += 1
+        if len(values) != len(header):
+            yield number, None, f'Expected {len(header)} columns, got {len(values)}'
+            continue
+        yield number, dict(zip(header, values)), None
+    if record:
+        yield number + 1, None, 'Unterminated quoted field'
+
+
+def validate_job_row(fields: Dict) -> Tuple[Optional[Dict], List[str]]:
+    try:
+        job = JobCreate.model_validate(fields)
+    except ValidationError as e:
+        return None, [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()]
+    return job.model_dump(), []
+
+
+async def import_jobs(db: Session, records: AsyncIterator[Record], employer_id: int) -> Dict:
+    result = {'inserted': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+
+    def fail(number: int, messages: List[str]):
+        result['failed'] += 1
+        if len(result['errors']) < JOB_IMPORT_MAX_ERRORS:
+            result['errors'].append({'row': number, 'errors': messages})
+        else:
+            result['errors_truncated'] = True
+
+    async def flush(chunk: List[Tuple[int, Dict]]):
+        try:
+            job_ids = await call_service(bulk_create_jobs, db, [row for _, row in chunk], employer_id)
+            result['inserted'] += len(job_ids)
+        except HTTPException as e:
+            for number, _ in chunk:
+                fail(number, [f'Not inserted: {e.detail}'])
+
+    chunk: List[Tuple[int, Dict]] = []
+    async for number, fields, error in records:
+        if error is not None:
+            fail(number, [error])
+            continue
+        row, errors = validate_job_row(fields)
+        if errors:
+            fail(number, errors)
+            continue
+        chunk.append((number, row))
+        if len(chunk) >= JOB_IMPORT_CHUNK_SIZE:
+            await flush(chunk)
+            chunk = []
+    if chunk:
+        await flush(chunk)
+
+    logger.info("Imported %s jobs for employer %s, %s rows failed", result['inserted'], employer_id, result['failed'])
+    return result
+
+
+def export_jobs_ndjson(is_active: Optional[bool] = None,
+                       session_factory: Callable[[], Session] = SessionLocal) -> Iterator[bytes]:
+    """NDJSON lines for every job, read in keyset batches on a session owned by the stream.
+
+    The request's session is closed before a streaming body is sent, so the export opens its own,
+    from `session_factory` (a replica's when one is available).
+    """
+    db = session_factory()
+    try:
+        for batch in iter_jobs(db, batch_size=JOB_EXPORT_BATCH_SIZE, is_active=is_active):
+            yield b''.join(render_rows(JobPublic, batch))
+    finally:
+        db.close()
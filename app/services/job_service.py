@@ -1,99 +1,348 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from sqlalchemy.exc import SQLAlchemyError
-from ..models.job import Job
-from ..schemas.job import JobCreate, JobUpdate
-from ..utils.utilities import logger_setup
+from sqlalchemy import Select, func, insert, select, text
+from ..models.job import Job, EmploymentType, job_search_vector
+from ..models.job_change import JobChange, JobChangeOperation
+from ..models.user import User
+from ..schemas.job import JobCreate, JobUpdate, JobSort
+from .deletion_service import DELETE_BATCH_SIZE, delete_job_cascade
+from .facet_service import job_facets, facet_state
+from .job_change_service import latest_job_change, record_job_changes
+from .search_service import job_search_index
+from ..utils.loading import loader_options, load_rendered
+from ..utils.pagination import keyset_page
+from ..utils.response_cache import job_response_cache
+from ..utils.versioning import (
+    VERSIONED_UPDATE_ATTEMPTS, check_version, has_changes, raise_missed_update, versioned_update
+)
+from ..utils.utilities import logger_setup, get_key
+from pydantic import BaseModel
+from typing import Dict, Iterator, List, Optional, Tuple, Type
 
 logger = logger_setup(__name__)
 
+# Job changes a search applies to the fallback index before it rebuilds the index instead
+SEARCH_INDEX_CATCH_UP = int(get_key('SEARCH_INDEX_CATCH_UP', '10000'))
+
+# Sort keys for cursor pagination; `id` is the primary key so every page is an index range scan
+JOB_PAGE_KEYS = (Job.id,)
+
+# Sort option -> (keys, descending). created_at ties are broken by id so cursors stay unique.
+JOB_SORT_KEYS = {
+    JobSort.ID: (JOB_PAGE_KEYS, False),
+    JobSort.CREATED_AT: ((Job.created_at, Job.id), False),
+    JobSort.NEWEST: ((Job.created_at, Job.id), True),
+}
+
 
 def handle_db_error(error: Exception):
-    logger.error(f'Database error: {error}')
+    logger.error('Database error: %s', error)
     raise HTTPException(status_code=500, detail='Internal server error')
 
 
-def get_job_by_id(db: Session, job_id: int) -> Job:
+def select_job_by_id(job_id: int, schema: Optional[Type[BaseModel]] = None) -> Select:
+    return select(Job).options(*loader_options(Job, schema)).where(Job.id == job_id)
+
+
+def select_jobs(skip: int = 0, limit: int = 10, cursor: Optional[str] = None,
+                schema: Optional[Type[BaseModel]] = None, employment_type: Optional[EmploymentType] = None,
+                location: Optional[str] = None, is_active: Optional[bool] = None, sort: JobSort = JobSort.ID) -> Select:
+    statement = select(Job).options(*loader_options(Job, schema))
+    if is_active is not None:
+        statement = statement.where(Job.is_active == is_active)
+    if employment_type is not None:
+        statement = statement.where(Job.employment_type == employment_type)
+    if location is not None:
+        statement = statement.where(Job.location == location)
+
+    keys, descending = JOB_SORT_KEYS[sort]
+    if cursor is not None:
+        return keyset_page(statement, keys, cursor, limit, descending=descending)
+    order_by = [key.desc() for key in keys] if descending else keys
+    return statement.order_by(*order_by).offset(skip).limit(limit)
+
+
+def select_job_versions(statement: Select) -> Select:
+    """Narrow a job query to what decides its rendered output: the job's and its employer's row versions.
+
+    `version` is bumped by every update, so two writes within one timestamp tick still change it.
+    """
+    return (statement.with_only_columns(Job.id, Job.version, Job.updated_at, User.version, User.updated_at,
+                                        maintain_column_froms=False)
+            .join(User, Job.employer_id == User.id))
+
+
+def get_job_by_id(db: Session, job_id: int, schema: Optional[Type[BaseModel]] = None) -> Job:
     try:
-        job = db.query(Job).filter(Job.id == job_id).first()
+        job = db.scalars(select_job_by_id(job_id, schema)).first()
         if job is None:
-            logger.info(f'Job with id {job_id} not found')
+            logger.info('Job with id %s not found', job_id)
             raise HTTPException(status_code=404, detail='Job not found')
         return job
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error retrieving job with id: {job_id}: error: {e}')
+        logger.error('Unexpected error retrieving job with id: %s: error: %s', job_id, e)
         raise HTTPException(status_code=500, detail='Unexpected error')
 
 
-def get_all_jobs(db: Session, skip: int = 0, limit: int = 10):
+def get_all_jobs(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None,
+                 schema: Optional[Type[BaseModel]] = None, employment_type: Optional[EmploymentType] = None,
+                 location: Optional[str] = None, is_active: Optional[bool] = None, sort: JobSort = JobSort.ID):
     try:
-        return db.query(Job).offset(skip).limit(limit).all()
+        statement = select_jobs(skip=skip, limit=limit, cursor=cursor, schema=schema, employment_type=employment_type,
+                                location=location, is_active=is_active, sort=sort)
+        return db.scalars(statement).all()
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error retrieving all jobs: error: {e}')
+        logger.error('Unexpected error retrieving all jobs: error: %s', e)
         raise HTTPException(status_code=500, detail='Unexpected error')
 
 
-def create_job(db: Session, job_data: JobCreate, employer_id: int) -> Job:
+def get_job_version(db: Session, job_id: int) -> List[Tuple]:
+    try:
+        version = db.execute(select_job_versions(select_job_by_id(job_id))).first()
+        if version is None:
+            logger.info('Job with id %s not found', job_id)
+            raise HTTPException(status_code=404, detail='Job not found')
+        return [tuple(version)]
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving version of job with id: %s: error: %s', job_id, e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+def get_job_versions(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None,
+                     employment_type: Optional[EmploymentType] = None, location: Optional[str] = None,
+                     is_active: Optional[bool] = None, sort: JobSort = JobSort.ID) -> List[Tuple]:
+    try:
+        statement = select_jobs(skip=skip, limit=limit, cursor=cursor, employment_type=employment_type,
+                                location=location, is_active=is_active, sort=sort)
+        return [tuple(row) for row in db.execute(select_job_versions(statement))]
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving job versions: error: %s', e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+def create_job(db: Session, job_data: JobCreate, employer_id: int, schema: Optional[Type[BaseModel]] = None) -> Job:
     try:
         new_job = Job(**job_data.dict(), employer_id=employer_id)
         db.add(new_job)
+        db.flush()
+        record_job_changes(db, [new_job.id], JobChangeOperation.CREATED)
         db.commit()
         db.refresh(new_job)
-        logger.info(f'Created new job with ID: {new_job.id}')
-        return new_job
+        _index_job(new_job)
+        job_facets.apply(None, facet_state(new_job))
+        job_response_cache.invalidate()
+        logger.info('Created new job with ID: %s', new_job.id)
+        return load_rendered(new_job, schema)
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error creating job: error: {e}')
+        logger.error('Unexpected error creating job: error: %s', e)
         raise HTTPException(status_code=500, detail='Unexpected error')
 
 
-def update_job(db: Session, job_id: int, update_data: JobUpdate) -> Job:
+def bulk_create_jobs(db: Session, rows: List[Dict], employer_id: int) -> List[int]:
+    """Insert already-validated job rows in one executemany and return their new ids in row order."""
     try:
-        job_to_update = get_job_by_id(db, job_id)
-        if not job_to_update:
-            raise HTTPException(status_code=404, detail='Job not found')
+        rows = [dict(row, employer_id=employer_id) for row in rows]
+        job_ids = db.scalars(insert(Job).returning(Job.id, sort_by_parameter_order=True), rows).all()
+        record_job_changes(db, job_ids, JobChangeOperation.CREATED)
+        db.commit()
+        for job_id, row in zip(job_ids, rows):
+            if job_search_index.built and row.get('is_active', True):
+                job_search_index.add(job_id, row['title'], row['description'], row['location'])
+            job_facets.apply(None, (row.get('is_active', True), row['employment_type'], row['location']))
+        job_response_cache.invalidate()
+        logger.info('Bulk created %s jobs for employer with ID: %s', len(job_ids), employer_id)
+        return job_ids
+    except SQLAlchemyError as error:
+        db.rollback()
+        handle_db_error(error)
+    except Exception as e:
+        db.rollback()
+        logger.error('Unexpected error bulk creating jobs: error: %s', e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
 
-        for key, value in update_data.dict(exclude_unset=True).items():
-            setattr(job_to_update, key, value)
+def iter_jobs(db: Session, batch_size: int = 1000, is_active: Optional[bool] = None) -> Iterator[List[Job]]:
+    """Yield every job in id order, one keyset batch at a time, without holding earlier batches."""
+    statement = select(Job).order_by(Job.id).limit(batch_size)
+    if is_active is not None:
+        statement = statement.where(Job.is_active == is_active)
+    last_id = None
+    while True:
+        batch_statement = statement if last_id is None else statement.where(Job.id > last_id)
+        batch = db.scalars(batch_statement).all()
+        if not batch:
+            return
+        last_id = batch[-1].id
+        yield batch
+        db.expunge_all()
+
+
+def update_job(db: Session, job_id: int, update_data: JobUpdate, schema: Optional[Type[BaseModel]] = None,
+               version: Optional[int] = None) -> Job:
+    """Apply `update_data` in three statements: a read, a conditional UPDATE ... RETURNING, the change log.
+
+    The read loads what the response embeds and the facet state before the change. The UPDATE only
+    matches the version that was read; the expected `version` (If-Match, else the body) must be it.
+    The change-log insert takes a fourth statement on Postgres, for its lock. A write that lost a
+    race without an expected version reads and updates again, up to VERSIONED_UPDATE_ATTEMPTS times.
+    """
+    try:
+        values = update_data.model_dump(exclude_unset=True, exclude={'version'})
+        expected = version if version is not None else update_data.version
+        for _ in range(VERSIONED_UPDATE_ATTEMPTS):
+            job_to_update = db.scalars(select_job_by_id(job_id, schema)).first()
+            if job_to_update is None:
+                raise HTTPException(status_code=404, detail='Job not found')
+            check_version(job_to_update, expected, 'Job')
+            if not has_changes(job_to_update, values):
+                return load_rendered(job_to_update, schema)
+            before = facet_state(job_to_update)
+            if versioned_update(db, Job, job_id, values, job_to_update.version) is not None:
+                break
+            # Changed since the read: a conflict if the caller named a version, otherwise read again
+            db.rollback()
+            if expected is not None:
+                raise_missed_update(db, Job, job_id, 'Job')
+        else:
+            raise_missed_update(db, Job, job_id, 'Job')
+
+        record_job_changes(db, [job_id], JobChangeOperation.UPDATED)
+        load_rendered(job_to_update, schema)
+        # Detached objects keep their loaded state through the commit, so rendering needs no reload
+        db.expunge_all()
         db.commit()
-        db.refresh(job_to_update)
-        logger.info(f'Updated job with ID: {job_id}')
+        _index_job(job_to_update)
+        job_facets.apply(before, facet_state(job_to_update))
+        job_response_cache.invalidate()
+        logger.info('Updated job with ID: %s to version %s', job_id, job_to_update.version)
         return job_to_update
 
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error updating job with ID: {job_id}: error: {e}')
+        logger.error('Unexpected error updating job with ID: %s: error: %s', job_id, e)
         raise HTTPException(status_code=500, detail='Unexpected error')
 
 
-def delete_job(db: Session, job_id: int):
+def delete_job(db: Session, job_id: int, batch_size: int = DELETE_BATCH_SIZE):
     try:
-        job_to_delete = get_job_by_id(db, job_id)
-        if not job_to_delete:
+        if db.scalar(select(Job.id).where(Job.id == job_id)) is None:
             raise HTTPException(status_code=404, detail='Job not found')
+        delete_job_cascade(db, job_id, batch_size)
+        logger.info('Deleted job with ID: %s', job_id)
 
-        db.delete(job_to_delete)
-        db.commit()
-        logger.info(f'Deleted job with ID: {job_id}')
+    except HTTPException:
+        raise
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error deleting job with ID: %s: error: %s', job_id, e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+def get_jobs_by_employer(db: Session, employer_id: int, skip: int = 0, limit: int = 10,
+                         schema: Optional[Type[BaseModel]] = None):
+    try:
+        return (db.query(Job).options(*loader_options(Job, schema))
+                .filter(Job.employer_id == employer_id).offset(skip).limit(limit).all())
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error retrieving jobs by employer with ID: %s: error: %s', employer_id, e)
+        raise HTTPException(status_code=500, detail='Unexpected error')
+
+
+def _index_job(job: Job):
+    # Only the in-process fallback index needs maintaining; Postgres keeps its GIN index itself
+    if not job_search_index.built:
+        return
+    if job.is_active:
+        job_search_index.add(job.id, job.title, job.description, job.location)
+    else:
+        job_search_index.remove(job.id)
+
+
+def _ensure_search_index(db: Session):
+    """Build the fallback index on first use, then catch it up on jobs written by any worker since.
+
+    The job change log is the version check: one range read on its primary key, empty unless jobs
+    changed. Too long a backlog, or SEARCH_INDEX_REBUILD_SECONDS passing, rebuilds the index.
+    """
+    if not job_search_index.stale():
+        changes = db.execute(
+            select(JobChange.id, JobChange.job_id, Job.title, Job.description, Job.location, Job.is_active)
+            .outerjoin(Job, Job.id == JobChange.job_id)
+            .where(JobChange.id > job_search_index.position)
+            .order_by(JobChange.id).limit(SEARCH_INDEX_CATCH_UP + 1)
+        ).all()
+        if len(changes) <= SEARCH_INDEX_CATCH_UP:
+            # Each row carries the job's current state, so replaying them in any order is safe
+            for _, job_id, title, description, location, is_active in changes:
+                if is_active:
+                    job_search_index.add(job_id, title, description, location)
+                else:
+                    job_search_index.remove(job_id)
+            if changes:
+                job_search_index.advance(changes[-1].id)
+            return
+    # Read the position first: changes committed while the rows stream in are applied again later
+    position = latest_job_change(db)
+    rows = (db.query(Job.id, Job.title, Job.description, Job.location)
+            .filter(Job.is_active.is_(True)).yield_per(1000))
+    job_search_index.rebuild(rows, position)
+
+
+def search_jobs(db: Session, query: str, skip: int = 0, limit: int = 10,
+                schema: Optional[Type[BaseModel]] = None):
+    try:
+        jobs = db.query(Job).options(*loader_options(Job, schema)).filter(Job.is_active.is_(True))
+        if db.get_bind().dialect.name == 'postgresql':
+            ts_query = func.websearch_to_tsquery(text("'english'"), query)
+            return (jobs.filter(job_search_vector.op('@@')(ts_query))
+                    .order_by(func.ts_rank_cd(job_search_vector, ts_query).desc(), Job.id)
+                    .offset(skip).limit(limit).all())
 
+        _ensure_search_index(db)
+        ranked = [job_id for job_id, _ in job_search_index.search(query, skip=skip, limit=limit)]
+        if not ranked:
+            return []
+        by_id = {job.id: job for job in jobs.filter(Job.id.in_(ranked))}
+        return [by_id[job_id] for job_id in ranked if job_id in by_id]
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error deleting job with ID: {job_id}: error: {e}')
+        logger.error('Unexpected error searching jobs for: %s: error: %s', query, e)
         raise HTTPException(status_code=500, detail='Unexpected error')
 
 
-def get_jobs_by_employer(db: Session, employer_id: int, skip: int = 0, limit: int = 10):
+def get_job_facets(db: Session, top_locations: int = 10):
     try:
-        return db.query(Job).filter(Job.employer_id == employer_id).offset(skip).limit(limit).all()
+        employment_types, locations = job_facets.snapshot(db, top_locations=top_locations)
+        return {
+            'employment_types': employment_types,
+            'locations': [{'location': location, 'count': count} for location, count in locations],
+        }
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error retrieving jobs by employer with ID: {employer_id}: error: {e}')
+        logger.error('Unexpected error retrieving job facets: error: %s', e)
         raise HTTPException(status_code=500, detail='Unexpected error')
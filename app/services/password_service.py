@@ -0,0 +1,61 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from ..utils.utilities import get_key
+
+# Changing the cost rehashes each user's password on their next successful login
+BCRYPT_ROUNDS = int(get_key('BCRYPT_ROUNDS', '12'))
+
+# bcrypt releases the GIL, so a few threads use that many cores; the cap keeps a login storm from
+# starving the rest of the worker
+PASSWORD_HASH_WORKERS = int(get_key('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+
+@lru_cache(maxsize=None)
+def pwd_context():
+    """Configuration for password hashing; hashes at any other cost are reported as needing an update.
+
+    Built on first use so importing the app doesn't pay for passlib and its bcrypt backend.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=BCRYPT_ROUNDS,
+        bcrypt__min_rounds=BCRYPT_ROUNDS,
+        bcrypt__max_rounds=BCRYPT_ROUNDS,
+    )
+
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context().verify(plain_password, hashed_password)
+
+
+def get_password_hash(password: str) -> str:
+    return pwd_context().hash(password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and, if its hash uses an outdated cost, return a replacement hash as well."""
+    return pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_executor, get_password_hash, password)
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await asyncio.get_running_loop().run_in_executor(
+        _executor, verify_and_update, plain_password, hashed_password
+    )
+
+
+def shutdown_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,132 @@
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..utils.utilities import logger_setup, get_key
+
+logger = logger_setup(__name__)
+
+# Full rebuild interval of the fallback index; between rebuilds each search applies the job change log.
+# Keep it below JOB_CHANGE_RETENTION_DAYS so compaction never drops a change the index hasn't seen.
+SEARCH_INDEX_REBUILD_SECONDS = int(get_key('SEARCH_INDEX_REBUILD_SECONDS', '3600'))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in is it of on or that the to with we you our your will".split()
+)
+# Title matches count more than the same term buried in a long description
+TITLE_WEIGHT = 3
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class InvertedIndex:
+    """In-process BM25 index over job title, description and location.
+
+    Used when the database has no native full-text search (SQLite). Postings map a term to
+    {job_id: term frequency}; a query only walks the postings of its own terms. `position` is the
+    last job change-log entry the index reflects, so writes by other workers can be caught up on.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, rebuild_seconds: int = SEARCH_INDEX_REBUILD_SECONDS):
+        self.k1 = k1
+        self.b = b
+        self.rebuild_seconds = rebuild_seconds
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self.total_length = 0
+        self.position = 0
+        self.built_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+    @property
+    def built(self) -> bool:
+        return self.built_at is not None
+
+    def stale(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > self.rebuild_seconds
+
+    def _terms(self, title: str, description: str, location: str) -> Counter:
+        terms = Counter(tokenize(description or ""))
+        terms.update(tokenize(location or ""))
+        for token in tokenize(title or ""):
+            terms[token] += TITLE_WEIGHT
+        return terms
+
+    def add(self, job_id: int, title: str, description: str, location: str):
+        terms = self._terms(title, description, location)
+        with self._lock:
+            self._remove(job_id)
+            for term, frequency in terms.items():
+                self.postings.setdefault(term, {})[job_id] = frequency
+            length = sum(terms.values())
+            self.doc_lengths[job_id] = length
+            self.doc_terms[job_id] = tuple(terms)
+            self.total_length += length
+
+    def remove(self, job_id: int):
+        with self._lock:
+            self._remove(job_id)
+
+    def _remove(self, job_id: int):
+        length = self.doc_lengths.pop(job_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.doc_terms.pop(job_id, ()):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(job_id, None)
+                if not docs:
+                    del self.postings[term]
+
+    def advance(self, position: int):
+        """Record that the changes up to `position` are in the index."""
+        with self._lock:
+            self.position = max(self.position, position)
+
+    def rebuild(self, rows: Iterable[Tuple[int, str, str, str]], position: int = 0):
+        """Replace the contents with `rows`, read after change-log `position`.
+
+        The new postings are built aside and swapped in, so searches keep running meanwhile. Writes
+        made during the build are picked up again from the change log after `position`.
+        """
+        fresh = InvertedIndex(self.k1, self.b)
+        for job_id, title, description, location in rows:
+            fresh.add(job_id, title, description, location)
+        with self._lock:
+            self.postings, self.doc_lengths, self.doc_terms = fresh.postings, fresh.doc_lengths, fresh.doc_terms
+            self.total_length = fresh.total_length
+            self.position = position
+            self.built_at = time.monotonic()
+        logger.info('Built job search index with %s documents and %s terms',
+                    len(fresh.doc_lengths), len(fresh.postings))
+
+    def search(self, query: str, skip: int = 0, limit: int = 10) -> List[Tuple[int, float]]:
+        terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self.doc_lengths)
+            if not terms or not doc_count:
+                return []
+            average_length = self.total_length / doc_count
+            scores: Dict[int, float] = {}
+            for term in terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for job_id, frequency in docs.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[job_id] / average_length)
+                    scores[job_id] = scores.get(job_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        ranked = heapq.nlargest(skip + limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return ranked[skip:]
+
+
+job_search_index = InvertedIndex()
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from ..schemas.user import User as UserSchema
+from ..utils.utilities import logger_setup, get_key
+
+logger = logger_setup(__name__)
+
+USER_CACHE_BACKEND = get_key('USER_CACHE_BACKEND', 'memory')
+USER_CACHE_TTL = int(get_key('USER_CACHE_TTL', '60'))
+USER_CACHE_SIZE = int(get_key('USER_CACHE_SIZE', '10000'))
+REDIS_URL = get_key('REDIS_URL', 'redis://localhost:6379/0')
+
+
+class CacheBackend:
+    """Minimal key/value interface the user cache needs; values are JSON-serializable dicts."""
+
+    def get(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: dict, ttl: int):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU with expiry. Invalidations only reach the worker that made the change; the TTL bounds
+    how long other workers can serve a stale entry."""
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisBackend(CacheBackend):
+    """Shared across workers, so an invalidation is visible everywhere immediately."""
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = 'user-cache:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('USER_CACHE_BACKEND=redis requires the "redis" package') from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[dict]:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: dict, ttl: int):
+        self.client.setex(self.prefix + key, ttl, json.dumps(value))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+
+class UserCache:
+    """Authenticated user snapshots keyed by the token subject (username).
+
+    A second key maps the user id back to the username so update/delete, which only know the id,
+    can drop the entry even after a username change.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int = USER_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, username: str) -> Optional[UserSchema]:
+        try:
+            snapshot = self.backend.get(f'name:{username}')
+        except Exception as e:
+            logger.warning('User cache read failed: %s', e)
+            snapshot = None
+        if snapshot is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return UserSchema.model_construct(**snapshot)
+
+    def set(self, user) -> UserSchema:
+        snapshot = {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'is_active': bool(user.is_active),
+            'is_hr': bool(user.is_hr),
+        }
+        try:
+            self.backend.set(f'name:{user.username}', snapshot, self.ttl)
+            self.backend.set(f'id:{user.id}', {'username': user.username}, self.ttl)
+        except Exception as e:
+            logger.warning('User cache write failed: %s', e)
+        return UserSchema.model_construct(**snapshot)
+
+    def invalidate(self, user_id: int, username: Optional[str] = None):
+        try:
+            usernames = {username} if username else set()
+            key = self.backend.get(f'id:{user_id}')
+            if key is not None:
+                usernames.add(key['username'])
+            for name in usernames:
+                self.backend.delete(f'name:{name}')
+            self.backend.delete(f'id:{user_id}')
+            self.invalidations += 1
+        except Exception as e:
+            logger.warning('User cache invalidation failed for user %s: %s', user_id, e)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'invalidations': self.invalidations,
+        }
+
+
+def _build_backend() -> CacheBackend:
+    if USER_CACHE_BACKEND == 'redis':
+        return RedisBackend()
+    return MemoryBackend()
+
+
+user_cache = UserCache(_build_backend())
@@ -1,49 +1,65 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import Select, select, update
 from ..models.user import User
 from ..schemas.user import UserCreate, UserUpdate, UserInDB
-from .auth_service import get_password_hash
+from .deletion_service import DELETE_BATCH_SIZE, delete_user_cascade
+from .password_service import get_password_hash
+from .user_cache import user_cache
+from ..utils.response_cache import job_response_cache
+from ..utils.pagination import keyset_page
 from ..utils.utilities import logger_setup
-from typing import List, Type
+from ..utils.versioning import check_version, raise_missed_update, versioned_update
+from typing import List, Optional, Type
 
 logger = logger_setup(__name__)
 
+USER_PAGE_KEYS = (User.id,)
+
 
 def handle_db_error(error: Exception):
-    logger.error(f'Database error: {error}')
+    logger.error('Database error: %s', error)
     raise HTTPException(status_code=500, detail='Internal server error')
 
 
-def get_all_users(db: Session, skip: int = 0, limit: int = 100) -> List[Type[User]]:
+def select_users(skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Select:
+    if cursor is not None:
+        return keyset_page(select(User), USER_PAGE_KEYS, cursor, limit)
+    return select(User).offset(skip).limit(limit)
+
+
+def get_all_users(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Type[User]]:
     try:
-        return db.query(User).offset(skip).limit(limit).all()
+        return db.scalars(select_users(skip=skip, limit=limit, cursor=cursor)).all()
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error retrieving all users: {e}')
+        logger.error('Unexpected error retrieving all users: %s', e)
 
 
 def get_user_by_id(db: Session, user_id: int) -> User:
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if user is None:
-            logger.info(f'User with id {user_id} not found')
+            logger.info('User with id %s not found', user_id)
             raise HTTPException(status_code=404, detail='User not found')
         return user
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error retrieving user with id: {user_id}: error: {e}')
+        logger.error('Unexpected error retrieving user with id: %s: error: %s', user_id, e)
 
 
 def get_user_by_username(db: Session, username: str) -> Type[User]:
     try:
-        return db.query(User).filter(User.username == username).first()
+        return db.scalars(select(User).where(User.username == username)).first()
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error retrieving user with username: {username}: error: {e}')
+        logger.error('Unexpected error retrieving user with username: %s: error: %s', username, e)
 
 
 def get_user_by_email(db: Session, email: str) -> Type[User]:
@@ -52,60 +68,86 @@ def get_user_by_email(db: Session, email: str) -> Type[User]:
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error retrieving user with email: {email}: error: {e}')
+        logger.error('Unexpected error retrieving user with email: %s: error: %s', email, e)
 
 
-def create_user(db: Session, user_data: UserCreate) -> UserInDB:
+def create_user(db: Session, user_data: UserCreate, hashed_password: Optional[str] = None) -> UserInDB:
     try:
         existing_user = get_user_by_email(db, user_data.email)
         if existing_user:
-            logger.warning(f'Attempt to create user with existing email: {user_data.email}')
+            logger.warning('Attempt to create user with existing email: %s', user_data.email)
             raise HTTPException(status_code=400, detail='Email already registered')
 
-        hashed_password = get_password_hash(user_data.password)
-        new_user = User(**user_data.dict(), hashed_password=hashed_password)
+        if hashed_password is None:
+            hashed_password = get_password_hash(user_data.password)
+        new_user = User(**user_data.dict(exclude={'password'}), hashed_password=hashed_password)
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
-        logger.info(f'Created new user with ID: {new_user.id}')
+        logger.info('Created new user with ID: %s', new_user.id)
         return new_user
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error creating user with email: {user_data.email}: error: {e}')
+        logger.error('Unexpected error creating user with email: %s: error: %s', user_data.email, e)
 
 
-def update_user(db: Session, user_id: int, update_data: UserUpdate) -> UserInDB:
+def update_user(db: Session, user_id: int, update_data: UserUpdate, version: Optional[int] = None) -> UserInDB:
+    """Apply `update_data` in one UPDATE ... RETURNING, conditional on `version` (If-Match, else the body)."""
     try:
-        user_to_update = get_user_by_id(db, user_id)
-        if not user_to_update:
-            raise HTTPException(status_code=404, detail='User not found')
-
-        for key, value in update_data.dict(exclude_unset=True).items():
-            setattr(user_to_update, key, value if key != 'password' else get_password_hash(value))
+        values = update_data.model_dump(exclude_unset=True, exclude={'version'})
+        expected = version if version is not None else update_data.version
+        if 'password' in values:
+            values['hashed_password'] = get_password_hash(values.pop('password'))
+        if not values:
+            user = db.get(User, user_id)
+            if user is None:
+                raise HTTPException(status_code=404, detail='User not found')
+            check_version(user, expected, 'User')
+            return user
+
+        user_to_update = versioned_update(db, User, user_id, values, expected)
+        if user_to_update is None:
+            raise_missed_update(db, User, user_id, 'User')
+        # Detached, the returned row keeps its values through the commit
+        db.expunge(user_to_update)
         db.commit()
-        db.refresh(user_to_update)
-        logger.info(f'Updated user with ID: {user_id}')
+        user_cache.invalidate(user_id)
+        # Job responses embed the employer
+        job_response_cache.invalidate()
+        logger.info('Updated user with ID: %s to version %s', user_id, user_to_update.version)
         return user_to_update
 
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         handle_db_error(error)
     except Exception as e:
-        logger.error(f'Unexpected error updating user with ID: {user_id}: error: {e}')
+        logger.error('Unexpected error updating user with ID: %s: error: %s', user_id, e)
 
 
-def delete_user(db: Session, user_id: int):
+def delete_user(db: Session, user_id: int, batch_size: int = DELETE_BATCH_SIZE):
     try:
-        user_to_delete = get_user_by_id(db, user_id)
-        if not user_to_delete:
+        if db.scalar(select(User.id).where(User.id == user_id)) is None:
             raise HTTPException(status_code=404, detail='User not found')
+        delete_user_cascade(db, user_id, batch_size)
+        logger.info('Deleted user with ID: %s', user_id)
 
-        db.delete(user_to_delete)
-        db.commit()
-        logger.info(f'Deleted user with ID: {user_id}')
-
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         handle_db_error(error)
 
     except Exception as e:
-        logger.error(f'Unexpected error deleting user with ID: {user_id}: error: {e}')
+        logger.error('Unexpected error deleting user with ID: %s: error: %s', user_id, e)
+
+
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    try:
+        db.execute(update(User).where(User.id == user_id).values(hashed_password=hashed_password))
+        db.commit()
+        logger.info('Rehashed password for user with ID: %s', user_id)
+    except SQLAlchemyError as error:
+        handle_db_error(error)
+    except Exception as e:
+        logger.error('Unexpected error rehashing password for user with ID: %s: error: %s', user_id, e)
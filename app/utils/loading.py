@@ -0,0 +1,64 @@
+from functools import lru_cache
+from typing import List, Optional, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+
+
+def _nested_schema(annotation) -> Optional[Type[BaseModel]]:
+    """Return the pydantic model inside `annotation`, unwrapping Optional[...] and List[...]."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    if get_origin(annotation) in (Union, list, List):
+        for arg in get_args(annotation):
+            nested = _nested_schema(arg)
+            if nested is not None:
+                return nested
+    return None
+
+
+def _build_options(model, schema: Type[BaseModel]) -> list:
+    relationships = inspect(model).relationships
+    options = []
+    for name, field in schema.model_fields.items():
+        nested = _nested_schema(field.annotation)
+        if nested is None or name not in relationships:
+            continue
+        relationship = relationships[name]
+        attribute = getattr(model, name)
+        # many-to-one rides along in the same SELECT, collections get one extra IN query
+        loader = selectinload(attribute) if relationship.uselist else joinedload(attribute)
+        children = _build_options(relationship.mapper.class_, nested)
+        options.append(loader.options(*children) if children else loader)
+    return options
+
+
+@lru_cache(maxsize=None)
+def _cached_options(model, schema: Type[BaseModel]) -> tuple:
+    return tuple(_build_options(model, schema))
+
+
+def loader_options(model, schema: Optional[Type[BaseModel]]) -> tuple:
+    """Loader options that fetch every relationship `schema` renders, so serialization never lazy loads."""
+    if schema is None:
+        return ()
+    return _cached_options(model, schema)
+
+
+def load_rendered(obj, schema: Optional[Type[BaseModel]]):
+    """Touch every relationship `schema` renders on an already loaded object so serialization needs no I/O.
+
+    Needed for objects returned from AsyncSession.run_sync, where a lazy load after the call would fail.
+    """
+    if obj is None or schema is None:
+        return obj
+    relationships = inspect(type(obj)).relationships
+    for name, field in schema.model_fields.items():
+        nested = _nested_schema(field.annotation)
+        if nested is None or name not in relationships:
+            continue
+        value = getattr(obj, name)
+        for child in (value if relationships[name].uselist else [value]):
+            load_rendered(child, nested)
+    return obj
@@ -0,0 +1,377 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; the directory is then used without a lock
+    fcntl = None
+
+from starlette.routing import Match
+
+from .request_context import current_request_stats
+from .utilities import get_key, get_log_pipeline
+
+# Latency buckets in seconds, upper bounds inclusive; the implicit last bucket is +Inf
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Shared directory for aggregating across uvicorn/gunicorn workers; unset serves this worker's numbers only
+METRICS_MULTIPROC_DIR = get_key('METRICS_MULTIPROC_DIR')
+METRICS_FLUSH_SECONDS = float(get_key('METRICS_FLUSH_SECONDS', '5'))
+
+# Label for requests that matched no route (404s, probes), so unknown paths can't grow the label set
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            running += bucket_count
+            cumulative['+Inf' if bound == float('inf') else repr(bound)] = running
+        return {'buckets': cumulative, 'sum': total, 'count': count}
+
+
+class RequestMetrics:
+    """Per-route request counters and histograms for this worker.
+
+    Only the middleware updates these, and it runs on the event loop thread, so the hot path takes no
+    locks; snapshots are plain dicts that can be merged with other workers'.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.in_progress: Dict[Tuple[str, str], int] = {}
+        self.duration: Dict[Tuple[str, str], list] = {}
+        self.db_time: Dict[Tuple[str, str], list] = {}
+
+    def _observe(self, histograms: Dict, key: Tuple[str, str], value: float):
+        histogram = histograms.get(key)
+        if histogram is None:
+            # bucket counts, then sum
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect.bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+    def started(self, method: str, route: str):
+        key = (method, route)
+        self.in_progress[key] = self.in_progress.get(key, 0) + 1
+
+    def finished(self, method: str, route: str, status: int, duration: float, db_time: float):
+        key = (method, route)
+        self.in_progress[key] -= 1
+        status_key = (method, route, str(status))
+        self.requests[status_key] = self.requests.get(status_key, 0) + 1
+        self._observe(self.duration, key, duration)
+        self._observe(self.db_time, key, db_time)
+
+    def snapshot(self) -> Dict:
+        pipeline = get_log_pipeline()
+        log_stats = pipeline.stats() if pipeline is not None else {'dropped': 0, 'sampled_out': 0}
+        return {
+            'pid': os.getpid(),
+            'log_dropped': log_stats['dropped'],
+            'log_sampled_out': log_stats['sampled_out'],
+            'buckets': list(self.buckets),
+            'requests': [[*key, count] for key, count in self.requests.items()],
+            'in_progress': [[*key, count] for key, count in self.in_progress.items()],
+            'duration': [[*key, list(histogram)] for key, histogram in self.duration.items()],
+            'db_time': [[*key, list(histogram)] for key, histogram in self.db_time.items()],
+        }
+
+
+def merge_snapshots(snapshots: Iterable[Dict]) -> Dict:
+    merged = {'requests': {}, 'in_progress': {}, 'duration': {}, 'db_time': {}, 'buckets': list(DEFAULT_BUCKETS),
+              'log_dropped': 0, 'log_sampled_out': 0}
+    for snapshot in snapshots:
+        merged['buckets'] = snapshot['buckets']
+        merged['log_dropped'] += snapshot.get('log_dropped', 0)
+        merged['log_sampled_out'] += snapshot.get('log_sampled_out', 0)
+        for name in ('requests', 'in_progress'):
+            for *key, count in snapshot[name]:
+                merged[name][tuple(key)] = merged[name].get(tuple(key), 0) + count
+        for name in ('duration', 'db_time'):
+            for *key, histogram in snapshot[name]:
+                total = merged[name].setdefault(tuple(key), [0] * len(histogram))
+                for index, value in enumerate(histogram):
+                    total[index] += value
+    return merged
+
+
+def merged_snapshot(merged: Dict) -> Dict:
+    """The output of `merge_snapshots` in snapshot form again, without in-flight gauges, so it can be stored."""
+    return {
+        'pid': None,
+        'log_dropped': merged['log_dropped'],
+        'log_sampled_out': merged['log_sampled_out'],
+        'buckets': merged['buckets'],
+        'requests': [[*key, count] for key, count in merged['requests'].items()],
+        'in_progress': [],
+        'duration': [[*key, histogram] for key, histogram in merged['duration'].items()],
+        'db_time': [[*key, histogram] for key, histogram in merged['db_time'].items()],
+    }
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def render_prometheus(merged: Dict) -> str:
+    lines = [
+        '# HELP http_requests_total Requests handled, by route and status code.',
+        '# TYPE http_requests_total counter',
+    ]
+    for (method, route, status), count in sorted(merged['requests'].items()):
+        lines.append(f'http_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}')
+
+    lines += [
+        '# HELP http_requests_in_progress Requests currently being handled.',
+        '# TYPE http_requests_in_progress gauge',
+    ]
+    for (method, route), count in sorted(merged['in_progress'].items()):
+        lines.append(f'http_requests_in_progress{{{_labels(method=method, route=route)}}} {count}')
+
+    bounds = [repr(float(bound)) for bound in merged['buckets']] + ['+Inf']
+    for name, description in (('http_request_duration_seconds', 'Time to handle a request.'),
+                              ('http_request_db_seconds', 'Time spent in database statements per request.')):
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+        histograms = merged['duration' if name == 'http_request_duration_seconds' else 'db_time']
+        for (method, route), histogram in sorted(histograms.items()):
+            labels = _labels(method=method, route=route)
+            running = 0
+            for bound, count in zip(bounds, histogram[:-1]):
+                running += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {running}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram[-1]}')
+            lines.append(f'{name}_count{{{labels}}} {running}')
+
+    lines += [
+        '# HELP log_records_dropped_total Log records dropped because the log queue was full.',
+        '# TYPE log_records_dropped_total counter',
+        f"log_records_dropped_total {merged['log_dropped']}",
+        '# HELP log_records_sampled_out_total INFO log records skipped by LOG_INFO_SAMPLE_RATE.',
+        '# TYPE log_records_sampled_out_total counter',
+        f"log_records_sampled_out_total {merged['log_sampled_out']}",
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+class MultiProcessStore:
+    """Shares each worker's snapshot through files in METRICS_MULTIPROC_DIR.
+
+    Every worker rewrites its own file periodically and on scrape; a scrape merges all files. When a
+    worker stops, or a scrape finds one that died, its file is folded into `metrics-dead.json` and
+    removed, as prometheus_client's mark_process_dead does. Counters of exited workers so stay in the
+    totals, a restarted worker that gets a dead one's pid starts from zero without taking them back
+    out, and only live workers' in-flight gauges are reported.
+    """
+
+    AGGREGATE = 'metrics-dead.json'
+
+    def __init__(self, directory: str, metrics: RequestMetrics, interval: float = METRICS_FLUSH_SECONDS):
+        self.directory = directory
+        self.metrics = metrics
+        self.interval = interval
+        self._claimed = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def path(self, pid: int) -> str:
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    @contextmanager
+    def _locked(self):
+        # Serializes folding against scrapes in every worker, so no file is counted twice or not at all
+        with open(os.path.join(self.directory, 'metrics.lock'), 'a') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict]:
+        try:
+            with open(path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path: str, snapshot: Dict):
+        with open(f'{path}.tmp', 'w') as handle:
+            json.dump(snapshot, handle)
+        os.replace(f'{path}.tmp', path)
+
+    def _fold(self, pid: int):
+        """Add a finished worker's file to the aggregate and remove it; call with the lock held."""
+        path = self.path(pid)
+        snapshot = self._read(path)
+        if snapshot is not None:
+            aggregate_path = os.path.join(self.directory, self.AGGREGATE)
+            aggregate = self._read(aggregate_path)
+            merged = merge_snapshots([aggregate, snapshot] if aggregate is not None else [snapshot])
+            self._write(aggregate_path, merged_snapshot(merged))
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _claim(self):
+        # A file under this pid was left by a dead worker that had it before: fold it before overwriting
+        if self._claimed:
+            return
+        with self._locked():
+            self._fold(os.getpid())
+        self._claimed = True
+
+    def flush(self):
+        self._claim()
+        snapshot = self.metrics.snapshot()
+        self._write(self.path(snapshot['pid']), snapshot)
+
+    def collect(self) -> List[Dict]:
+        self.flush()
+        snapshots = []
+        with self._locked():
+            for name in os.listdir(self.directory):
+                if not (name.startswith('metrics-') and name.endswith('.json')) or name == self.AGGREGATE:
+                    continue
+                snapshot = self._read(os.path.join(self.directory, name))
+                if snapshot is None:
+                    continue
+                if snapshot['pid'] != os.getpid() and not _alive(snapshot['pid']):
+                    self._fold(snapshot['pid'])
+                    continue
+                snapshots.append(snapshot)
+            # Read last, after the dead workers found above were folded into it
+            aggregate = self._read(os.path.join(self.directory, self.AGGREGATE))
+        if aggregate is not None:
+            snapshots.append(aggregate)
+        return snapshots
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._claim()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Fold this worker's final numbers into the aggregate; called on lifespan shutdown."""
+        self._stop.set()
+        try:
+            self.flush()
+            with self._locked():
+                self._fold(os.getpid())
+        except OSError:
+            pass
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+request_metrics = RequestMetrics()
+multiprocess_store = MultiProcessStore(METRICS_MULTIPROC_DIR, request_metrics) if METRICS_MULTIPROC_DIR else None
+
+
+def start_metrics():
+    if multiprocess_store is not None:
+        multiprocess_store.start()
+
+
+def stop_metrics():
+    if multiprocess_store is not None:
+        multiprocess_store.stop()
+
+
+def metrics_text() -> str:
+    snapshots = multiprocess_store.collect() if multiprocess_store is not None else [request_metrics.snapshot()]
+    return render_prometheus(merge_snapshots(snapshots))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware task overhead) feeding `request_metrics`.
+
+    Requests are labelled by their route template, e.g. `/jobs/{job_id}`, so label cardinality stays fixed.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics, exclude: Sequence[str] = ('/metrics',)):
+        self.app = app
+        self.metrics = metrics
+        self.exclude = set(exclude)
+
+    @staticmethod
+    def route_label(scope) -> str:
+        # Matched up front so the in-flight gauge carries the route while the handler runs
+        for route in scope['app'].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, 'path', UNMATCHED_ROUTE)
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope['method'], self.route_label(scope)
+        status_code = 500
+        started = time.perf_counter()
+        # Set when the last body chunk is out; background tasks that run after it are not timed
+        responded: Optional[float] = None
+        self.metrics.started(method, route)
+
+        async def send_wrapper(message):
+            nonlocal status_code, responded
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                responded = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Opened by RequestContextMiddleware
+            stats = current_request_stats()
+            db_time = stats.db_time if stats is not None else 0.0
+            duration = (responded or time.perf_counter()) - started
+            self.metrics.finished(method, route, status_code, duration, db_time)
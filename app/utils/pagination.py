@@ -0,0 +1,66 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column, value: Any) -> Any:
+    if value is not None and column.type.python_type is datetime:
+        return datetime.fromisoformat(value)
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, keys: Sequence) -> List[Any]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError('cursor does not match the sort keys')
+        return [_decode_value(key, value) for key, value in zip(keys, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
+
+def _after(keys: Sequence, values: Sequence[Any], descending: bool):
+    # (k1, k2) > (v1, v2) expanded so it works on every backend and still uses the index
+    key, value = keys[0], values[0]
+    past = key < value if descending else key > value
+    if len(keys) == 1:
+        return past
+    return or_(past, and_(key == value, _after(keys[1:], values[1:], descending)))
+
+
+def keyset_page(statement, keys: Sequence, cursor: Optional[str], limit: int, descending: bool = False):
+    """Restrict a select to the page after `cursor`, ordered by `keys`. An empty cursor starts at the first page."""
+    if cursor:
+        statement = statement.where(_after(keys, decode_cursor(cursor, keys), descending))
+    order_by = [key.desc() for key in keys] if descending else list(keys)
+    return statement.order_by(*order_by).limit(limit)
+
+
+def next_cursor(rows: Sequence, keys: Sequence, limit: int) -> Optional[str]:
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor([getattr(last, key.key) for key in keys])
+
+
+def next_cursor_headers(rows: Sequence, keys: Sequence, limit: int) -> Dict[str, str]:
+    cursor = next_cursor(rows, keys, limit)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor is not None else {}
@@ -0,0 +1,96 @@
+import os
+import time
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import Histogram
+
+
+class PoolMetrics:
+    """Connection pool statistics for one engine in this worker process."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_time = Histogram()
+        self.connect_time = Histogram()
+
+    def snapshot(self, engine: Engine) -> Dict:
+        pool = engine.pool
+        stats = {
+            'pool_class': type(pool).__name__,
+            'status': pool.status(),
+            'checkouts': self.checkouts,
+            'checkins': self.checkins,
+            'connects': self.connects,
+            'invalidations': self.invalidations,
+            'wait_time_seconds': self.wait_time.snapshot(),
+            'connect_time_seconds': self.connect_time.snapshot(),
+        }
+        # NullPool and the SQLite pools don't track sizes
+        for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+            method = getattr(pool, name, None)
+            if callable(method):
+                stats[name] = method()
+        return stats
+
+
+def timed_pool_class(pool_class, metrics: PoolMetrics):
+    """Subclass `pool_class` so the time spent waiting for a connection lands in `metrics.wait_time`.
+
+    A per-engine subclass survives Pool.recreate() (engine.dispose()), which rebuilds from the class.
+    """
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return pool_class._do_get(self)
+        finally:
+            metrics.wait_time.observe(time.perf_counter() - started)
+
+    return type(f'Timed{pool_class.__name__}', (pool_class,), {'_do_get': _do_get})
+
+
+def instrument_engine(engine: Engine, metrics: PoolMetrics) -> Engine:
+    @event.listens_for(engine, 'do_connect')
+    def _connect_started(dialect, connection_record, cargs, cparams):
+        connection_record.info['connect_started'] = time.perf_counter()
+
+    @event.listens_for(engine, 'connect')
+    def _connected(dbapi_connection, connection_record):
+        metrics.connects += 1
+        started = connection_record.info.pop('connect_started', None)
+        if started is not None:
+            metrics.connect_time.observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, 'checkout')
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+
+    @event.listens_for(engine, 'checkin')
+    def _checkin(dbapi_connection, connection_record):
+        metrics.checkins += 1
+
+    @event.listens_for(engine, 'invalidate')
+    def _invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    return engine
+
+
+# engine name -> (engine, metrics), for the admin endpoint
+pool_registry: Dict[str, tuple] = {}
+
+
+def register_engine(name: str, engine: Engine, metrics: PoolMetrics):
+    pool_registry[name] = (instrument_engine(engine, metrics), metrics)
+
+
+def pool_stats() -> Dict:
+    return {
+        'pid': os.getpid(),
+        'engines': {name: metrics.snapshot(engine) for name, (engine, metrics) in pool_registry.items()},
+    }
@@ -0,0 +1,222 @@
+import asyncio
+import json
+from typing import Callable, Dict, Optional, Set
+
+from fastapi import HTTPException, status
+
+from .utilities import logger_setup, get_key
+
+logger = logger_setup(__name__)
+
+# `memory` only reaches subscribers of the worker that published; `redis` broadcasts to every worker
+EVENTS_BACKEND = get_key('EVENTS_BACKEND', 'memory')
+EVENTS_REDIS_CHANNEL = get_key('EVENTS_REDIS_CHANNEL', 'job-portal:events')
+# Messages buffered per subscriber; a subscriber that falls this far behind is disconnected
+EVENTS_QUEUE_SIZE = int(get_key('EVENTS_QUEUE_SIZE', '64'))
+EVENTS_HEARTBEAT_SECONDS = float(get_key('EVENTS_HEARTBEAT_SECONDS', '15'))
+EVENTS_MAX_SUBSCRIBERS = int(get_key('EVENTS_MAX_SUBSCRIBERS', '20000'))
+REDIS_URL = get_key('REDIS_URL', 'redis://localhost:6379/0')
+
+# Queue markers, next to the JSON strings of published messages
+HEARTBEAT = object()
+CLOSED = object()
+
+
+class Subscription:
+    """One subscriber's bounded queue; `overflowed` tells why it was closed."""
+
+    __slots__ = ('topic', 'queue', 'closed', 'overflowed')
+
+    def __init__(self, topic: str, size: int):
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(size)
+        self.closed = False
+        self.overflowed = False
+
+    async def get(self):
+        return await self.queue.get()
+
+    def offer(self, item) -> bool:
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self, overflowed: bool = False):
+        if self.closed:
+            return
+        self.closed = True
+        self.overflowed = overflowed
+        # Whatever is still queued will not be sent, so make room for the marker
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(CLOSED)
+
+
+class BroadcastBackend:
+    """Carries published messages to `deliver`, the broker of every worker; the broker sets it."""
+
+    deliver: Callable[[str, str], None]
+
+    def start(self):
+        pass
+
+    def publish(self, topic: str, data: str):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+class MemoryBackend(BroadcastBackend):
+    def publish(self, topic: str, data: str):
+        self.deliver(topic, data)
+
+
+class RedisBackend(BroadcastBackend):
+    """PUBLISH on one channel; a listener thread in each worker hands the messages to its broker."""
+
+    def __init__(self, url: str = REDIS_URL, channel: str = EVENTS_REDIS_CHANNEL):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('EVENTS_BACKEND=redis requires the "redis" package') from e
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+        self._listener = None
+
+    def start(self):
+        def on_message(message):
+            envelope = json.loads(message['data'])
+            self.deliver(envelope['topic'], envelope['data'])
+
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: on_message})
+        self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, topic: str, data: str):
+        self.client.publish(self.channel, json.dumps({'topic': topic, 'data': data}))
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+class Broker:
+    """In-process fan-out from published topics to the subscriptions of this worker.
+
+    Subscriptions live on the event loop; `publish` may be called from any thread (sync services
+    run in the threadpool) and hops onto the loop to deliver. Each message is encoded once, however
+    many subscribers it reaches. A subscriber whose queue is full is closed instead of buffering
+    without bound; its client reconnects and starts from a fresh snapshot. One timer queues a
+    heartbeat for every subscriber, so idle connections cost no task of their own.
+    """
+
+    def __init__(self, backend: BroadcastBackend, queue_size: int = EVENTS_QUEUE_SIZE,
+                 heartbeat_seconds: float = EVENTS_HEARTBEAT_SECONDS, max_subscribers: int = EVENTS_MAX_SUBSCRIBERS):
+        self.backend = backend
+        backend.deliver = self.deliver
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_subscribers = max_subscribers
+        self.subscribers = 0
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self.published = 0
+        self.delivered = 0
+        self.overflowed = 0
+        self.publish_errors = 0
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self.backend.start()
+        if self.heartbeat_seconds > 0:
+            self._heartbeat = self._loop.create_task(self._send_heartbeats())
+
+    async def stop(self):
+        self.backend.stop()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        # Open streams end, so the server can shut down; clients reconnect to another worker
+        for subscriptions in list(self._topics.values()):
+            for subscription in list(subscriptions):
+                self.unsubscribe(subscription)
+                subscription.close()
+
+    def subscribe(self, topic: str) -> Subscription:
+        if self.subscribers >= self.max_subscribers:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many subscribers",
+                                headers={"Retry-After": "5"})
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        subscription = Subscription(topic, self.queue_size)
+        self._topics.setdefault(topic, set()).add(subscription)
+        self.subscribers += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._topics.get(subscription.topic)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._topics[subscription.topic]
+        self.subscribers -= 1
+
+    def publish(self, topic: str, message: dict):
+        """Send `message` to the topic's subscribers in every worker; failures are logged, not raised."""
+        try:
+            self.backend.publish(topic, json.dumps(message, default=str, separators=(',', ':')))
+            self.published += 1
+        except Exception as e:
+            self.publish_errors += 1
+            logger.warning('Could not publish event on %s: %s', topic, e)
+
+    def deliver(self, topic: str, data: str):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(topic, data)
+        else:
+            loop.call_soon_threadsafe(self._fan_out, topic, data)
+
+    def _fan_out(self, topic: str, data: str):
+        for subscription in list(self._topics.get(topic, ())):
+            if subscription.offer(data):
+                self.delivered += 1
+                continue
+            self.overflowed += 1
+            logger.warning('Closing a subscriber on %s that fell %s messages behind', topic, self.queue_size)
+            self.unsubscribe(subscription)
+            subscription.close(overflowed=True)
+
+    async def _send_heartbeats(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for subscriptions in list(self._topics.values()):
+                for subscription in subscriptions:
+                    # A full queue already has something to send
+                    subscription.offer(HEARTBEAT)
+
+    def stats(self) -> Dict:
+        return {'backend': type(self.backend).__name__, 'subscribers': self.subscribers, 'topics': len(self._topics),
+                'published': self.published, 'delivered': self.delivered, 'overflowed': self.overflowed,
+                'publish_errors': self.publish_errors}
+
+
+def _create_backend() -> BroadcastBackend:
+    if EVENTS_BACKEND == 'redis':
+        return RedisBackend()
+    return MemoryBackend()
+
+
+event_broker = Broker(_create_backend())
@@ -0,0 +1,42 @@
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Records every statement sent to `engine` while the context is open.
+
+        with QueryCounter(engine) as counter:
+            client.get("/applications/?limit=100")
+        assert counter.count <= 2, counter.statements
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        return False
+
+
+@contextmanager
+def assert_max_queries(engine, limit: int):
+    """Fail when the block issues more than `limit` statements; use it to pin endpoints against N+1 regressions."""
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        statements = "\n".join(counter.statements)
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{statements}")
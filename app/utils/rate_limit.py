@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from .utilities import logger_setup, get_key, get_flag
+
+logger = logger_setup(__name__)
+
+RATE_LIMIT_ENABLED = get_flag('RATE_LIMIT_ENABLED', True)
+# `memory` limits each worker on its own; `redis` shares the buckets between workers
+RATE_LIMIT_BACKEND = get_key('RATE_LIMIT_BACKEND', 'memory')
+# Buckets kept per worker by the memory backend; the least recently used are evicted first
+RATE_LIMIT_MAX_KEYS = int(get_key('RATE_LIMIT_MAX_KEYS', '100000'))
+# Key clients by X-Forwarded-For; only behind proxies that append to it
+RATE_LIMIT_TRUST_FORWARDED = get_flag('RATE_LIMIT_TRUST_FORWARDED')
+# Trusted proxies in front of the app. Each appends the address it got the request from, so the client
+# is that many entries from the right; anything further left was sent by the client and can be forged
+RATE_LIMIT_FORWARDED_HOPS = int(get_key('RATE_LIMIT_FORWARDED_HOPS', '1'))
+REDIS_URL = get_key('REDIS_URL', 'redis://localhost:6379/0')
+
+
+class Rate:
+    """`capacity` requests in a burst, refilled evenly over `period` seconds; parsed from '10/60'."""
+
+    def __init__(self, capacity: int, period: float):
+        if capacity <= 0 or period <= 0:
+            raise ValueError('Rate capacity and period must be positive')
+        self.capacity = capacity
+        self.period = period
+        self.refill_per_second = capacity / period
+
+    @classmethod
+    def parse(cls, value: str) -> 'Rate':
+        capacity, _, period = value.partition('/')
+        return cls(int(capacity), float(period or 60))
+
+    def __repr__(self):
+        return f'{self.capacity}/{self.period:g}'
+
+
+class RateLimitBackend:
+    """Token bucket storage: take `cost` tokens from the bucket at `key` if it has them."""
+
+    # Backends doing network I/O are called from the threadpool
+    blocking = False
+
+    def consume(self, key: str, rate: Rate, cost: int = 1) -> Tuple[bool, float]:
+        """Return (allowed, seconds until `cost` tokens are available).
+
+        A cost of 0 takes nothing and is allowed while at least one token is left.
+        """
+        raise NotImplementedError
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class MemoryBackend(RateLimitBackend):
+    """Buckets in an LRU dict: one lookup, one refill calculation and one move per check.
+
+    Evicting an idle bucket only forgets a client that has stopped sending requests; a full bucket
+    and a missing one behave the same.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, rate: Rate, cost: int = 1) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = float(rate.capacity)
+            else:
+                tokens, updated = bucket
+                tokens = min(rate.capacity, tokens + (now - updated) * rate.refill_per_second)
+                self._buckets.move_to_end(key)
+            allowed = tokens >= max(cost, 1)
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (max(cost, 1) - tokens) / rate.refill_per_second
+
+    def size(self) -> Optional[int]:
+        return len(self._buckets)
+
+
+# Refill and take in one round trip, on the server's clock so every worker sees the same bucket
+_REDIS_TOKEN_BUCKET = '''
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local needed = math.max(cost, 1)
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * refill)
+local allowed = 0
+local wait = 0
+if tokens >= needed then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (needed - tokens) / refill
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / refill * 1000) + 1000)
+return {allowed, tostring(wait)}
+'''
+
+
+class RedisBackend(RateLimitBackend):
+    """Shared by all workers; keys expire once their bucket would be full again."""
+
+    blocking = True
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = 'rate-limit:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('RATE_LIMIT_BACKEND=redis requires the "redis" package') from e
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(_REDIS_TOKEN_BUCKET)
+        self.prefix = prefix
+
+    def consume(self, key: str, rate: Rate, cost: int = 1) -> Tuple[bool, float]:
+        allowed, wait = self.script(keys=[self.prefix + key], args=[rate.capacity, rate.refill_per_second, cost])
+        return bool(allowed), float(wait)
+
+
+def client_ip(request: Request, hops: int = RATE_LIMIT_FORWARDED_HOPS) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = [address.strip() for address in request.headers.get('x-forwarded-for', '').split(',')]
+        forwarded = [address for address in forwarded if address]
+        if forwarded:
+            # Fewer entries than hops means fewer proxies than configured; the leftmost is then the client
+            return forwarded[-min(hops, len(forwarded))]
+    return request.client.host if request.client else 'unknown'
+
+
+class RateLimiter:
+    """Named limits over one backend; counts what each limit allowed and rejected in this worker."""
+
+    def __init__(self, backend: RateLimitBackend, enabled: bool = RATE_LIMIT_ENABLED):
+        self.backend = backend
+        self.enabled = enabled
+        self.allowed: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+
+    async def _consume(self, name: str, key: str, rate: Rate, cost: int) -> Tuple[bool, float]:
+        bucket = f'{name}:{key}'
+        if self.backend.blocking:
+            return await run_in_threadpool(self.backend.consume, bucket, rate, cost)
+        return self.backend.consume(bucket, rate, cost)
+
+    async def check(self, name: str, key: str, rate: Rate, cost: int = 1):
+        """Raise 429 with Retry-After when the bucket for `key` under limit `name` is empty.
+
+        With cost=0 nothing is taken, for limits that `charge` only once the outcome is known.
+        """
+        if not self.enabled:
+            return
+        allowed, wait = await self._consume(name, key, rate, cost)
+        if allowed:
+            self.allowed[name] = self.allowed.get(name, 0) + 1
+            return
+        self.rejected[name] = self.rejected.get(name, 0) + 1
+        logger.warning('Rate limit %s (%r) exceeded for %s', name, rate, key)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(max(1, int(wait + 0.999)))},
+        )
+
+    async def charge(self, name: str, key: str, rate: Rate, cost: int = 1):
+        """Take `cost` tokens from the bucket without rejecting the current request."""
+        if self.enabled:
+            await self._consume(name, key, rate, cost)
+
+    def stats(self) -> Dict:
+        return {'enabled': self.enabled, 'backend': type(self.backend).__name__, 'keys': self.backend.size(),
+                'allowed': dict(self.allowed), 'rejected': dict(self.rejected)}
+
+
+def rate_limit(name: str, rate: Rate):
+    """Dependency limiting a route per client IP: `dependencies=[Depends(rate_limit('signup', rate))]`."""
+    async def dependency(request: Request):
+        await rate_limiter.check(f'{name}:ip', client_ip(request), rate)
+
+    return dependency
+
+
+def _create_backend() -> RateLimitBackend:
+    if RATE_LIMIT_BACKEND == 'redis':
+        return RedisBackend()
+    return MemoryBackend()
+
+
+rate_limiter = RateLimiter(_create_backend())
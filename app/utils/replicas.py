@@ -0,0 +1,156 @@
+import itertools
+import threading
+import time
+from http.cookies import SimpleCookie
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .utilities import logger_setup, get_key
+
+logger = logger_setup(__name__)
+
+# Comma-separated read replica URLs; GET endpoints spread their reads over the healthy ones
+DATABASE_REPLICA_URLS = [url.strip() for url in (get_key('DATABASE_REPLICA_URLS') or '').split(',') if url.strip()]
+
+# A replica further behind the primary than this is skipped until it catches up
+REPLICA_MAX_LAG_SECONDS = float(get_key('REPLICA_MAX_LAG_SECONDS', '5'))
+REPLICA_CHECK_SECONDS = float(get_key('REPLICA_CHECK_SECONDS', '5'))
+
+# After a successful write, the client's reads stay on the primary this long (read-your-writes)
+REPLICA_STICKY_SECONDS = float(get_key('REPLICA_STICKY_SECONDS', '10'))
+STICKY_COOKIE = 'read_primary_until'
+
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# Seconds of replay lag; 0 when the standby has replayed everything it received
+LAG_QUERIES = {
+    'postgresql': (
+        'SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+        'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+    ),
+}
+DEFAULT_LAG_QUERY = 'SELECT 0'
+
+
+class Replica:
+    def __init__(self, name: str, engine: Engine, session_factory: Callable, async_session_factory=None):
+        self.name = name
+        self.engine = engine
+        self.session_factory = session_factory
+        self.async_session_factory = async_session_factory
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.checked_at = 0.0
+        self.last_error: Optional[str] = None
+
+    def check(self, max_lag: float):
+        try:
+            with self.engine.connect() as connection:
+                lag = float(connection.scalar(text(LAG_QUERIES.get(self.engine.dialect.name, DEFAULT_LAG_QUERY))) or 0)
+        except Exception as e:
+            if self.healthy or self.last_error is None:
+                logger.warning('Replica %s failed its health check: %s', self.name, e)
+            self.healthy, self.lag, self.last_error = False, None, str(e)
+            return
+        if lag > max_lag and (self.healthy or self.lag is None):
+            logger.warning('Replica %s is %.1f s behind the primary, reading from the primary instead', self.name, lag)
+        self.healthy, self.lag, self.last_error = lag <= max_lag, lag, None
+        self.checked_at = time.monotonic()
+
+
+class ReplicaSet:
+    """Round-robin over the replicas that passed their last health and lag check.
+
+    A background thread re-checks every replica each `interval` seconds. A replica whose last good
+    check is older than three intervals counts as unhealthy, so a stuck checker never keeps a dead
+    replica in rotation. `choose()` returns None when no replica is usable and the caller reads
+    from the primary.
+    """
+
+    def __init__(self, replicas: List[Replica], max_lag: float = REPLICA_MAX_LAG_SECONDS,
+                 interval: float = REPLICA_CHECK_SECONDS):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.interval = interval
+        self.primary_reads = 0
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _usable(self, replica: Replica, now: float) -> bool:
+        return replica.healthy and now - replica.checked_at <= self.interval * 3
+
+    def choose(self) -> Optional[Replica]:
+        now = time.monotonic()
+        healthy = [replica for replica in self.replicas if self._usable(replica, now)]
+        if not healthy:
+            self.primary_reads += 1
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def check(self):
+        for replica in self.replicas:
+            replica.check(self.max_lag)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if not self.replicas or self._thread is not None:
+            return
+        self.check()
+        self._thread = threading.Thread(target=self._run, name='replica-health', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        return {
+            'primary_reads': self.primary_reads,
+            'replicas': {replica.name: {'healthy': self._usable(replica, now), 'lag_seconds': replica.lag,
+                                        'error': replica.last_error} for replica in self.replicas},
+        }
+
+
+def reads_own_writes(cookies: Dict[str, str]) -> bool:
+    """True while the client is inside the stickiness window opened by its last write."""
+    try:
+        return float(cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """Marks clients that just wrote so their next reads skip the replicas.
+
+    The mark is a cookie holding the time until which reads go to the primary, so it holds across
+    workers; API clients that don't keep cookies can send it back themselves.
+    """
+
+    def __init__(self, app, sticky_seconds: float = REPLICA_STICKY_SECONDS):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start' and message['status'] < 400:
+                cookie = SimpleCookie()
+                cookie[STICKY_COOKIE] = f'{time.time() + self.sticky_seconds:.3f}'
+                cookie[STICKY_COOKIE]['max-age'] = int(self.sticky_seconds) + 1
+                cookie[STICKY_COOKIE]['path'] = '/'
+                cookie[STICKY_COOKIE]['httponly'] = True
+                message['headers'] = list(message.get('headers', [])) + [
+                    (b'set-cookie', cookie.output(header='').strip().encode('latin-1')),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,191 @@
+import contextvars
+import time
+import uuid
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .log_pipeline import reset_request_id, set_request_id
+from .utilities import logger_setup, get_key, get_flag
+
+logger = logger_setup(__name__)
+
+# Statements slower than this are logged with their parameters and, for SELECTs, the query plan
+DB_SLOW_QUERY_MS = float(get_key('DB_SLOW_QUERY_MS', '200'))
+DB_EXPLAIN_SLOW_QUERIES = get_flag('DB_EXPLAIN_SLOW_QUERIES', True)
+
+# Statements allowed per request (0 disables); `warn` logs the first overrun, `raise` fails the statement
+DB_QUERY_BUDGET = int(get_key('DB_QUERY_BUDGET', '0'))
+DB_QUERY_BUDGET_MODE = get_key('DB_QUERY_BUDGET_MODE', 'warn')
+
+# Send Server-Timing and X-DB-Queries on every response
+DB_TIMING_HEADERS = get_flag('DB_TIMING_HEADERS', True)
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class RequestStats:
+    """Database work done on behalf of the current request.
+
+    `finished` is set once the response has been sent. Background tasks run after that in the same
+    context, and their statements are not the request's, so they are no longer counted.
+    """
+
+    __slots__ = ('db_queries', 'db_time', 'budget', 'budget_warned', 'path', 'finished')
+
+    def __init__(self, path: str = '', budget: int = DB_QUERY_BUDGET):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.budget = budget
+        self.budget_warned = False
+        self.path = path
+        self.finished = False
+
+
+# The stats object is shared by reference, so threadpool and greenlet copies of the context add to it too
+_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar('request_stats', default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def begin_request(path: str = '') -> contextvars.Token:
+    return _request_stats.set(RequestStats(path))
+
+
+def end_request(token: contextvars.Token):
+    _request_stats.reset(token)
+
+
+def query_budget(limit: int):
+    """Route dependency overriding DB_QUERY_BUDGET for one endpoint:
+
+        @router.get("/", dependencies=[Depends(query_budget(2))])
+    """
+    async def _set_budget():
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.budget = limit
+
+    return _set_budget
+
+
+def _check_budget(stats: RequestStats, statement: str):
+    if not stats.budget or stats.db_queries <= stats.budget:
+        return
+    message = f'{stats.path} exceeded its query budget of {stats.budget} with: {statement}'
+    if DB_QUERY_BUDGET_MODE == 'raise':
+        raise QueryBudgetExceeded(message)
+    if not stats.budget_warned:
+        stats.budget_warned = True
+        logger.warning(message)
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith('SELECT'):
+        return None
+    # A separate cursor leaves the original statement's pending rows untouched
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, statement: str, parameters, executemany: bool, elapsed: float):
+    logger.warning('Slow query (%.1f ms): %s parameters: %r', elapsed * 1000, statement, parameters)
+    if not DB_EXPLAIN_SLOW_QUERIES or executemany:
+        return
+    try:
+        plan = _explain(conn, statement, parameters)
+    except Exception as e:
+        logger.warning('Could not explain slow query: %s', e)
+        return
+    if plan:
+        logger.warning('Query plan:\n%s', plan)
+
+
+def instrument_sql(engine: Engine) -> Engine:
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+            _log_slow_query(conn, statement, parameters, executemany, elapsed)
+        stats = _request_stats.get()
+        if stats is not None and not stats.finished:
+            stats.db_queries += 1
+            stats.db_time += elapsed
+            _check_budget(stats, statement)
+
+    @event.listens_for(engine, 'handle_error')
+    def _failed(exception_context):
+        # after_cursor_execute never fires for a failed statement
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('query_started'):
+            connection.info['query_started'].pop()
+
+    return engine
+
+
+class RequestContextMiddleware:
+    """Opens the per-request stats for each HTTP request and reports them in the response headers.
+
+    Also assigns the request id stamped on log records: the client's X-Request-ID when it sends one,
+    a fresh one otherwise, echoed back in the response.
+
+    Add it after (outside) MetricsMiddleware so the metrics can read the stats when the request ends.
+    """
+
+    def __init__(self, app, timing_headers: bool = DB_TIMING_HEADERS):
+        self.app = app
+        self.timing_headers = timing_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        token = begin_request(scope['path'])
+        stats = _request_stats.get()
+        started = time.perf_counter()
+        request_id = dict(scope['headers']).get(b'x-request-id', b'').decode('latin-1')[:128] or uuid.uuid4().hex
+        request_id_token = set_request_id(request_id)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + [
+                    (b'x-request-id', request_id.encode('latin-1')),
+                ]
+            if message['type'] == 'http.response.start' and self.timing_headers:
+                total_ms = (time.perf_counter() - started) * 1000
+                server_timing = (f'db;dur={stats.db_time * 1000:.2f};desc="{stats.db_queries} queries", '
+                                 f'app;dur={total_ms:.2f}')
+                message['headers'] = list(message.get('headers', [])) + [
+                    (b'server-timing', server_timing.encode()),
+                    (b'x-db-queries', str(stats.db_queries).encode()),
+                ]
+            await send(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                stats.finished = True
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            reset_request_id(request_id_token)
+            end_request(token)
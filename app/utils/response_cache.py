@@ -0,0 +1,111 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import Request, Response, status
+
+from .utilities import get_key
+
+# Clients may keep a copy but must revalidate it; a matching ETag costs one indexed query and a 304
+JOB_CACHE_CONTROL = get_key('JOB_CACHE_CONTROL', 'no-cache')
+RESPONSE_CACHE_SIZE = int(get_key('RESPONSE_CACHE_SIZE', '1024'))
+RESPONSE_CACHE_MAX_BYTES = int(get_key('RESPONSE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    # If-None-Match uses weak comparison
+    return '*' in candidates or etag in [candidate.removeprefix('W/') for candidate in candidates]
+
+
+class ResponseCache:
+    """Serialized response bodies keyed by ETag, bounded by entry count and total size.
+
+    The ETag hashes only the request's path and query and the versions of the rows it renders, so
+    every worker derives the same ETag for the same data. The generation counter, bumped by
+    `invalidate`, only keeps a body rendered before this worker's last write from being stored.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.generation = 0
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def etag(self, request: Request, versions: Sequence[Tuple]) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f'{request.url.path}?{request.url.query}'.encode())
+        for version in versions:
+            digest.update(repr(tuple(version)).encode())
+        return f'"{digest.hexdigest()}"'
+
+    def get(self, etag: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return entry
+
+    def set(self, etag: str, body: bytes, headers: Dict[str, str], generation: int):
+        with self._lock:
+            # An invalidation ran while this was rendered, so the body may be older than its versions
+            if generation != self.generation or len(body) > self.max_bytes:
+                return
+            previous = self._entries.pop(etag, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            self._entries[etag] = (body, headers)
+            self.size += len(body)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'generation': self.generation,
+        }
+
+
+async def cached_response(request: Request, cache: ResponseCache, versions: Callable[[], Awaitable[Sequence[Tuple]]],
+                          render: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]],
+                          cache_control: str = JOB_CACHE_CONTROL) -> Response:
+    """Answer a GET from its row versions: 304 if the client's copy is current, cached bytes if this worker
+    rendered it before, otherwise `render()` and keep the result."""
+    generation = cache.generation
+    etag = cache.etag(request, await versions())
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        cache.not_modified += 1
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    entry = cache.get(etag)
+    if entry is None:
+        entry = await render()
+        cache.set(etag, *entry, generation)
+    body, extra_headers = entry
+    return Response(content=body, media_type='application/json', headers={**extra_headers, **headers})
+
+
+job_response_cache = ResponseCache()
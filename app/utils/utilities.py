@@ -1,31 +1,73 @@
 from dotenv import load_dotenv
 import os
 import logging
+from typing import Optional
+from .log_pipeline import JsonFormatter, LogPipeline, RequestIdFilter
 
 load_dotenv()
 
 
-def get_key(key: str) -> str:
-    value = os.getenv(key)
+def get_key(key: str, default: Optional[str] = None) -> str:
+    value = os.getenv(key, default)
     return value
 
 
-def logger_setup(name):
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+def get_flag(key: str, default: bool = False) -> bool:
+    value = os.getenv(key)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# LOG_QUEUE hands records to a background thread; LOG_FORMAT=json emits one JSON object per line
+LOG_QUEUE = get_flag('LOG_QUEUE')
+LOG_FORMAT = get_key('LOG_FORMAT', 'text')
+LOG_FILE = get_key('LOG_FILE', 'app/app.log')
+LOG_QUEUE_SIZE = int(get_key('LOG_QUEUE_SIZE', '10000'))
+# Fraction of INFO records kept in queue mode; warnings and errors are never sampled
+LOG_INFO_SAMPLE_RATE = float(get_key('LOG_INFO_SAMPLE_RATE', '1.0'))
+
+_log_pipeline: Optional[LogPipeline] = None
+
 
+def _build_handlers():
     c_handler = logging.StreamHandler()
-    f_handler = logging.FileHandler('app/app.log')
+    f_handler = logging.FileHandler(LOG_FILE)
     c_handler.setLevel(logging.INFO)
     f_handler.setLevel(logging.INFO)
 
-    c_format = logging.Formatter('%(name)s - %(levelname)s - %(message)s')
-    f_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    c_handler.setFormatter(c_format)
-    f_handler.setFormatter(f_format)
+    if LOG_FORMAT == 'json':
+        c_handler.setFormatter(JsonFormatter())
+        f_handler.setFormatter(JsonFormatter())
+    else:
+        c_format = logging.Formatter('%(name)s - %(levelname)s - %(message)s')
+        f_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        c_handler.setFormatter(c_format)
+        f_handler.setFormatter(f_format)
+    return c_handler, f_handler
+
+
+def get_log_pipeline() -> Optional[LogPipeline]:
+    global _log_pipeline
+    if LOG_QUEUE and _log_pipeline is None:
+        _log_pipeline = LogPipeline(list(_build_handlers()), LOG_QUEUE_SIZE, LOG_INFO_SAMPLE_RATE)
+    return _log_pipeline
+
+
+def logger_setup(name):
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    if logger.handlers:
+        return logger
+
+    pipeline = get_log_pipeline()
+    if pipeline is not None:
+        logger.addHandler(pipeline.handler)
+        return logger
 
-    logger.addHandler(c_handler)
-    logger.addHandler(f_handler)
+    for handler in _build_handlers():
+        handler.addFilter(RequestIdFilter())
+        logger.addHandler(handler)
 
     return logger
 
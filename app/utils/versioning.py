@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+# Read-and-update attempts for a write without an expected version before it is reported as a conflict
+VERSIONED_UPDATE_ATTEMPTS = 3
+
+
+def version_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+    """The version an If-Match header expects: `"3"`, `W/"3"` or `3`; None when absent or `*`."""
+    if value is None or value.strip() == '*':
+        return None
+    tag = value.strip().removeprefix('W/').strip('"')
+    if not tag.isdigit():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='If-Match must be a row version')
+    return int(tag)
+
+
+def version_conflict(name: str, current: int) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT,
+                         detail=f'{name} was modified; current version is {current}',
+                         headers={'ETag': version_etag(current)})
+
+
+def check_version(obj, expected: Optional[int], name: str):
+    if expected is not None and obj.version != expected:
+        raise version_conflict(name, obj.version)
+
+
+def has_changes(obj, values: Dict) -> bool:
+    return any(getattr(obj, key) != value for key, value in values.items())
+
+
+def versioned_update(db: Session, model, object_id: int, values: Dict, version: Optional[int] = None):
+    """UPDATE ... WHERE id = :id [AND version = :version] RETURNING the row, bumping its version.
+
+    The row comes back as the session's object for it, refreshed with the new values; None when no
+    row matched, because it is gone or its version moved on. Commit is left to the caller.
+    """
+    statement = update(model).where(model.id == object_id)
+    if version is not None:
+        statement = statement.where(model.version == version)
+    # The column's onupdate reaches the row but not the object populate_existing refreshes, so set it here
+    if 'updated_at' in model.__table__.c and 'updated_at' not in values:
+        values = dict(values, updated_at=datetime.utcnow())
+    statement = statement.values(**values, version=model.version + 1).returning(model)
+    return db.scalars(statement, execution_options={'populate_existing': True}).first()
+
+
+def raise_missed_update(db: Session, model, object_id: int, name: str):
+    """After `versioned_update` matched nothing: 404 if the row is gone, 409 with its current version otherwise."""
+    current = db.scalar(select(model.version).where(model.id == object_id))
+    if current is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'{name} not found')
+    raise version_conflict(name, current)
@@ -0,0 +1,161 @@
+"""Throughput of PATCH /applications/bulk against one PUT /applications/{id} per application.
+
+    python -m benchmarks.bench_bulk_status --applications 500 --rounds 5
+
+Each round creates two jobs with --applications submitted applications each. The applications of
+the first job are moved to `reviewing` one PUT at a time, as a reviewer's client does today; those
+of the second with a single PATCH /applications/bulk listing their ids, sent as the employer who
+posted both jobs. Both run in-process through
+the ASGI interface, as in benchmarks.load. The report has the time, applications per second and
+statements sent to the database for each path. The exit status is 1 if either path left an
+application or a counter behind.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+
+
+def prepare(applicants: int) -> Tuple[List[int], str]:
+    """Create the applicants, the first of them an employer; returns their ids and the employer's username."""
+    from sqlalchemy import insert
+    from app.database import SessionLocal, engine
+    from app.migrations.runner import upgrade
+    from app.models.user import User
+
+    upgrade(engine)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        offset = db.query(User).count()
+        rows = [{'username': f'bulk-bench{offset + i}', 'email': f'bulk-bench{offset + i}@example.com',
+                 'hashed_password': 'not-a-hash', 'is_active': True, 'is_hr': i == 0,
+                 'created_at': now, 'updated_at': now} for i in range(applicants)]
+        ids = list(db.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), rows))
+        db.commit()
+        return ids, rows[0]['username']
+
+
+def create_job_with_applications(applicant_ids: List[int]) -> List[int]:
+    from sqlalchemy import insert
+    from app.database import SessionLocal
+    from app.models.application import Application, ApplicationStatus
+    from app.models.job import EmploymentType
+    from app.schemas.job import JobCreate
+    from app.services.application_count_service import adjust_application_counts
+    from app.services.job_service import create_job
+
+    with SessionLocal() as db:
+        job = create_job(db, JobCreate(title='Bulk status benchmark', description='d', location='Remote',
+                                       employment_type=EmploymentType.FULL_TIME), applicant_ids[0])
+        now = datetime.utcnow()
+        rows = [{'cover_letter': 'Bulk status benchmark letter', 'status': ApplicationStatus.SUBMITTED,
+                 'job_id': job.id, 'applicant_id': applicant_id, 'applied_at': now, 'updated_at': now}
+                for applicant_id in applicant_ids]
+        ids = list(db.scalars(insert(Application).returning(Application.id), rows))
+        adjust_application_counts(db, job.id, {ApplicationStatus.SUBMITTED: len(ids)})
+        db.commit()
+        return ids
+
+
+def leftovers(application_ids: List[int]) -> int:
+    """Applications not moved to reviewing, plus counters that disagree with them."""
+    from sqlalchemy import func, select
+    from app.database import SessionLocal
+    from app.models.application import Application, ApplicationStatus
+    from app.services.application_count_service import get_application_counts
+
+    with SessionLocal() as db:
+        job_id = db.get(Application, application_ids[0]).job_id
+        unmoved = db.scalar(select(func.count()).where(Application.id.in_(application_ids),
+                                                       Application.status != ApplicationStatus.REVIEWING))
+        counts = get_application_counts(db, [job_id])[job_id]
+        wrong = counts[ApplicationStatus.SUBMITTED.value] != unmoved
+        wrong |= counts[ApplicationStatus.REVIEWING.value] != len(application_ids) - unmoved
+        return unmoved + int(wrong)
+
+
+async def run(applications: int, rounds: int) -> Dict:
+    import httpx
+    from sqlalchemy import event
+    from app.database import engine
+    from app.main import app
+    from app.services.auth_service import create_access_token
+
+    applicant_ids, employer = prepare(applications)
+    employer_headers = {'Authorization': f"Bearer {create_access_token({'sub': employer})}"}
+    counter = StatementCounter()
+    totals = {'per_row': {'seconds': 0.0, 'statements': 0, 'leftover': 0},
+              'bulk': {'seconds': 0.0, 'statements': 0, 'leftover': 0}}
+
+    async def timed(path: str, requests):
+        counter.statements = 0
+        started = time.perf_counter()
+        for method, url, body, headers in requests:
+            response = await client.request(method, url, json=body, headers=headers)
+            response.raise_for_status()
+        totals[path]['seconds'] += time.perf_counter() - started
+        totals[path]['statements'] += counter.statements
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            for _ in range(rounds):
+                per_row = create_job_with_applications(applicant_ids)
+                bulk = create_job_with_applications(applicant_ids)
+                event.listen(engine, 'before_cursor_execute', counter)
+                try:
+                    await timed('per_row', [('PUT', f'/applications/{application_id}', {'status': 'reviewing'}, None)
+                                            for application_id in per_row])
+                    await timed('bulk', [('PATCH', '/applications/bulk', {'ids': bulk, 'status': 'reviewing'},
+                                          employer_headers)])
+                finally:
+                    event.remove(engine, 'before_cursor_execute', counter)
+                totals['per_row']['leftover'] += leftovers(per_row)
+                totals['bulk']['leftover'] += leftovers(bulk)
+
+    moved = applications * rounds
+    report = {'database': engine.dialect.name, 'applications': applications, 'rounds': rounds}
+    for path, total in totals.items():
+        report[path] = {
+            'seconds': round(total['seconds'], 3),
+            'applications_per_s': round(moved / total['seconds'], 1),
+            'statements_per_application': round(total['statements'] / moved, 2),
+            'leftover': total['leftover'],
+        }
+    report['speedup'] = round(totals['per_row']['seconds'] / totals['bulk']['seconds'], 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=500, help='applications moved per path and round')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--database-url', help='defaults to a fresh SQLite file')
+    args = parser.parse_args()
+
+    # Settings are read at import time, so they must be in place before the app is imported
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{tempfile.mkdtemp()}/bench_bulk.db'
+    os.environ['APPLICATION_BULK_MAX_IDS'] = str(max(args.applications, 1000))
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret')
+    os.environ.setdefault('ALGORITHM', 'HS256')
+    os.environ.setdefault('ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+    report = asyncio.run(run(args.applications, args.rounds))
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report['per_row']['leftover'] or report['bulk']['leftover'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Requests per second for the sync and async database modes at high client concurrency.
+
+    python -m benchmarks.bench_db_modes --concurrency 500 --requests 20000
+
+Each mode runs in its own interpreter because DB_ASYNC is read at import time. The app is driven
+in-process through httpx's ASGI transport, so the numbers isolate the server side: sync mode is
+bounded by the threadpool, async mode by the event loop and the database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {'sync': '0', 'async': '1'}
+
+
+def seed(jobs: int):
+    from sqlalchemy import insert
+    from app.database import SessionLocal, engine
+    from app.migrations.runner import upgrade
+    from app.models.application import Application  # noqa: F401  (resolves the mapper relationships)
+    from app.models.job import Job
+    from app.models.user import User
+
+    upgrade(engine)
+    db = SessionLocal()
+    try:
+        if db.query(User).count():
+            return
+        db.execute(insert(User), [
+            {'username': 'employer', 'email': 'employer@example.com', 'hashed_password': 'x', 'is_hr': True}
+        ])
+        db.execute(insert(Job), [
+            {'title': f'Job {i}', 'description': 'Benchmark posting', 'location': 'Remote', 'employer_id': 1}
+            for i in range(jobs)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def drive(path: str, requests: int, concurrency: int) -> dict:
+    import httpx
+    from app.main import app
+
+    remaining = iter(range(requests))
+    failures = 0
+
+    async def client_loop(client):
+        nonlocal failures
+        for _ in remaining:
+            response = await client.get(path)
+            if response.status_code != 200:
+                failures += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        await client.get(path)  # warm up imports, pools and caches
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {'requests': requests, 'failures': failures, 'seconds': round(elapsed, 3),
+            'req_per_s': round(requests / elapsed, 1)}
+
+
+def run_mode(mode: str, args) -> dict:
+    env = dict(os.environ, DB_ASYNC=MODES[mode], DATABASE_URL=args.database_url)
+    command = [sys.executable, '-m', 'benchmarks.bench_db_modes', '--worker',
+               '--path', args.path, '--requests', str(args.requests), '--concurrency', str(args.concurrency),
+               '--jobs', str(args.jobs), '--database-url', args.database_url]
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/jobs/?limit=20')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--jobs', type=int, default=1000)
+    parser.add_argument('--database-url', default=f'sqlite:///{tempfile.gettempdir()}/bench_db_modes.db')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        seed(args.jobs)
+        print(json.dumps(asyncio.run(drive(args.path, args.requests, args.concurrency))))
+        return
+
+    results = {mode: run_mode(mode, args) for mode in MODES}
+    print(json.dumps({'path': args.path, 'concurrency': args.concurrency, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
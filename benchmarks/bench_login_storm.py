@@ -0,0 +1,114 @@
+"""Event-loop responsiveness while the API absorbs a burst of logins.
+
+    python -m benchmarks.bench_login_storm --logins 200 --concurrency 50
+
+Fires concurrent POST /auth/token requests and, at the same time, samples how late a 10 ms timer
+fires on the event loop and how long a cheap GET takes. With bcrypt on the password executor both
+stay flat; with bcrypt on the loop they grow with the storm.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+USERNAME = 'storm'
+PASSWORD = 'storm-password'
+
+
+def seed():
+    from sqlalchemy import insert
+    from app.database import SessionLocal, engine
+    from app.migrations.runner import upgrade
+    from app.models.application import Application  # noqa: F401  (resolves the mapper relationships)
+    from app.models.job import Job  # noqa: F401
+    from app.models.user import User
+    from app.services.password_service import get_password_hash
+
+    upgrade(engine)
+    db = SessionLocal()
+    try:
+        if db.query(User).filter(User.username == USERNAME).count():
+            return
+        db.execute(insert(User), [
+            {'username': USERNAME, 'email': 'storm@example.com', 'hashed_password': get_password_hash(PASSWORD)}
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentiles(samples) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]  # noqa: E731
+    return {'p50_ms': round(pick(0.50) * 1000, 2), 'p99_ms': round(pick(0.99) * 1000, 2),
+            'max_ms': round(ordered[-1] * 1000, 2), 'mean_ms': round(statistics.mean(ordered) * 1000, 2)}
+
+
+async def storm(logins: int, concurrency: int, probe_path: str) -> dict:
+    import httpx
+    from app.main import app
+
+    remaining = iter(range(logins))
+    failures = 0
+    done = asyncio.Event()
+    lag, probes = [], []
+
+    async def login_loop(client):
+        nonlocal failures
+        for _ in remaining:
+            response = await client.post('/auth/token', data={'username': USERNAME, 'password': PASSWORD})
+            if response.status_code != 200:
+                failures += 1
+
+    async def ticker(interval: float = 0.01):
+        while not done.is_set():
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            lag.append(max(0.0, time.perf_counter() - expected))
+
+    async def prober(client):
+        while not done.is_set():
+            started = time.perf_counter()
+            await client.get(probe_path)
+            probes.append(time.perf_counter() - started)
+            await asyncio.sleep(0.01)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        await client.get(probe_path)  # warm up imports and pools
+        background = [asyncio.create_task(ticker()), asyncio.create_task(prober(client))]
+        started = time.perf_counter()
+        await asyncio.gather(*(login_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*background)
+
+    return {'logins': logins, 'failures': failures, 'seconds': round(elapsed, 3),
+            'logins_per_s': round(logins / elapsed, 1),
+            'loop_lag': percentiles(lag), 'probe_latency': percentiles(probes)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--probe-path', default='/jobs/?limit=1')
+    parser.add_argument('--database-url', default=f'sqlite:///{tempfile.gettempdir()}/bench_login_storm.db')
+    args = parser.parse_args()
+
+    # Settings are read at import time, so they must be in place before the app is imported
+    os.environ['DATABASE_URL'] = args.database_url
+    # The storm measures bcrypt scheduling, so the login rate limit must not cut it short
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    seed()
+    result = asyncio.run(storm(args.logins, args.concurrency, args.probe_path))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
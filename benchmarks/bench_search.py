@@ -0,0 +1,141 @@
+"""Query latency and upkeep of the in-process search index used when the database has no full-text search.
+
+    python -m benchmarks.bench_search --jobs 50000 --queries 2000
+    python -m benchmarks.bench_search --jobs 50000 --target-ms 5
+
+The index is built from --jobs synthetic postings whose words follow a Zipf distribution over
+--vocabulary terms, as natural text does, so common terms have long postings lists. Queries of one
+to three terms are drawn from the same distribution. The report has the build time, the number of
+postings, query latency percentiles, and the time a search spends catching up on --changes jobs
+written by another worker, read from the job change log of a SQLite database. With --target-ms the
+exit status is 1 when the p95 query latency is above the target.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from .seed import LOCATIONS, TITLES, WORDS
+
+
+def vocabulary(size: int) -> List[str]:
+    return list(WORDS) + [f'term{i}' for i in range(max(0, size - len(WORDS)))]
+
+
+def generate_documents(count: int, terms: List[str], weights: List[float], rng: random.Random):
+    for job_id in range(1, count + 1):
+        yield (job_id, f'{rng.choice(TITLES)} {job_id}', ' '.join(rng.choices(terms, weights, k=30)),
+               rng.choice(LOCATIONS))
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    at = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000  # noqa: E731
+    return {'p50_ms': round(at(0.5), 3), 'p95_ms': round(at(0.95), 3), 'p99_ms': round(at(0.99), 3),
+            'mean_ms': round(statistics.mean(samples) * 1000, 3)}
+
+
+def bench_index(jobs: int, queries: int, terms: List[str], weights: List[float], rng: random.Random) -> Dict:
+    from app.services.search_service import InvertedIndex
+
+    index = InvertedIndex()
+    started = time.perf_counter()
+    index.rebuild(generate_documents(jobs, terms, weights, rng))
+    build_seconds = time.perf_counter() - started
+
+    samples = []
+    for _ in range(queries):
+        query = ' '.join(rng.choices(terms, weights, k=rng.randint(1, 3)))
+        started = time.perf_counter()
+        index.search(query, limit=10)
+        samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for job_id, title, description, location in generate_documents(1000, terms, weights, rng):
+        index.add(job_id, title, description, location)
+    update_seconds = time.perf_counter() - started
+    return {
+        'documents': len(index.doc_lengths),
+        'terms': len(index.postings),
+        'postings': sum(len(docs) for docs in index.postings.values()),
+        'build_seconds': round(build_seconds, 2),
+        'query': percentiles(samples),
+        'updates_per_s': round(1000 / update_seconds),
+    }
+
+
+def bench_catch_up(changes: int) -> Dict:
+    """Jobs inserted around this worker's index, then the time the next search spends applying them."""
+    from sqlalchemy import insert
+    from app.database import SessionLocal, engine
+    from app.migrations.runner import upgrade
+    from app.models.job import EmploymentType, Job
+    from app.models.job_change import JobChangeOperation
+    from app.models.user import User
+    from app.services.job_change_service import record_job_changes
+    from app.services.job_service import _ensure_search_index, search_jobs
+    from app.services.search_service import job_search_index
+
+    upgrade(engine)
+    now = time.time()
+    with SessionLocal() as db:
+        employer = User(username=f'search-bench{now}', email=f'search-bench{now}@example.com',
+                        hashed_password='not-a-hash', is_active=True, is_hr=True)
+        db.add(employer)
+        db.commit()
+        _ensure_search_index(db)
+
+        rows = [{'title': f'Catch up {i}', 'description': 'Written by another worker', 'location': 'Remote',
+                 'employment_type': EmploymentType.FULL_TIME, 'employer_id': employer.id}
+                for i in range(changes)]
+        job_ids = db.scalars(insert(Job).returning(Job.id), rows).all()
+        record_job_changes(db, job_ids, JobChangeOperation.CREATED)
+        db.commit()
+
+        started = time.perf_counter()
+        _ensure_search_index(db)
+        catch_up_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        _ensure_search_index(db)
+        idle_seconds = time.perf_counter() - started
+        found = len(search_jobs(db, 'another worker', limit=changes))
+    return {
+        'changes': changes,
+        'catch_up_ms': round(catch_up_seconds * 1000, 2),
+        'idle_check_ms': round(idle_seconds * 1000, 3),
+        'found': found,
+        'position': job_search_index.position,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=50000)
+    parser.add_argument('--vocabulary', type=int, default=5000, help='distinct description terms')
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--changes', type=int, default=1000, help='jobs written by "another worker"')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--target-ms', type=float, help='fail when the p95 query latency is above this')
+    args = parser.parse_args()
+
+    # Settings are read at import time, so they must be in place before the app is imported
+    os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/bench_search.db'
+    rng = random.Random(args.seed)
+    terms = vocabulary(args.vocabulary)
+    weights = [1 / rank for rank in range(1, len(terms) + 1)]
+    report = {'index': bench_index(args.jobs, args.queries, terms, weights, rng),
+              'catch_up': bench_catch_up(args.changes)}
+    print(json.dumps(report, indent=2))
+    if report['catch_up']['found'] != args.changes:
+        sys.exit(1)
+    if args.target_ms is not None and report['index']['query']['p95_ms'] > args.target_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Serialization cost of one 1000-item page, without the database.
+
+    python -m benchmarks.bench_serialization --items 1000 --rounds 50
+
+Builds transient Job, User and Application objects and encodes them as List[Job] and
+List[Application] three ways: FastAPI's default (validate through the response model, jsonable
+data, stdlib json), pydantic's dump_json, and the compiled serializer with orjson (FAST_JSON).
+Every path must produce the same JSON, which is checked before timing.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+
+def build_rows(items: int):
+    from app.models.application import Application, ApplicationStatus
+    from app.models.job import EmploymentType, Job
+    from app.models.user import User
+
+    now = datetime(2024, 1, 1)
+    employers = [User(id=i, username=f'employer{i}', email=f'employer{i}@example.com', hashed_password='x',
+                      is_active=True, is_hr=True, created_at=now, updated_at=now, version=1) for i in range(1, 51)]
+    jobs = [Job(id=i, title=f'Python Developer {i}', description='Build and run APIs ' * 10, location='Berlin',
+                employment_type=list(EmploymentType)[i % 5], is_active=True, employer=employers[i % 50],
+                employer_id=employers[i % 50].id, created_at=now + timedelta(seconds=i),
+                updated_at=now + timedelta(seconds=i), version=1) for i in range(1, items + 1)]
+    applications = [Application(id=i, cover_letter='I would like to apply for this role.', job=job,
+                                applicant=employers[i % 50], status=ApplicationStatus.SUBMITTED,
+                                applied_at=now, updated_at=now, version=1) for i, job in enumerate(jobs, 1)]
+    return jobs, applications
+
+
+def fastapi_default(schema, rows) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    adapter = TypeAdapter(List[schema])
+    validated = adapter.validate_python(rows, from_attributes=True)
+    content = jsonable_encoder(adapter.dump_python(validated, mode='json'))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode()
+
+
+def pydantic_dump_json(schema, rows) -> bytes:
+    from pydantic import TypeAdapter
+
+    adapter = TypeAdapter(List[schema])
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def compiled_fast(schema, rows) -> bytes:
+    from app.utils.serialization import compile_serializer, dumps
+
+    serialize = compile_serializer(schema)
+    return dumps([serialize(row) for row in rows])
+
+
+def timed(function, schema, rows, rounds: int) -> dict:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function(schema, rows)
+        samples.append(time.perf_counter() - started)
+    return {'median_ms': round(statistics.median(samples) * 1000, 2), 'min_ms': round(min(samples) * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    from app.schemas.application import Application
+    from app.schemas.job import Job
+    from app.utils import serialization
+
+    jobs, applications = build_rows(args.items)
+    results = {'items': args.items, 'orjson': serialization.orjson is not None}
+    for name, schema, rows in (('jobs', Job, jobs), ('applications', Application, applications)):
+        expected = json.loads(fastapi_default(schema, rows))
+        for function in (pydantic_dump_json, compiled_fast):
+            assert json.loads(function(schema, rows)) == expected, f'{function.__name__} output differs for {name}'
+        baseline = timed(fastapi_default, schema, rows, args.rounds)
+        results[name] = {
+            'fastapi_default': baseline,
+            'pydantic_dump_json': timed(pydantic_dump_json, schema, rows, args.rounds),
+            'compiled_fast': timed(compiled_fast, schema, rows, args.rounds),
+        }
+        results[name]['speedup'] = round(baseline['median_ms'] / results[name]['compiled_fast']['median_ms'], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""Memory, event-loop lag and fan-out latency of idle event-stream subscribers in one worker.
+
+    python -m benchmarks.bench_sse_idle --subscribers 10000 --heartbeat 2
+
+Opens --subscribers streams on GET /applications/events for one applicant. They run in-process
+through the ASGI interface, as in benchmarks.load, so kernel socket buffers are not counted. With
+every stream idle, it reports:
+
+- the worker's memory per subscriber;
+- how late the event loop wakes up;
+- whether every stream got a heartbeat.
+
+Then it changes the application's status once and reports how long the event took to reach each
+subscriber. The exit status is 1 if any stream missed the heartbeat or the event.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+BENCH_USERNAME = 'sse-bench'
+
+
+class Stream:
+    __slots__ = ('disconnect', 'status', 'snapshot', 'heartbeats', 'event_at')
+
+    def __init__(self):
+        self.disconnect = asyncio.Event()
+        self.status: Optional[int] = None
+        self.snapshot = False
+        self.heartbeats = 0
+        self.event_at: Optional[float] = None
+
+
+async def open_stream(app, headers, stream: Stream):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': '/applications/events', 'raw_path': b'/applications/events', 'query_string': b'',
+        'root_path': '', 'headers': headers, 'client': ('127.0.0.1', 50000), 'server': ('bench', 80),
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await stream.disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            stream.status = message['status']
+            return
+        body = message.get('body', b'')
+        if body.startswith(b': heartbeat'):
+            stream.heartbeats += 1
+        elif b'event: status' in body:
+            stream.event_at = time.perf_counter()
+        elif b'event: snapshot' in body:
+            stream.snapshot = True
+
+    await app(scope, receive, send)
+
+
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Peak rather than current outside Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+async def measure_lag(seconds: float, interval: float = 0.05) -> List[float]:
+    lags = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+    return lags
+
+
+def _ms(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2) if ordered else 0.0
+
+
+def prepare() -> dict:
+    from app.database import SessionLocal, engine
+    from app.migrations.runner import upgrade
+    from app.models.job import EmploymentType
+    from app.schemas.application import ApplicationCreate
+    from app.schemas.job import JobCreate
+    from app.schemas.user import UserCreate
+    from app.services.application_service import create_application
+    from app.services.auth_service import create_access_token
+    from app.services.job_service import create_job
+    from app.services.user_service import create_user
+
+    upgrade(engine)
+    with SessionLocal() as db:
+        user = create_user(db, UserCreate(username=BENCH_USERNAME, email='sse-bench@example.com',
+                                          password='benchmark'), hashed_password='not-a-hash')
+        job = create_job(db, JobCreate(title='Event stream benchmark', description='d', location='Remote',
+                                       employment_type=EmploymentType.FULL_TIME), user.id)
+        application = create_application(db, ApplicationCreate(cover_letter='Event stream benchmark letter',
+                                                               job_id=job.id), user.id)
+        return {'application_id': application.id, 'token': create_access_token({'sub': BENCH_USERNAME})}
+
+
+async def run(subscribers: int, heartbeat: float, batch: int) -> dict:
+    import httpx
+    from app.main import app
+    from app.utils.pubsub import event_broker
+
+    fixture = prepare()
+    headers = [(b'authorization', f"Bearer {fixture['token']}".encode())]
+    streams = [Stream() for _ in range(subscribers)]
+    report = {'subscribers': subscribers, 'heartbeat_seconds': heartbeat}
+
+    async with app.router.lifespan_context(app):
+        rss_before = rss_bytes()
+        connect_started = time.perf_counter()
+        tasks = []
+        for start in range(0, subscribers, batch):
+            tasks += [asyncio.create_task(open_stream(app, headers, stream)) for stream in streams[start:start + batch]]
+            while event_broker.subscribers < len(tasks):
+                await asyncio.sleep(0.01)
+        report['connect_seconds'] = round(time.perf_counter() - connect_started, 2)
+        while sum(stream.snapshot for stream in streams) < subscribers:
+            await asyncio.sleep(0.01)
+
+        # Idle for two heartbeat intervals; every stream should get at least one
+        lags = await measure_lag(heartbeat * 2 + 0.5)
+        rss_idle = rss_bytes()
+        report['rss_mb'] = round(rss_idle / 2 ** 20, 1)
+        report['bytes_per_subscriber'] = round((rss_idle - rss_before) / subscribers)
+        report['loop_lag_ms'] = {'p50': _ms(lags, 0.5), 'p99': _ms(lags, 0.99), 'max': _ms(lags, 1.0)}
+        report['missed_heartbeat'] = sum(1 for stream in streams if not stream.heartbeats)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            published = time.perf_counter()
+            response = await client.put(f"/applications/{fixture['application_id']}", json={'status': 'reviewing'})
+            response.raise_for_status()
+        deadline = time.perf_counter() + 10
+        while any(stream.event_at is None for stream in streams) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.005)
+        delays = [stream.event_at - published for stream in streams if stream.event_at is not None]
+        report['missed_event'] = subscribers - len(delays)
+        report['event_delivery_ms'] = {'p50': _ms(delays, 0.5), 'p99': _ms(delays, 0.99), 'max': _ms(delays, 1.0)}
+        report['broker'] = event_broker.stats()
+
+        for stream in streams:
+            stream.disconnect.set()
+        await asyncio.wait(tasks, timeout=30)
+        report['subscribers_after_disconnect'] = event_broker.subscribers
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscribers', type=int, default=10000)
+    parser.add_argument('--heartbeat', type=float, default=2.0, help='EVENTS_HEARTBEAT_SECONDS for the run')
+    parser.add_argument('--batch', type=int, default=500, help='streams opened at a time')
+    parser.add_argument('--database-url', help='defaults to a fresh SQLite file')
+    args = parser.parse_args()
+
+    # Settings are read at import time, so they must be in place before the app is imported
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{tempfile.mkdtemp()}/bench_sse.db'
+    os.environ['EVENTS_HEARTBEAT_SECONDS'] = str(args.heartbeat)
+    os.environ['EVENTS_MAX_SUBSCRIBERS'] = str(args.subscribers)
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret')
+    os.environ.setdefault('ALGORITHM', 'HS256')
+    os.environ.setdefault('ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+    # One client address opens every stream
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    report = asyncio.run(run(args.subscribers, args.heartbeat, args.batch))
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report['missed_heartbeat'] or report['missed_event'] else 0)
+
+
+if __name__ == '__main__':
+    main()
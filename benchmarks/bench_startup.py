@@ -0,0 +1,96 @@
+"""Cold-start time of one worker: importing the app, running its startup, serving the first request.
+
+    python -m benchmarks.bench_startup --rounds 10 --target-ms 1500
+    python -m benchmarks.bench_startup --importtime
+
+Every round is a fresh interpreter, as a new uvicorn worker would be, against a database that has
+been migrated once up front. With --target-ms the exit status is 1 when the median total (process
+start to first response) is above the target. --importtime lists the slowest imports instead.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CHILD = '''
+import asyncio, json, time
+import httpx
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/jobs/?limit=1")
+        served = time.perf_counter()
+    assert response.status_code == 200, response.text
+    return ready, served
+
+ready, served = asyncio.run(main())
+print(json.dumps({"import_ms": (imported - started) * 1000, "startup_ms": (ready - imported) * 1000,
+                  "first_request_ms": (served - ready) * 1000}))
+'''
+
+
+def run_round(env: dict) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD], env=env, check=True, capture_output=True, text=True)
+    timings = json.loads(output.stdout.strip().splitlines()[-1])
+    # Interpreter start-up and exit included
+    timings['process_ms'] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def slowest_imports(env: dict, top: int):
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app.main'], env=env, check=True,
+                            capture_output=True, text=True)
+    rows = []
+    for line in output.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace('import time:', '|').split('|')]
+        rows.append((int(cumulative_us), int(self_us), name))
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f'{cumulative_us / 1000:9.1f} ms  {self_us / 1000:8.1f} ms self  {name}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--target-ms', type=float, help='fail when the median process_ms is above this')
+    parser.add_argument('--importtime', action='store_true', help='list the slowest imports and exit')
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--database-url', default=f'sqlite:///{tempfile.gettempdir()}/bench_startup.db')
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL=args.database_url)
+    env.setdefault('SECRET_KEY', 'benchmark-secret')
+    env.setdefault('ALGORITHM', 'HS256')
+    env.setdefault('ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+    if args.importtime:
+        slowest_imports(env, args.top)
+        return
+    subprocess.run([sys.executable, '-m', 'app.cli', 'migrate'], env=env, check=True, capture_output=True)
+
+    rounds = [run_round(env) for _ in range(args.rounds)]
+    report = {'rounds': args.rounds}
+    for key in ('import_ms', 'startup_ms', 'first_request_ms', 'process_ms'):
+        samples = [timings[key] for timings in rounds]
+        report[key] = {'median': round(statistics.median(samples), 1), 'max': round(max(samples), 1)}
+    print(json.dumps(report, indent=2))
+
+    if args.target_ms is not None and report['process_ms']['median'] > args.target_ms:
+        print(f"Cold start {report['process_ms']['median']} ms is above the {args.target_ms} ms target",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
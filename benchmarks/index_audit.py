@@ -0,0 +1,265 @@
+"""EXPLAIN every query the services issue against a seeded database and fail on full scans of large tables.
+
+    python -m benchmarks.seed --users 100000 --jobs 50000 --applications 1000000
+    python -m benchmarks.index_audit --min-rows 10000
+
+Each workload below calls one service function the way its route does, with every statement it
+sends captured at the cursor. Writes run inside an outer transaction that is rolled back at the
+end, so the database is left as it was. Every captured SELECT, UPDATE and DELETE is then explained:
+on Postgres a "Seq Scan" node, on SQLite a "SCAN <table>" step, over a table with at least
+--min-rows rows is a finding. An unfiltered scan feeding a LIMIT with nothing that has to read all
+of its input (a sort, an aggregate, a hash) in between stops early and is not reported; a filtered
+one may read the whole table looking for matches, so it is. Scans that are meant to
+read the whole table are listed in ALLOWED_FULL_SCANS with the reason. The exit status is 1 when
+there are findings.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .seed import add_database_arguments
+
+# (workload, table) -> why reading the whole table is intended
+ALLOWED_FULL_SCANS = {
+    ('get_job_facets', 'jobs'): 'facets are counted over every active job once per refresh interval',
+    ('search_jobs', 'jobs'): 'the in-process search index is built from every active job once per worker',
+    ('reconcile_application_counts', 'applications'): 'the reconciliation recounts every application',
+    ('reconcile_application_counts', 'job_application_counts'): 'orphaned counters are found by scanning them all',
+}
+
+# Plan nodes that consume all of their input before returning a row, so a LIMIT above them saves nothing
+_BLOCKING_NODES = {'Sort', 'Aggregate', 'Hash', 'Materialize', 'WindowAgg', 'SetOp'}
+_EXPLAINED = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?\s+AS\s+"?(\w+)"?', re.IGNORECASE)
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+@dataclass
+class Captured:
+    workload: str
+    statement: str
+    parameters: object
+    findings: List[Dict] = field(default_factory=list)
+
+
+class Recorder:
+    """Keeps each distinct statement a workload sends, with the parameters of its first execution."""
+
+    def __init__(self):
+        self.workload: Optional[str] = None
+        self.captured: Dict[Tuple[str, str], Captured] = {}
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.workload is None or executemany or not statement.lstrip().upper().startswith(_EXPLAINED):
+            return
+        self.captured.setdefault((self.workload, statement),
+                                 Captured(self.workload, statement, parameters))
+
+
+def _workloads(db) -> List[Tuple[str, Callable]]:
+    from sqlalchemy import select
+    from app.models.application import Application, ApplicationStatus
+    from app.models.job import EmploymentType, Job
+    from app.models.user import User
+    from app.schemas.application import (
+        Application as ApplicationSchema, ApplicationBulkUpdate, ApplicationCreate, ApplicationUpdate
+    )
+    from app.schemas.job import Job as JobSchema, JobCreate, JobSort, JobUpdate
+    from app.schemas.user import UserCreate
+    from app.services import (
+        application_count_service, application_service, job_change_service, job_service, user_service
+    )
+    from app.utils.pagination import encode_cursor
+
+    employer = db.scalar(select(User).where(User.is_hr.is_(True)).order_by(User.id).limit(1))
+    applicant_id, job_id = db.execute(select(Application.applicant_id, Application.job_id)
+                                      .order_by(Application.id).limit(1)).one()
+    application_id = db.scalar(select(Application.id).order_by(Application.id).limit(1))
+    created = {}
+
+    def create_job():
+        job = JobCreate(title='Index audit job', description='Created by the index audit', location='Remote',
+                        employment_type=EmploymentType.FULL_TIME)
+        created['job'] = job_service.create_job(db, job, employer.id, schema=JobSchema).id
+
+    def create_application():
+        application = ApplicationCreate(cover_letter='Index audit application letter', job_id=created['job'])
+        created['application'] = application_service.create_application(db, application, applicant_id).id
+
+    def create_user():
+        user = UserCreate(username='index-audit', email='index-audit@example.com', password='index-audit')
+        created['user'] = user_service.create_user(db, user, hashed_password='not-a-hash').id
+
+    def lazy_loads():
+        # The relationship loads behind `job.applications`, `user.applications` and `user.jobs_posted`
+        db.expire_all()
+        len(db.get(Job, job_id).applications)
+        user = db.get(User, applicant_id)
+        len(user.applications)
+        len(db.get(User, employer.id).jobs_posted)
+
+    return [
+        ('get_user_by_id', lambda: user_service.get_user_by_id(db, applicant_id)),
+        ('get_user_by_username', lambda: user_service.get_user_by_username(db, employer.username)),
+        ('get_user_by_email', lambda: user_service.get_user_by_email(db, employer.email)),
+        ('get_all_users', lambda: user_service.get_all_users(db, limit=20)),
+        ('get_job_by_id', lambda: job_service.get_job_by_id(db, job_id, schema=JobSchema)),
+        ('get_job_version', lambda: job_service.get_job_version(db, job_id)),
+        ('get_all_jobs', lambda: job_service.get_all_jobs(db, limit=20, schema=JobSchema)),
+        ('get_all_jobs filtered', lambda: job_service.get_all_jobs(
+            db, limit=20, schema=JobSchema, location='Berlin', is_active=True, sort=JobSort.NEWEST)),
+        ('get_job_versions', lambda: job_service.get_job_versions(db, limit=20, is_active=True)),
+        ('get_jobs_by_employer', lambda: job_service.get_jobs_by_employer(db, employer.id, limit=20)),
+        ('get_employer_dashboard', lambda: application_count_service.get_employer_dashboard(db, employer.id)),
+        ('search_jobs', lambda: job_service.search_jobs(db, 'python remote', limit=20)),
+        ('get_job_facets', lambda: job_service.get_job_facets(db)),
+        ('get_application_by_id', lambda: application_service.get_application_by_id(
+            db, application_id, schema=ApplicationSchema)),
+        ('get_all_applications', lambda: application_service.get_all_applications(db, limit=20)),
+        ('get_applications_by_user', lambda: application_service.get_applications_by_user(db, applicant_id)),
+        ('relationship loads', lazy_loads),
+        ('get_job_changes', lambda: job_change_service.get_job_changes(db, limit=100)),
+        ('get_job_changes since', lambda: job_change_service.get_job_changes(
+            db, since=encode_cursor([job_id]), limit=100)),
+        ('create_job', create_job),
+        ('update_job', lambda: job_service.update_job(db, created['job'], JobUpdate(location='Berlin'))),
+        ('create_application', create_application),
+        ('update_application', lambda: application_service.update_application(
+            db, created['application'], ApplicationUpdate(status=ApplicationStatus.REVIEWING))),
+        ('bulk_update_application_status', lambda: application_service.bulk_update_application_status(
+            db, ApplicationBulkUpdate(ids=[created['application'], application_id],
+                                      status=ApplicationStatus.REJECTED), employer.id)),
+        ('bulk_update_application_status by job', lambda: application_service.bulk_update_application_status(
+            db, ApplicationBulkUpdate(job_id=created['job'], current_status=ApplicationStatus.REJECTED,
+                                      status=ApplicationStatus.REVIEWING), employer.id)),
+        ('delete_application', lambda: application_service.delete_application(db, created['application'])),
+        ('delete_job', lambda: job_service.delete_job(db, created['job'])),
+        ('create_user', create_user),
+        ('delete_user', lambda: user_service.delete_user(db, created['user'])),
+        ('compact_job_changes', lambda: job_change_service.compact_job_changes(db)),
+        ('reconcile_application_counts',
+         lambda: application_count_service.reconcile_application_counts(db, batch_size=1000)),
+    ]
+
+
+def _table_sizes(connection) -> Dict[str, int]:
+    from sqlalchemy import func, select
+    from app.database import Base
+    from app.models import application, application_count, job, job_change, user  # noqa: F401  (registers the tables)
+
+    return {table.name: connection.scalar(select(func.count()).select_from(table))
+            for table in Base.metadata.sorted_tables}
+
+
+def _postgres_scans(plan: Dict, under_limit: bool = False):
+    """Yield (table, stops early) for every Seq Scan in a Postgres JSON plan."""
+    node_type = plan['Node Type']
+    if node_type == 'Limit':
+        under_limit = True
+    elif node_type in _BLOCKING_NODES:
+        under_limit = False
+    if node_type == 'Seq Scan':
+        yield plan['Relation Name'], under_limit and 'Filter' not in plan
+    for child in plan.get('Plans', ()):
+        yield from _postgres_scans(child, under_limit)
+
+
+def _explain_postgres(connection, captured: Captured) -> List[Tuple[str, bool, str]]:
+    plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + captured.statement, captured.parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return [(table, early, 'Seq Scan') for table, early in _postgres_scans(plan[0]['Plan'])]
+
+
+def _explain_sqlite(connection, captured: Captured) -> List[Tuple[str, bool, str]]:
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + captured.statement, captured.parameters).all()
+    details = [row[-1] for row in rows]
+    aliases = {alias: table for table, alias in _ALIAS.findall(captured.statement)}
+    keywords = set(captured.statement.upper().split())
+    # The plan doesn't say which steps filter, so any WHERE counts against stopping early
+    stops_early = ('LIMIT' in keywords and 'WHERE' not in keywords
+                   and not any('TEMP B-TREE' in detail for detail in details))
+    scans = []
+    for detail in details:
+        match = _SQLITE_SCAN.match(detail)
+        if match:
+            scans.append((aliases.get(match.group(1), match.group(1)), stops_early, detail))
+    return scans
+
+
+def audit(min_rows: int) -> Dict:
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from app.database import engine
+
+    dialect = engine.dialect.name
+    explain = _explain_postgres if dialect == 'postgresql' else _explain_sqlite
+    recorder = Recorder()
+    errors = {}
+    with engine.connect() as connection:
+        if dialect == 'postgresql':
+            # Fresh statistics, so the planner sees the seeded row counts
+            connection.exec_driver_sql('ANALYZE')
+        sizes = _table_sizes(connection)
+        connection.commit()
+        if not sizes.get('applications'):
+            raise SystemExit('Seed the database first: python -m benchmarks.seed')
+
+        outer = connection.begin()
+        # The services commit; with savepoints those commits stay inside the outer transaction
+        db = Session(bind=connection, join_transaction_mode='create_savepoint')
+        event.listen(connection, 'before_cursor_execute', recorder)
+        try:
+            for name, run in _workloads(db):
+                recorder.workload = name
+                try:
+                    run()
+                except Exception as e:
+                    errors[name] = repr(e)
+                    db.rollback()
+            recorder.workload = None
+            for captured in recorder.captured.values():
+                for table, stops_early, detail in explain(connection, captured):
+                    if sizes.get(table, 0) < min_rows or stops_early:
+                        continue
+                    captured.findings.append({'table': table, 'rows': sizes[table], 'plan': detail})
+        finally:
+            event.remove(connection, 'before_cursor_execute', recorder)
+            db.close()
+            outer.rollback()
+
+    findings, allowed = [], []
+    for captured in recorder.captured.values():
+        for finding in captured.findings:
+            entry = dict(finding, workload=captured.workload, statement=' '.join(captured.statement.split()))
+            reason = ALLOWED_FULL_SCANS.get((captured.workload, finding['table']))
+            if reason:
+                allowed.append(dict(entry, reason=reason))
+            else:
+                findings.append(entry)
+    return {'database': dialect, 'min_rows': min_rows, 'tables': sizes,
+            'statements': len(recorder.captured), 'errors': errors, 'allowed': allowed, 'findings': findings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-rows', type=int, default=10000, help='tables smaller than this may be scanned')
+    add_database_arguments(parser, 'benchmark')
+    args = parser.parse_args()
+
+    # Settings are read at import time, so they must be in place before the app is imported
+    os.environ['DATABASE_URL'] = args.database_url
+    report = audit(args.min_rows)
+    print(json.dumps(report, indent=2))
+    for finding in report['findings']:
+        print(f"FULL SCAN {finding['workload']}: {finding['table']} ({finding['rows']} rows): {finding['plan']}",
+              file=sys.stderr)
+    sys.exit(1 if report['findings'] or report['errors'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""Latency and throughput for every router, driven in-process against a seeded database.
+
+    python -m benchmarks.seed --users 100000 --jobs 50000 --applications 1000000
+    python -m benchmarks.load --requests 2000 --concurrency 50 --output results.json
+    python -m benchmarks.load --baseline results.json --threshold 0.15
+
+Each endpoint gets --requests requests from --concurrency concurrent clients through httpx's ASGI
+transport, so the numbers measure the app and the database without a network hop. Writes run after
+the reads and only touch rows the run itself created. With --baseline, any endpoint whose p95 grew or
+whose req/s fell by more than --threshold is reported and the exit status is 1.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .seed import BENCH_EMPLOYER, BENCH_PASSWORD, add_database_arguments
+
+ADMIN_TOKEN = 'benchmark-admin'
+
+# (method, path, json body or None, form data or None)
+Request = Tuple[str, str, Optional[dict], Optional[dict]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: Callable[[int], Request]
+    auth: bool = False
+
+
+class State:
+    """Ids discovered from the database and created during the run, shared by the scenarios."""
+
+    def __init__(self, users: int, jobs: int, applications: int, rng: random.Random):
+        self.users = users
+        self.jobs = jobs
+        self.applications = applications
+        self.rng = rng
+        self.created_jobs: List[int] = []
+        self.created_users: List[int] = []
+        self.created_applications: List[int] = []
+        self.run_id = int(time.time())
+
+    def user_id(self) -> int:
+        return self.rng.randint(1, self.users)
+
+    def job_id(self) -> int:
+        return self.rng.randint(1, self.jobs)
+
+    def application_id(self) -> int:
+        return self.rng.randint(1, self.applications)
+
+    @staticmethod
+    def pop(ids: List[int]) -> int:
+        return ids.pop() if ids else 0
+
+
+def job_body(i: int) -> dict:
+    return {'title': f'Load test job {i}', 'description': 'Created by the load test', 'location': 'Remote',
+            'employment_type': 'full_time'}
+
+
+def scenarios(state: State) -> List[Scenario]:
+    counter = itertools.count()
+    unique = lambda: f'{state.run_id}x{next(counter)}'  # noqa: E731
+    return [
+        # reads
+        Scenario('GET /jobs/', lambda i: ('GET', '/jobs/?limit=20', None, None)),
+        Scenario('GET /jobs/ filtered', lambda i: ('GET', '/jobs/?limit=20&location=Berlin&sort=-created_at'
+                                                   '&is_active=true', None, None)),
+        Scenario('GET /jobs/ cursor', lambda i: ('GET', '/jobs/?limit=20&cursor=', None, None)),
+        Scenario('GET /jobs/{id}', lambda i: ('GET', f'/jobs/{state.job_id()}', None, None)),
+        Scenario('GET /jobs/changes', lambda i: ('GET', '/jobs/changes?limit=100', None, None)),
+        Scenario('GET /jobs/search', lambda i: ('GET', '/jobs/search?q=python+remote&limit=20', None, None)),
+        Scenario('GET /jobs/facets', lambda i: ('GET', '/jobs/facets', None, None)),
+        Scenario('GET /users/', lambda i: ('GET', '/users/?limit=20', None, None)),
+        Scenario('GET /users/{id}', lambda i: ('GET', f'/users/{state.user_id()}', None, None)),
+        Scenario('GET /applications/', lambda i: ('GET', '/applications/?limit=20', None, None)),
+        Scenario('GET /applications/{id}', lambda i: ('GET', f'/applications/{state.application_id()}', None, None)),
+        Scenario('GET /admin/pool', lambda i: ('GET', '/admin/pool', None, None)),
+        Scenario('GET /metrics', lambda i: ('GET', '/metrics', None, None)),
+        Scenario('POST /auth/token', lambda i: ('POST', '/auth/token', None,
+                                                {'username': BENCH_EMPLOYER, 'password': BENCH_PASSWORD})),
+        # writes, on rows created here
+        Scenario('POST /auth/signup', lambda i: ('POST', '/auth/signup', {
+            'username': f'signup{unique()}', 'email': f'signup{unique()}@example.com', 'password': BENCH_PASSWORD,
+        }, None)),
+        Scenario('POST /users/', lambda i: ('POST', '/users/', {
+            'username': f'load{unique()}', 'email': f'load{unique()}@example.com', 'password': BENCH_PASSWORD,
+        }, None)),
+        Scenario('PUT /users/{id}', lambda i: ('PUT', f'/users/{state.rng.choice(state.created_users or [0])}',
+                                              {'is_hr': True}, None)),
+        Scenario('POST /jobs/', lambda i: ('POST', '/jobs/', job_body(i), None), auth=True),
+        Scenario('PUT /jobs/{id}', lambda i: ('PUT', f'/jobs/{state.rng.choice(state.created_jobs or [0])}',
+                                             {'location': 'Berlin'}, None)),
+        # One application per job created above: a second one for the same job is a 409
+        Scenario('POST /applications/', lambda i: ('POST', '/applications/', {
+            'cover_letter': 'Load test application letter',
+            'job_id': state.created_jobs[i % len(state.created_jobs)] if state.created_jobs else 1,
+        }, None), auth=True),
+        Scenario('PUT /applications/{id}', lambda i: (
+            'PUT', f'/applications/{state.rng.choice(state.created_applications or [0])}',
+            {'status': 'reviewing'}, None)),
+        # The jobs the created applications belong to were posted by the signed-in employer
+        Scenario('PATCH /applications/bulk', lambda i: ('PATCH', '/applications/bulk', {
+            'ids': state.created_applications[-50:], 'status': 'reviewing',
+        }, None), auth=True),
+        Scenario('DELETE /applications/{id}', lambda i: (
+            'DELETE', f'/applications/{state.pop(state.created_applications)}', None, None)),
+        Scenario('DELETE /jobs/{id}', lambda i: ('DELETE', f'/jobs/{state.pop(state.created_jobs)}', None, None)),
+        Scenario('DELETE /users/{id}', lambda i: ('DELETE', f'/users/{state.pop(state.created_users)}', None, None)),
+    ]
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def summarize(latencies: List[float], failures: int, elapsed: float) -> Dict:
+    ordered = sorted(latencies)
+    return {
+        'requests': len(latencies), 'failures': failures, 'req_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 2), 'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+    }
+
+
+def _record_created(scenario: Scenario, state: State, response):
+    if response.status_code != 200:
+        return
+    created = {'POST /jobs/': state.created_jobs, 'POST /users/': state.created_users,
+               'POST /applications/': state.created_applications}.get(scenario.name)
+    if created is not None:
+        created.append(response.json()['id'])
+
+
+async def run_scenario(client, scenario: Scenario, state: State, requests: int, concurrency: int,
+                       headers: Dict[str, str]) -> Dict:
+    remaining = iter(range(requests))
+    latencies: List[float] = []
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        for i in remaining:
+            method, path, body, form = scenario.build(i)
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body, data=form,
+                                            headers=headers if scenario.auth else None)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                failures += 1
+            else:
+                _record_created(scenario, state, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, failures, time.perf_counter() - started)
+
+
+async def run(requests: int, concurrency: int, only: Optional[str]) -> Dict:
+    import httpx
+    from sqlalchemy import func, select
+    from app.database import SessionLocal
+    from app.main import app
+    from app.models.application import Application
+    from app.models.job import Job
+    from app.models.user import User
+
+    with SessionLocal() as db:
+        counts = [db.scalar(select(func.max(model.id))) or 0 for model in (User, Job, Application)]
+    if not all(counts):
+        raise SystemExit('Seed the database first: python -m benchmarks.seed')
+    state = State(*counts, rng=random.Random(7))
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench',
+                                 headers={'X-Admin-Token': ADMIN_TOKEN}) as client:
+        token = (await client.post('/auth/token', data={'username': BENCH_EMPLOYER, 'password': BENCH_PASSWORD}))
+        token.raise_for_status()
+        headers = {'Authorization': f"Bearer {token.json()['access_token']}"}
+        for scenario in scenarios(state):
+            if only and only not in scenario.name:
+                continue
+            if scenario.name.startswith('GET'):
+                await client.get(scenario.build(0)[1])  # warm up caches and pools
+            results[scenario.name] = await run_scenario(client, scenario, state, requests, concurrency, headers)
+            print(f'{scenario.name:32} {json.dumps(results[scenario.name])}', file=sys.stderr)
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            continue
+        if previous['p95_ms'] and current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms")
+        if current['req_per_s'] < previous['req_per_s'] * (1 - threshold):
+            regressions.append(f"{name}: {previous['req_per_s']} req/s -> {current['req_per_s']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--only', help='run endpoints whose name contains this text')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--baseline', help='JSON report from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed relative slowdown')
+    add_database_arguments(parser, 'benchmark')
+    args = parser.parse_args()
+
+    # Settings are read at import time, so they must be in place before the app is imported
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ['ADMIN_TOKEN'] = ADMIN_TOKEN
+    # Every request comes from one client address, which the auth rate limits would throttle
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    endpoints = asyncio.run(run(args.requests, args.concurrency, args.only))
+    report = {
+        'database': args.database_url.split('://', 1)[0],
+        'db_async': os.environ.get('DB_ASYNC', ''),
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'endpoints': endpoints,
+    }
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(report, json.load(handle), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
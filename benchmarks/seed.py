@@ -0,0 +1,202 @@
+"""Fill a database with synthetic users, jobs and applications for benchmarking.
+
+    python -m benchmarks.seed --users 100000 --jobs 50000 --applications 1000000 \\
+        --database-url postgresql://localhost/job_portal_bench
+
+Rows are generated deterministically from --seed and written in batches with executemany (COPY on
+psycopg2), with explicit ids so foreign keys never need a read-back. Every seeded user shares the
+password BENCH_PASSWORD, hashed once, and the first users are employers (is_hr).
+"""
+import argparse
+import csv
+import enum
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_PASSWORD = 'benchmark-password'
+BENCH_EMPLOYER = 'user1'
+
+LOCATIONS = ['Berlin', 'London', 'Paris', 'Remote', 'New York', 'Toronto', 'Amsterdam', 'Madrid', 'Warsaw', 'Lisbon']
+TITLES = ['Backend Engineer', 'Data Analyst', 'Product Designer', 'DevOps Engineer', 'Python Developer',
+          'Frontend Engineer', 'QA Engineer', 'Technical Writer', 'Data Scientist', 'Engineering Manager']
+WORDS = ('python sql postgres api cloud docker kubernetes react design testing analytics machine learning '
+         'remote team agile product customer security linux scaling performance').split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate_users(count: int, employers: int, hashed_password: str, started: datetime):
+    for user_id in range(1, count + 1):
+        yield {
+            'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+            'hashed_password': hashed_password, 'is_active': True, 'is_hr': user_id <= employers,
+            'created_at': started, 'updated_at': started,
+        }
+
+
+def generate_jobs(count: int, employers: int, rng: random.Random, started: datetime):
+    from app.models.job import EmploymentType
+
+    employment_types = list(EmploymentType)
+    for job_id in range(1, count + 1):
+        created_at = started + timedelta(seconds=job_id)
+        yield {
+            'id': job_id, 'title': f'{rng.choice(TITLES)} {job_id}', 'description': _sentence(rng, 30),
+            'employment_type': rng.choice(employment_types), 'location': rng.choice(LOCATIONS),
+            'is_active': rng.random() < 0.9, 'employer_id': rng.randint(1, employers),
+            'created_at': created_at, 'updated_at': created_at,
+        }
+
+
+def generate_job_changes(count: int, started: datetime):
+    from app.models.job_change import JobChangeOperation
+
+    # One CREATED entry per job, so the change feed read from the start lists every seeded job
+    for job_id in range(1, count + 1):
+        yield {'id': job_id, 'job_id': job_id, 'operation': JobChangeOperation.CREATED,
+               'changed_at': started + timedelta(seconds=job_id)}
+
+
+def generate_applications(count: int, users: int, jobs: int, rng: random.Random, started: datetime):
+    from app.models.application import ApplicationStatus
+
+    statuses = list(ApplicationStatus)
+    for index in range(count):
+        # Each applicant walks a different stride through the jobs, so (job, applicant) pairs never repeat
+        applicant = index % users
+        job_id = (index // users + applicant * 7919) % jobs + 1
+        applied_at = started + timedelta(seconds=index)
+        yield {
+            'id': index + 1, 'cover_letter': _sentence(rng, 20), 'status': rng.choice(statuses),
+            'job_id': job_id, 'applicant_id': applicant + 1, 'applied_at': applied_at, 'updated_at': applied_at,
+        }
+
+
+def _batches(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy(connection, table, batch):
+    """COPY a batch through psycopg2; enum columns are written by name, as SQLAlchemy stores them."""
+    columns = list(batch[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow([row[column].name if isinstance(row[column], enum.Enum) else row[column] for column in columns])
+    buffer.seek(0)
+    cursor = connection.connection.dbapi_connection.cursor()
+    cursor.copy_expert(f'COPY {table.name} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def _write(engine, table, rows, batch_size: int) -> int:
+    from sqlalchemy import insert
+
+    use_copy = engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2'
+    written = 0
+    for batch in _batches(rows, batch_size):
+        with engine.begin() as connection:
+            if use_copy:
+                _copy(connection, table, batch)
+            else:
+                connection.execute(insert(table), batch)
+        written += len(batch)
+    return written
+
+
+def _reset_sequences(engine, tables):
+    if engine.dialect.name != 'postgresql':
+        return
+    from sqlalchemy import text
+
+    with engine.begin() as connection:
+        for table in tables:
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE(MAX(id), 1)) FROM {table.name}"
+            ))
+
+
+def seed(users: int, jobs: int, applications: int, employers: int = 0, batch_size: int = 10000,
+         random_seed: int = 42, reset: bool = False) -> dict:
+    """Seed the database at DATABASE_URL; returns row counts and timings."""
+    from sqlalchemy import func, select
+    from app.database import SessionLocal, engine
+    from app.migrations.runner import drop_all, upgrade
+    from app.models.application import Application
+    from app.models.job import Job
+    from app.models.job_change import JobChange
+    from app.models.user import User
+    from app.services.application_count_service import reconcile_application_counts
+    from app.services.password_service import get_password_hash
+
+    if reset:
+        drop_all(engine)
+    upgrade(engine)
+    with engine.connect() as connection:
+        if connection.scalar(select(func.count()).select_from(User.__table__)):
+            raise SystemExit('Database already has users; pass --reset to recreate it')
+
+    employers = employers or max(1, users // 100)
+    rng = random.Random(random_seed)
+    started = datetime(2024, 1, 1)
+    report = {}
+    for table, rows in (
+        (User.__table__, generate_users(users, employers, get_password_hash(BENCH_PASSWORD), started)),
+        (Job.__table__, generate_jobs(jobs, employers, rng, started)),
+        (JobChange.__table__, generate_job_changes(jobs, started)),
+        (Application.__table__, generate_applications(min(applications, users * jobs), users, jobs, rng, started)),
+    ):
+        table_started = time.perf_counter()
+        written = _write(engine, table, rows, batch_size)
+        elapsed = time.perf_counter() - table_started
+        report[table.name] = {'rows': written, 'seconds': round(elapsed, 2),
+                              'rows_per_s': round(written / elapsed) if elapsed else written}
+    _reset_sequences(engine, (User.__table__, Job.__table__, JobChange.__table__, Application.__table__))
+
+    # Rows were written around the services, so the per-job application counters are rebuilt here
+    counts_started = time.perf_counter()
+    with SessionLocal() as db:
+        reconciled = reconcile_application_counts(db)
+    report['job_application_counts'] = {'rows': reconciled['repaired'],
+                                        'seconds': round(time.perf_counter() - counts_started, 2)}
+    return report
+
+
+def add_database_arguments(parser: argparse.ArgumentParser, default_name: str):
+    parser.add_argument('--database-url', default=f'sqlite:///{tempfile.gettempdir()}/{default_name}.db')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--applications', type=int, default=100000)
+    parser.add_argument('--employers', type=int, default=0, help='defaults to 1%% of users')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='drop and recreate the tables first')
+    add_database_arguments(parser, 'benchmark')
+    args = parser.parse_args()
+
+    # Settings are read at import time, so they must be in place before the app is imported
+    os.environ['DATABASE_URL'] = args.database_url
+    report = seed(args.users, args.jobs, args.applications, employers=args.employers, batch_size=args.batch_size,
+                  random_seed=args.seed, reset=args.reset)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Fixtures shared by the tests: the app over a throwaway SQLite database, seeded once per session.
+
+Settings are read when the app modules are imported, so the environment is set here, before any of
+them are.
+"""
+import os
+import tempfile
+
+import pytest
+
+_data_dir = tempfile.mkdtemp(prefix='job-search-tests-')
+os.environ['DATABASE_URL'] = f'sqlite:///{_data_dir}/test.db'
+os.environ['LOG_FILE'] = os.path.join(_data_dir, 'app.log')
+# Route query budgets fail the statement that overruns them instead of logging it
+os.environ['DB_QUERY_BUDGET_MODE'] = 'raise'
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+os.environ.setdefault('ALGORITHM', 'HS256')
+os.environ.setdefault('ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('ADMIN_TOKEN', 'test-admin-token')
+
+SEED_USERS = 40
+SEED_JOBS = 30
+SEED_APPLICATIONS = 200
+
+
+@pytest.fixture(scope='session')
+def engine():
+    from app.database import engine
+
+    return engine
+
+
+@pytest.fixture(scope='session')
+def client(engine):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from benchmarks.seed import seed
+
+    seed(SEED_USERS, SEED_JOBS, SEED_APPLICATIONS)
+    with TestClient(app) as test_client:
+        yield test_client
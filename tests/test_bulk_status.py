@@ -0,0 +1,78 @@
+"""PATCH /applications/bulk is for employers, and only reaches applications to their own jobs."""
+import pytest
+from sqlalchemy import insert, select
+
+from app.database import SessionLocal
+from app.models.application import Application, ApplicationStatus
+from app.models.job import EmploymentType, Job
+from app.models.user import User
+from app.services.application_count_service import adjust_application_counts
+from app.services.auth_service import create_access_token
+
+
+def auth(username: str) -> dict:
+    return {'Authorization': f"Bearer {create_access_token({'sub': username})}"}
+
+
+def job_with_applications(employer_id: int, applicants: range) -> list:
+    with SessionLocal() as db:
+        job_id = db.scalar(insert(Job).values(
+            title='Bulk status', description='Applications moved in bulk', location='Remote',
+            employment_type=EmploymentType.FULL_TIME, employer_id=employer_id).returning(Job.id))
+        ids = list(db.scalars(insert(Application).returning(Application.id, sort_by_parameter_order=True), [
+            {'cover_letter': 'Applying to be moved in bulk', 'status': ApplicationStatus.SUBMITTED,
+             'job_id': job_id, 'applicant_id': applicant_id} for applicant_id in applicants]))
+        adjust_application_counts(db, job_id, {ApplicationStatus.SUBMITTED: len(ids)})
+        db.commit()
+        return [job_id, *ids]
+
+
+@pytest.fixture(scope='module')
+def other_employer(client):
+    with SessionLocal() as db:
+        user = User(username='other-employer', email='other-employer@example.com', hashed_password='not-a-hash',
+                    is_active=True, is_hr=True)
+        db.add(user)
+        db.commit()
+        return user.id, user.username
+
+
+def statuses(ids: list) -> set:
+    with SessionLocal() as db:
+        return set(db.scalars(select(Application.status).where(Application.id.in_(ids))))
+
+
+def test_requires_an_employer(client):
+    job_id, *ids = job_with_applications(1, range(2, 5))
+    body = {'job_id': job_id, 'status': 'rejected'}
+    assert client.patch('/applications/bulk', json=body).status_code == 401
+    # user2 is an applicant, not an employer
+    assert client.patch('/applications/bulk', json=body, headers=auth('user2')).status_code == 403
+    assert statuses(ids) == {ApplicationStatus.SUBMITTED}
+
+
+def test_other_employers_jobs_are_out_of_reach(client, other_employer):
+    job_id, *ids = job_with_applications(1, range(5, 8))
+    _, username = other_employer
+    response = client.patch('/applications/bulk', json={'job_id': job_id, 'status': 'rejected'},
+                            headers=auth(username))
+    assert response.status_code == 403
+
+    response = client.patch('/applications/bulk', json={'ids': ids, 'status': 'rejected'}, headers=auth(username))
+    assert response.status_code == 200
+    assert response.json()['updated'] == 0
+    assert {result['outcome'] for result in response.json()['results']} == {'not_found'}
+    assert statuses(ids) == {ApplicationStatus.SUBMITTED}
+
+
+def test_employer_moves_own_applications(client, other_employer):
+    job_id, *ids = job_with_applications(1, range(8, 11))
+    other_job_id, *other_ids = job_with_applications(other_employer[0], range(8, 11))
+    response = client.patch('/applications/bulk', json={'ids': ids + other_ids, 'status': 'reviewing'},
+                            headers=auth('user1'))
+    assert response.status_code == 200
+    outcomes = {result['id']: result['outcome'] for result in response.json()['results']}
+    assert [outcomes[i] for i in ids] == ['updated'] * len(ids)
+    assert [outcomes[i] for i in other_ids] == ['not_found'] * len(other_ids)
+    assert statuses(ids) == {ApplicationStatus.REVIEWING}
+    assert statuses(other_ids) == {ApplicationStatus.SUBMITTED}
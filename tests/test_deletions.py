@@ -0,0 +1,103 @@
+"""Background deletions are started and followed by the target's owner or the admin token.
+
+Their tasks live in the deletion_tasks table, so any worker can answer for them.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update
+
+from app.database import SessionLocal
+from app.models.application import Application, ApplicationStatus
+from app.models.deletion_task import DeletionTask
+from app.models.job import EmploymentType, Job
+from app.models.user import User
+from app.services.auth_service import create_access_token
+from app.services.deletion_service import DeletionTasks
+
+ADMIN = {'X-Admin-Token': 'test-admin-token'}
+
+
+def auth(username: str) -> dict:
+    return {'Authorization': f"Bearer {create_access_token({'sub': username})}"}
+
+
+def employer_with_jobs(username: str, jobs: int) -> tuple:
+    with SessionLocal() as db:
+        user = User(username=username, email=f'{username}@example.com', hashed_password='not-a-hash',
+                    is_active=True, is_hr=True)
+        db.add(user)
+        db.flush()
+        job_ids = list(db.scalars(insert(Job).returning(Job.id), [
+            {'title': f'Leaving {i}', 'description': 'Deleted with its employer', 'location': 'Remote',
+             'employment_type': EmploymentType.FULL_TIME, 'employer_id': user.id} for i in range(jobs)]))
+        db.execute(insert(Application), [
+            {'cover_letter': 'Deleted with the job I applied to', 'status': ApplicationStatus.SUBMITTED,
+             'job_id': job_id, 'applicant_id': applicant_id} for job_id in job_ids for applicant_id in (2, 3)])
+        db.commit()
+        return user.id, job_ids
+
+
+def test_background_user_deletion_can_be_followed_by_the_user(client):
+    user_id, _ = employer_with_jobs('leaving-employer', jobs=3)
+    headers = auth('leaving-employer')
+
+    response = client.delete(f'/users/{user_id}', params={'background': 'true'}, headers=headers)
+    assert response.status_code == 202
+    location = response.headers['location']
+    assert location == f"/deletions/{response.json()['id']}"
+
+    # The test client has run the background task by the time the response is returned
+    task = client.get(location, headers=ADMIN)
+    assert task.status_code == 200
+    assert task.json()['status'] == 'done'
+    assert task.json()['deleted'] == {'applications': 6, 'jobs': 3}
+    assert client.get(f'/users/{user_id}').status_code == 404
+
+    # Progress was written to the task's row, not kept by the worker that ran it
+    with SessionLocal() as db:
+        row = db.get(DeletionTask, response.json()['id'])
+        assert (row.status, row.applications, row.jobs, row.requested_by) == ('done', 6, 3, user_id)
+
+
+def test_background_deletion_needs_the_owner_or_the_admin_token(client):
+    owner_id, job_ids = employer_with_jobs('owning-employer', jobs=2)
+    employer_with_jobs('another-employer', jobs=1)
+    path = f'/jobs/{job_ids[0]}'
+
+    assert client.delete(path, params={'background': 'true'}).status_code == 401
+    assert client.delete(path, params={'background': 'true'}, headers=auth('another-employer')).status_code == 403
+    assert client.delete(f'/users/{owner_id}', params={'background': 'true'},
+                         headers=auth('another-employer')).status_code == 403
+
+    started = client.delete(path, params={'background': 'true'}, headers=auth('owning-employer'))
+    assert started.status_code == 202
+    location = started.headers['location']
+    assert client.get(location).status_code == 401
+    assert client.get(location, headers=auth('another-employer')).status_code == 404
+    assert client.get(location, headers=auth('owning-employer')).json()['status'] == 'done'
+
+    by_admin = client.delete(f'/jobs/{job_ids[1]}', params={'background': 'true'}, headers=ADMIN)
+    assert by_admin.status_code == 202
+    assert client.get(by_admin.headers['location'], headers=ADMIN).json()['deleted'] == {'applications': 2, 'jobs': 1}
+    assert {task['id'] for task in client.get('/admin/deletions', headers=ADMIN).json()} >= {
+        started.json()['id'], by_admin.json()['id']}
+
+
+def test_abandoned_task_is_replaced(client):
+    tasks = DeletionTasks(stale_seconds=60)
+    with SessionLocal() as db:
+        first, created = tasks.create(db, 'job', 999999)
+        assert created
+        again, created = tasks.create(db, 'job', 999999)
+        assert (again.id, created) == (first.id, False)
+
+        db.execute(update(DeletionTask).where(DeletionTask.id == first.id)
+                   .values(status='running', updated_at=datetime.utcnow() - timedelta(minutes=5)))
+        db.commit()
+        replacement, created = tasks.create(db, 'job', 999999)
+        assert created and replacement.id != first.id
+        assert tasks.get(db, first.id).status == 'failed'
+
+
+def test_unknown_deletion_task(client):
+    assert client.get('/deletions/not-a-task', headers=ADMIN).status_code == 404
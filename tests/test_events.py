@@ -0,0 +1,34 @@
+"""The application event stream gives its subscription back however the client leaves."""
+from app.main import app
+from app.services.auth_service import create_access_token
+from app.utils.pubsub import event_broker
+
+
+async def request_from_gone_client(username: str):
+    """Request /applications/events over raw ASGI from a client whose connection fails on the first send."""
+    token = create_access_token({'sub': username})
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+             'path': '/applications/events', 'raw_path': b'/applications/events', 'root_path': '',
+             'query_string': b'snapshot=false', 'headers': [(b'authorization', f'Bearer {token}'.encode())],
+             'client': ('testclient', 50000), 'server': ('testserver', 80)}
+
+    async def receive():
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        raise OSError('Connection reset by peer')
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        pass
+
+
+def test_subscription_is_released_when_the_client_leaves_before_the_body(client):
+    username = client.get('/users/2').json()['username']
+    before = event_broker.subscribers
+
+    # The stream's generator never starts, so only the response can release the subscription
+    client.portal.call(request_from_gone_client, username)
+
+    assert event_broker.subscribers == before
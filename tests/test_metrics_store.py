@@ -0,0 +1,59 @@
+"""Totals merged across worker files by MultiProcessStore stay monotonic through worker exits and pid reuse."""
+import json
+import os
+import subprocess
+import sys
+
+from app.utils.metrics import MultiProcessStore, RequestMetrics, merge_snapshots
+
+
+def worker_metrics(requests: int) -> RequestMetrics:
+    metrics = RequestMetrics()
+    for _ in range(requests):
+        metrics.started('GET', '/jobs/')
+        metrics.finished('GET', '/jobs/', 200, 0.01, 0.001)
+    return metrics
+
+
+def write_worker_file(store: MultiProcessStore, pid: int, requests: int, in_progress: int = 0):
+    snapshot = worker_metrics(requests).snapshot()
+    snapshot['pid'] = pid
+    snapshot['in_progress'] = [['GET', '/jobs/', in_progress]]
+    with open(store.path(pid), 'w') as handle:
+        json.dump(snapshot, handle)
+
+
+def total_requests(store: MultiProcessStore) -> int:
+    return merge_snapshots(store.collect())['requests'].get(('GET', '/jobs/', '200'), 0)
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_dead_worker_is_folded_into_the_aggregate(tmp_path):
+    store = MultiProcessStore(str(tmp_path), worker_metrics(2))
+    store.start()
+    try:
+        pid = dead_pid()
+        write_worker_file(store, pid, requests=5, in_progress=3)
+        assert total_requests(store) == 7
+        assert not os.path.exists(store.path(pid))
+        assert merge_snapshots(store.collect())['in_progress'][('GET', '/jobs/')] == 0
+        assert total_requests(store) == 7
+    finally:
+        store.stop()
+    # The stopped worker's own numbers moved into the aggregate with its file
+    assert not os.path.exists(store.path(os.getpid()))
+    assert total_requests(MultiProcessStore(str(tmp_path), RequestMetrics())) == 7
+
+
+def test_reused_pid_does_not_take_counts_back(tmp_path):
+    # Left by an earlier worker that had this process's pid and was killed before it could clean up
+    write_worker_file(MultiProcessStore(str(tmp_path), RequestMetrics()), os.getpid(), requests=10)
+    store = MultiProcessStore(str(tmp_path), worker_metrics(1))
+    assert total_requests(store) == 11
+    store.metrics.finished('GET', '/jobs/', 200, 0.01, 0.001)
+    assert total_requests(store) == 12
@@ -0,0 +1,41 @@
+"""Databases created by create_all before migrations existed pick up the indexes declared since."""
+from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, Text, create_engine, inspect
+
+from app.migrations.runner import upgrade
+
+LISTING_INDEXES = {'ix_jobs_active_type_created', 'ix_jobs_active_location_created', 'ix_jobs_active_created'}
+
+
+def job_indexes(engine) -> set:
+    return {index['name'] for index in inspect(engine).get_indexes('jobs')}
+
+
+def test_upgrade_adds_listing_indexes_to_a_pre_migration_database(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/legacy.db')
+    legacy = MetaData()
+    Table('users', legacy, Column('id', Integer, primary_key=True), Column('username', String(50)),
+          Column('email', String(100)), Column('hashed_password', String(100)), Column('is_active', Boolean),
+          Column('is_hr', Boolean), Column('created_at', DateTime), Column('updated_at', DateTime))
+    Table('jobs', legacy, Column('id', Integer, primary_key=True), Column('title', String(100)),
+          Column('description', Text), Column('employment_type', String(20)), Column('location', String(100)),
+          Column('is_active', Boolean), Column('created_at', DateTime), Column('updated_at', DateTime),
+          Column('employer_id', Integer))
+    Table('applications', legacy, Column('id', Integer, primary_key=True), Column('cover_letter', Text),
+          Column('status', String(20)), Column('applied_at', DateTime), Column('updated_at', DateTime),
+          Column('job_id', Integer), Column('applicant_id', Integer))
+    legacy.create_all(engine)
+    assert not LISTING_INDEXES & job_indexes(engine)
+
+    upgrade(engine)
+
+    assert LISTING_INDEXES <= job_indexes(engine)
+    engine.dispose()
+
+
+def test_upgrade_from_an_empty_database_creates_each_index_once(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/fresh.db')
+    upgrade(engine)
+    assert LISTING_INDEXES <= job_indexes(engine)
+    # Nothing is pending, and running again is a no-op rather than a duplicate index error
+    assert upgrade(engine) == []
+    engine.dispose()
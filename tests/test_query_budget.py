@@ -0,0 +1,69 @@
+"""Query budgets are enforced in tests, and only count the statements of the request they belong to."""
+import pytest
+from sqlalchemy import insert, select
+
+from app.database import SessionLocal
+from app.models.application import Application, ApplicationStatus
+from app.models.job import EmploymentType, Job
+from app.utils import request_context
+from app.utils.request_context import (
+    DB_QUERY_BUDGET_MODE, QueryBudgetExceeded, RequestStats, begin_request, current_request_stats, end_request
+)
+
+
+@pytest.fixture
+def recorded_stats(monkeypatch):
+    """The stats of every request made while the test runs."""
+    created = []
+
+    class RecordedStats(RequestStats):
+        __slots__ = ()
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(request_context, 'RequestStats', RecordedStats)
+    return created
+
+
+def test_overrun_fails_the_statement(engine):
+    assert DB_QUERY_BUDGET_MODE == 'raise'
+    token = begin_request('/budgeted')
+    try:
+        current_request_stats().budget = 1
+        with engine.connect() as connection:
+            connection.execute(select(1))
+            with pytest.raises(QueryBudgetExceeded):
+                connection.execute(select(2))
+    finally:
+        end_request(token)
+
+
+def test_budgeted_routes_stay_within_budget(client):
+    # /jobs/, /jobs/{id} and /jobs/changes declare query_budget(2); an overrun would be a 500 here
+    for path in ('/jobs/?limit=25&sort=-created_at', '/jobs/1', '/jobs/changes?limit=50'):
+        response = client.get(path)
+        assert response.status_code == 200, path
+        assert int(response.headers['x-db-queries']) <= 2
+
+
+def test_background_deletion_is_not_counted_toward_the_request(client, recorded_stats):
+    with SessionLocal() as db:
+        job_id = db.scalar(insert(Job).values(
+            title='Background deletion', description='Deleted after the response', location='Remote',
+            employment_type=EmploymentType.FULL_TIME, employer_id=1).returning(Job.id))
+        db.execute(insert(Application), [
+            {'cover_letter': 'Deleted along with the job', 'status': ApplicationStatus.SUBMITTED,
+             'job_id': job_id, 'applicant_id': applicant_id} for applicant_id in range(2, 12)])
+        db.commit()
+
+    # The test client returns once the background task has run
+    response = client.delete(f'/jobs/{job_id}', params={'background': 'true'},
+                             headers={'X-Admin-Token': 'test-admin-token'})
+    assert response.status_code == 202
+    [stats] = recorded_stats
+    assert stats.finished
+    assert stats.db_queries == int(response.headers['x-db-queries'])
+    with SessionLocal() as db:
+        assert db.get(Job, job_id) is None
@@ -0,0 +1,76 @@
+"""Statements sent per request by the read and update endpoints, pinned so an N+1 regression fails here.
+
+A page costs the same number of statements whatever its size, so each list is checked at two sizes.
+"""
+import pytest
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models.application import Application, ApplicationStatus
+from app.utils.query_counter import assert_max_queries
+from app.utils.response_cache import job_response_cache
+
+# Version check plus one joined page query for jobs; one joined query for the others
+LIST_QUERIES = [
+    ('/jobs/', 2),
+    ('/applications/', 1),
+    ('/users/', 1),
+]
+DETAIL_QUERIES = [
+    ('/jobs/{id}', 2),
+    ('/applications/{id}', 1),
+    ('/users/{id}', 1),
+]
+
+# On SQLite; the job change log adds a lock statement on Postgres
+UPDATE_QUERIES = [
+    ('/users/{id}', {'email': 'counted-update@example.com'}, 1),
+    ('/jobs/{id}', {'location': 'Warsaw'}, 3),
+    ('/applications/{id}', {'cover_letter': 'A cover letter updated while counted'}, 2),
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_response_cache():
+    # A cached body would hide the statements of the render being measured
+    job_response_cache.invalidate()
+
+
+@pytest.mark.parametrize('limit', [5, 25])
+@pytest.mark.parametrize('path, queries', LIST_QUERIES)
+def test_list_queries(client, engine, path, queries, limit):
+    with assert_max_queries(engine, queries):
+        response = client.get(path, params={'limit': limit})
+    assert response.status_code == 200
+    assert len(response.json()) == limit
+
+
+@pytest.mark.parametrize('path, queries', DETAIL_QUERIES)
+def test_detail_queries(client, engine, path, queries):
+    with assert_max_queries(engine, queries):
+        response = client.get(path.format(id=1))
+    assert response.status_code == 200
+
+
+def test_application_list_renders_relationships(client):
+    # The single statement above only counts if the nested job and applicant come with it
+    application = client.get('/applications/', params={'limit': 1}).json()[0]
+    assert application['job']['title']
+    assert application['applicant']['username']
+
+
+@pytest.mark.parametrize('path, body, queries', UPDATE_QUERIES)
+def test_update_queries(client, engine, path, body, queries):
+    with assert_max_queries(engine, queries):
+        response = client.put(path.format(id=4), json=body)
+    assert response.status_code == 200, response.text
+
+
+def test_application_status_update_queries(client, engine):
+    with SessionLocal() as db:
+        application_id = db.scalar(select(Application.id).where(Application.status == ApplicationStatus.SUBMITTED)
+                                   .order_by(Application.id).limit(1))
+    # The two counter upserts come on top of the read and the update
+    with assert_max_queries(engine, 4):
+        response = client.put(f'/applications/{application_id}', json={'status': 'reviewing'})
+    assert response.status_code == 200, response.text
@@ -0,0 +1,61 @@
+"""Password-hashing routes are rate limited per client, and clients can't pick their own address."""
+import pytest
+from starlette.requests import Request
+
+from app.utils import rate_limit
+from app.utils.rate_limit import MemoryBackend, rate_limiter
+
+
+@pytest.fixture
+def fresh_buckets(monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'backend', MemoryBackend())
+
+
+def request_from(host: str, forwarded: str = None) -> Request:
+    headers = [(b'x-forwarded-for', forwarded.encode())] if forwarded is not None else []
+    return Request({'type': 'http', 'headers': headers, 'client': (host, 1234)})
+
+
+@pytest.mark.parametrize('forwarded, hops, expected', [
+    ('203.0.113.7', 1, '203.0.113.7'),
+    # The client sent the leftmost entry itself; the proxy appended the address it really came from
+    ('198.51.100.1, 203.0.113.7', 1, '203.0.113.7'),
+    ('198.51.100.1, 203.0.113.7, 10.0.0.2', 2, '203.0.113.7'),
+    ('203.0.113.7', 2, '203.0.113.7'),
+    ('', 1, '10.0.0.1'),
+])
+def test_client_ip_takes_the_address_seen_by_the_outermost_trusted_proxy(monkeypatch, forwarded, hops, expected):
+    monkeypatch.setattr(rate_limit, 'RATE_LIMIT_TRUST_FORWARDED', True)
+    assert rate_limit.client_ip(request_from('10.0.0.1', forwarded), hops=hops) == expected
+
+
+def test_forwarded_header_is_ignored_unless_trusted():
+    assert rate_limit.client_ip(request_from('10.0.0.1', '203.0.113.7')) == '10.0.0.1'
+
+
+def test_create_user_shares_the_signup_limit(client, fresh_buckets):
+    def create(i: int):
+        return client.post('/users/', json={'username': f'limited-{i}', 'email': f'limited-{i}@example.com',
+                                            'password': 'a-password'})
+
+    responses = [create(i) for i in range(5)]
+    assert [response.status_code for response in responses] == [200] * 5
+    rejected = create(5)
+    assert rejected.status_code == 429
+    assert 'retry-after' in rejected.headers
+    assert client.post('/auth/signup', json={'username': 'limited-signup', 'email': 'limited-signup@example.com',
+                                             'password': 'a-password'}).status_code == 429
+
+
+def test_only_failed_logins_spend_the_username_bucket(client, fresh_buckets):
+    assert client.post('/auth/signup', json={'username': 'limited-login', 'email': 'limited-login@example.com',
+                                             'password': 'right-password'}).status_code == 200
+
+    def login(password: str):
+        return client.post('/auth/token', data={'username': 'limited-login', 'password': password})
+
+    for _ in range(6):
+        assert login('right-password').status_code == 200
+    for _ in range(5):
+        assert login('wrong-password').status_code == 401
+    assert login('right-password').status_code == 429
@@ -0,0 +1,19 @@
+"""Job ETags depend only on the request and the rows it renders, so every worker agrees on them."""
+from app.utils.response_cache import job_response_cache
+
+
+def test_etag_survives_invalidation_but_not_a_write(client):
+    first = client.get('/jobs/5')
+    etag = first.headers['etag']
+
+    # Another worker's cache, or this one after an unrelated write, derives the same ETag
+    job_response_cache.invalidate()
+    assert client.get('/jobs/5', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/jobs/', params={'limit': 5}).headers['etag'] == client.get(
+        '/jobs/', params={'limit': 5}).headers['etag']
+
+    assert client.put('/jobs/5', json={'location': 'Elsewhere'}).status_code == 200
+    changed = client.get('/jobs/5', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['etag'] != etag
+    assert changed.json()['location'] == 'Elsewhere'
@@ -0,0 +1,40 @@
+"""The in-process search index follows job writes it did not make itself, through the job change log."""
+from sqlalchemy import delete, insert, update
+
+from app.database import SessionLocal
+from app.models.job import EmploymentType, Job
+from app.models.job_change import JobChangeOperation
+from app.services.job_change_service import record_job_changes
+from app.services.search_service import job_search_index
+
+
+def write_as_other_worker(statement, job_ids=None, operation=JobChangeOperation.UPDATED):
+    # Goes around the job service, so this process's index only learns of it from the change log
+    with SessionLocal() as db:
+        result = db.execute(statement)
+        record_job_changes(db, job_ids or result.scalars().all(), operation)
+        db.commit()
+
+
+def search_ids(client, query):
+    response = client.get('/jobs/search', params={'q': query})
+    assert response.status_code == 200
+    return [job['id'] for job in response.json()]
+
+
+def test_search_catches_up_on_other_workers(client):
+    search_ids(client, 'python')
+    assert job_search_index.built
+
+    write_as_other_worker(insert(Job).values(
+        title='Zanzibar lighthouse keeper', description='Keep the light on', location='Zanzibar',
+        employment_type=EmploymentType.FULL_TIME, employer_id=1).returning(Job.id),
+        operation=JobChangeOperation.CREATED)
+    [job_id] = search_ids(client, 'zanzibar')
+
+    write_as_other_worker(update(Job).where(Job.id == job_id).values(title='Quokka lighthouse keeper'), [job_id])
+    assert search_ids(client, 'quokka') == [job_id]
+
+    write_as_other_worker(delete(Job).where(Job.id == job_id), [job_id], JobChangeOperation.DELETED)
+    assert search_ids(client, 'quokka') == []
+    assert job_id not in job_search_index.doc_lengths
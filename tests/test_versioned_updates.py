@@ -0,0 +1,28 @@
+"""PUT responses carry the row as written: new version and a new updated_at, the same as a fresh read."""
+import time
+
+import pytest
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/jobs/2', {'location': 'Lisbon'}),
+    ('/applications/2', {'cover_letter': 'A cover letter rewritten for the update'}),
+])
+def test_put_returns_new_updated_at(client, path, body):
+    before = client.get(path).json()
+    time.sleep(0.01)
+    response = client.put(path, json=body)
+    assert response.status_code == 200, response.text
+    updated = response.json()
+    assert updated['version'] == before['version'] + 1
+    assert response.headers['etag'] == f'"{updated["version"]}"'
+    assert updated['updated_at'] > before['updated_at']
+    assert client.get(path).json()['updated_at'] == updated['updated_at']
+
+
+def test_stale_if_match_is_a_conflict(client):
+    current = client.get('/jobs/3').json()['version']
+    assert client.put('/jobs/3', json={'location': 'Paris'}, headers={'If-Match': f'"{current}"'}).status_code == 200
+    response = client.put('/jobs/3', json={'location': 'Madrid'}, headers={'If-Match': f'"{current}"'})
+    assert response.status_code == 409
+    assert response.headers['etag'] == f'"{current + 1}"'